@@ -0,0 +1,247 @@
+import copy
+import queue
+import numpy as np
+import psutil
+import torch
+import torch.multiprocessing as mp
+from torch.utils.tensorboard import SummaryWriter
+from framework.utils.base import base_policy, missing_methods
+from framework.rollout_service import RolloutServer, rollout_worker
+from framework.utils.timing import timers
+
+
+def split_actor_learner_args(args):
+    """
+    Each actor owns num_envs // actors environments. The learner keeps the same
+    batch as the single loop by collecting learn_n blocks from every actor.
+    """
+    actor_args = copy.copy(args)
+    actor_args.num_envs = args.num_envs // args.actors
+    actor_args.actor_cpus = max(1, (psutil.cpu_count() - 1) // args.actors - 1)
+    actor_args.dp_workers = 1
+
+    learner_args = copy.copy(args)
+    learner_args.num_envs = actor_args.num_envs
+    learner_args.learn_n = args.learn_n * args.actors
+    return actor_args, learner_args
+
+
+def to_cpu(x):
+    if isinstance(x, torch.Tensor):
+        return x.cpu()
+    if isinstance(x, (list, tuple)):
+        return type(x)(to_cpu(i) for i in x)
+    return x
+
+
+def collect_trajectory(env, Policy, args, observation, rank, version):
+    to_remember, rewards, dones = [], [], []
+    for i in range(args.episode_len):
+        actions = Policy.action(observation, new_episode=i == 0)
+        observation, reward, done, _ = env.step(actions)
+        to_remember.append(to_cpu(Policy.to_remember))
+        rewards.append(reward)
+        dones.append(done)
+
+    trajectory = dict(
+        rank=rank,
+        version=version,
+        to_remember=to_remember,
+        rewards=np.stack(rewards).astype(np.float32),
+        dones=np.stack(dones).astype(np.float32),
+    )
+    return observation, trajectory
+
+
+def actor_loop(rank, env_fn, policy_fn, args, trajectories, weights, version, lock, stop):
+    torch.set_num_threads(1)
+    torch.manual_seed(args.seed + rank)
+    np.random.seed(args.seed + rank)
+
+    env = env_fn(args.num_envs, args.actor_cpus)
+    env.seed(args.seed + rank)
+    Policy = policy_fn(args, None)
+
+    local_version = -1
+    observation = env.reset()
+    while not stop.is_set():
+        if version.value != local_version:
+            with lock:
+                local_version = version.value
+                Policy.load_state_dicts(weights)
+
+        observation, trajectory = collect_trajectory(
+            env, Policy, args, observation, rank, local_version
+        )
+        # bounded queue, actors block here when the learner falls behind.
+        while not stop.is_set():
+            try:
+                trajectories.put(trajectory, timeout=1.0)
+                break
+            except queue.Full:
+                continue
+
+    env.close()
+
+
+class ActorLearner:
+    """
+    IMPALA style collection: actor processes step their slice of the environments with a
+    local copy of the policy and stream fixed length trajectories to the learner, which
+    trains on them with V-trace correction and broadcasts its weights back.
+    With --rollout-port or --rollout-workers, remote workers stream trajectories of the
+    same shape over TCP into the same queue (see rollout_service).
+    """
+
+    def __init__(self, args, env_fn, policy_fn, logger: SummaryWriter):
+        missing = missing_methods(policy_fn, "state_dicts", "load_state_dicts")
+        if missing:
+            name = getattr(policy_fn, "func", policy_fn).__name__
+            raise ValueError(
+                f"--actors needs a policy that shares its weights, {name} has no "
+                + " or ".join(missing)
+            )
+        self.args = args
+        self.env_fn = env_fn
+        self.policy_fn = policy_fn
+        self.logger = logger
+        self.n_actors = args.actors
+        self.server = None
+        self.workers = []
+
+    def publish(self, Policy: base_policy):
+        with self.lock:
+            for shared, state in zip(self.weights, Policy.state_dicts()):
+                for k, v in state.items():
+                    shared[k].copy_(v)
+            self.version.value += 1
+        if self.server is not None:
+            self.server.publish(Policy.state_dicts(), self.version.value)
+
+    def start(self, Policy: base_policy):
+        ctx = mp.get_context("spawn")
+        self.trajectories = ctx.Queue(maxsize=2 * self.n_actors)
+        self.version = ctx.Value("i", 0)
+        self.lock = ctx.Lock()
+        self.stop = ctx.Event()
+        self.weights = [
+            {k: v.detach().cpu().clone().share_memory_() for k, v in state.items()}
+            for state in Policy.state_dicts()
+        ]
+        self.actors = [
+            ctx.Process(
+                target=actor_loop,
+                args=(
+                    rank,
+                    self.env_fn,
+                    self.policy_fn,
+                    self.args,
+                    self.trajectories,
+                    self.weights,
+                    self.version,
+                    self.lock,
+                    self.stop,
+                ),
+                daemon=True,
+            )
+            for rank in range(self.n_actors)
+        ]
+        for actor in self.actors:
+            actor.start()
+
+        if self.args.rollout_port is not None or self.args.rollout_workers:
+            if self.args.rollout_port is None:
+                self.args.rollout_port = 0
+            self.server = RolloutServer(
+                self.args, self.env_fn, self.policy_fn, self.trajectories, self.logger
+            )
+            self.server.publish(Policy.state_dicts(), self.version.value)
+            self.server.start()
+            print(f"Rollout server listening on {self.args.rollout_host}:{self.server.port}")
+
+            # localhost stand-ins for remote machines, same code path as rollout_worker.py
+            self.workers = [
+                ctx.Process(
+                    target=rollout_worker,
+                    args=(
+                        "127.0.0.1",
+                        self.server.port,
+                        rank,
+                        self.args.actor_cpus,
+                        self.server.key.decode(),
+                    ),
+                    daemon=True,
+                )
+                for rank in range(self.n_actors, self.n_actors + self.args.rollout_workers)
+            ]
+            for worker in self.workers:
+                worker.start()
+
+    def close(self):
+        self.stop.set()
+        if self.server is not None:
+            self.server.close()
+        while True:
+            try:
+                self.trajectories.get_nowait()
+            except queue.Empty:
+                break
+        for actor in self.actors:
+            actor.join(timeout=10)
+            if actor.is_alive():
+                actor.terminate()
+        for worker in self.workers:
+            worker.terminate()
+
+    def next_trajectory(self):
+        # a dead actor never fills the queue, fail instead of waiting on it forever
+        while True:
+            try:
+                return self.trajectories.get(timeout=1.0)
+            except queue.Empty:
+                dead = [a for a in self.actors if not a.is_alive()]
+                if dead:
+                    self.close()
+                    raise RuntimeError(
+                        "actor processes exited: "
+                        + ", ".join(f"{a.name} (exit code {a.exitcode})" for a in dead)
+                    )
+
+    def run(self, builder, score, vid):
+        Policy = builder.Policy
+        episode_len = self.args.episode_len
+        self.start(Policy)
+
+        step = 0
+        consumed = 0
+        builder.evaluate(step, score, vid)
+        while step < builder.steps:
+            trajectory = self.next_trajectory()
+            for i in range(episode_len):
+                Policy.to_remember = trajectory["to_remember"][i]
+                with timers.phase("store"):
+                    Policy.store(
+                        step + i,
+                        None,
+                        trajectory["rewards"][i],
+                        trajectory["dones"][i],
+                    )
+            consumed += 1
+
+            # the learner memory holds learn_n blocks from every actor
+            if consumed % (self.args.learn_n * self.n_actors) == 0:
+                # versions behind the weights that just learned from it, before the bump
+                lag = self.version.value - trajectory["version"]
+                self.publish(Policy)
+                self.logger.add_scalar("actor_learner/policy_lag", lag, step)
+
+            # one round of trajectories from every actor covers episode_len steps of all envs
+            if consumed % self.n_actors == 0:
+                for _ in range(episode_len):
+                    step += 1
+                    builder.evaluate(step, score, vid)
+                timers.tick(step)
+                builder.memory_monitor.tick(step)
+                builder.profiler.step()
+
+        self.close()
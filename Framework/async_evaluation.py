@@ -0,0 +1,104 @@
+import copy
+import queue
+import psutil
+import torch
+import torch.multiprocessing as mp
+from torch.utils.tensorboard import SummaryWriter
+from framework.utils.metrics import make_logger
+from framework.utils.base import base_policy
+
+
+def evaluation_loop(spec, log_dir, snapshots, results):
+    torch.set_num_threads(max(1, psutil.cpu_count() // 4))
+    logger = make_logger(spec["args"], log_dir)
+    Policy = spec["policy_fn"](spec["args"], None)
+    envs = {k: fn() for k, fn in spec["env_fns"].items()}
+    builder = spec["builder_cls"](
+        args=spec["args"],
+        train_environment=None,
+        test_environment=envs["test"],
+        test_all_env=envs.get("test_all"),
+        video_environment=envs.get("video"),
+        Policy=Policy,
+        logger=logger,
+        **spec["builder_kwargs"],
+    )
+
+    while True:
+        msg = snapshots.get()
+        if msg is None:
+            break
+        Policy.load_state_dicts(msg["states"])
+        best_score = builder.best_score
+        # metrics are written at the training step the snapshot was taken at
+        builder.evaluate(msg["step"], msg["score"], msg["vid"])
+        results.put(dict(version=msg["version"], best=builder.best_score > best_score))
+
+    Policy.close()
+    for env in envs.values():
+        env.close()
+    logger.close()
+
+
+class AsyncEvaluator:
+    """
+    Runs the builder's evaluation suites in a separate process on versioned snapshots of the
+    policy weights, so the training loop never waits for score() or save_video().
+    Snapshots are skipped, not queued up, while the evaluator is still busy.
+    """
+
+    def __init__(self, spec, logger: SummaryWriter):
+        self.spec = spec
+        self.spec["args"] = copy.copy(spec["args"])
+        self.spec["args"].actors = 0
+        self.spec["args"].dp_workers = 1
+        self.logger = logger
+        self.version = 0
+        self.pending = {}
+        self.process = None
+
+    def start(self):
+        ctx = mp.get_context("spawn")
+        self.snapshots = ctx.Queue(maxsize=1)
+        self.results = ctx.Queue()
+        self.process = ctx.Process(
+            target=evaluation_loop,
+            args=(self.spec, self.logger.get_logdir(), self.snapshots, self.results),
+            daemon=True,
+        )
+        self.process.start()
+
+    def submit(self, step, score, vid, Policy: base_policy):
+        if self.process is None:
+            self.start()
+        self.poll(Policy)
+
+        states = [
+            {k: v.detach().to("cpu", copy=True).share_memory_() for k, v in s.items()}
+            for s in Policy.state_dicts()
+        ]
+        msg = dict(version=self.version, step=step, score=score, vid=vid, states=states)
+        try:
+            self.snapshots.put_nowait(msg)
+            self.pending[self.version] = states
+        except queue.Full:
+            self.logger.add_scalar("evaluation/skipped_snapshot", 1, step)
+        self.version += 1
+
+    def poll(self, Policy: base_policy, block=False):
+        while self.pending:
+            try:
+                result = self.results.get(block=block)
+            except queue.Empty:
+                break
+            states = self.pending.pop(result["version"])
+            if result["best"]:
+                Policy.set_best_states(states)
+
+    def close(self, Policy: base_policy):
+        if self.process is None:
+            return
+        self.poll(Policy, block=True)
+        self.snapshots.put(None)
+        self.process.join()
+        self.process = None
@@ -0,0 +1,55 @@
+import supersuit as ss
+from pettingzoo.mpe import (
+    simple_v2,
+    simple_reference_v2,
+    simple_spread_v2,
+)
+from scenarios import complex_ref, full_ref, iterated
+
+
+def get_env(env_name):
+    N = 2
+    if env_name == "simple":
+        env = simple_v2
+    elif env_name == "communication":
+        env = simple_reference_v2
+    elif env_name == "iterated":
+        env = iterated
+    elif env_name == "complex_communication":
+        env = complex_ref
+    elif env_name == "full_communication_2":
+        env = full_ref
+        N = 2
+    elif env_name == "full_communication_3":
+        env = full_ref
+        N = 3
+    elif env_name == "full_communication_4":
+        N = 4
+        env = full_ref
+    elif env_name == "spread":
+        env = simple_spread_v2
+
+    return env.parallel_env(N=N)
+
+
+# module level factories, so actor processes and remote rollout workers can unpickle them.
+def make_train_env(env_name, num_envs, num_cpus):
+    env = get_env(env_name)
+    env = ss.pad_observations_v0(env)
+    env = ss.pettingzoo_env_to_vec_env_v1(env)
+    return ss.concat_vec_envs_v1(env, num_envs, num_cpus)
+
+
+def make_learn_env(landmark_ind, num_envs, num_cpus):
+    env_learn = iterated.parallel_env(landmark_ind=landmark_ind, continuous_actions=False)
+    env_learn = ss.pad_observations_v0(env_learn)
+    env_learn = ss.pettingzoo_env_to_vec_env_v1(env_learn)
+    return ss.concat_vec_envs_v1(env_learn, num_envs, num_cpus)
+
+
+def make_eval_env(env_name, num_envs):
+    return make_train_env(env_name, num_envs, 0)
+
+
+def make_learn_eval_env(landmark_ind, num_envs):
+    return make_learn_env(landmark_ind, num_envs, 0)
@@ -3,17 +3,25 @@ from torch import nn
 from torch import optim
 import os
 from tqdm import tqdm
-from stable_baselines3.common.vec_env import VecVideoRecorder, DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv
 from torch.utils.tensorboard import SummaryWriter
 from framework.utils.base import base_policy
+from framework.utils.evaluation import run_episodes, episode_metrics
+from framework.utils.utterance_render import UtteranceRenderer, safe_name, save_comms
+from framework.utils.language_metrics import language_metrics, log_language_metrics
+from framework.utils.hidden_capture import HiddenCapture
+from framework.utils.eval_bank import EvaluationBank
+from framework.utils.episode_log import EpisodeRecorder
+from framework.utils.timing import timers
+from framework.utils.profiling import make_profiler
+from framework.utils.memory import MemoryMonitor
+from framework.utils.perf_store import record_training
+from framework.utils.worker_stats import WorkerMonitor
 import shutil
 import numpy as np
 import sys
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 import numpy as np
 import io
-import seaborn as sns
 import math
 
 
@@ -32,6 +40,9 @@ class ExperimentBuilder(nn.Module):
         steps,
         logger: SummaryWriter,
         test_all_env=None,
+        actor_learner=None,
+        video_environment=None,
+        evaluator=None,
     ):
         super(ExperimentBuilder, self).__init__()
 
@@ -40,6 +51,7 @@ class ExperimentBuilder(nn.Module):
         self.train_env = train_environment
         self.test_env = test_environment
         self.test_all_env = test_all_env
+        self.video_env = video_environment if video_environment is not None else test_environment
         self.episode_len = episode_len
         self.steps = steps
 
@@ -49,71 +61,117 @@ class ExperimentBuilder(nn.Module):
         self.experiment_saved_models = experiment_saved_models
 
         self.logger = logger
+        self.actor_learner = actor_learner
+        self.evaluator = evaluator
+        self.renderer = UtteranceRenderer(args.action_space // 5, episode_len)
+        self.experiment_comms = os.path.join(
+            os.path.dirname(experiment_saved_models), "comms"
+        )
+        self.experiment_hidden = os.path.join(
+            os.path.dirname(experiment_saved_models), "hidden"
+        )
+        self.captures = {}
+        self.banks = {}
+        timers.configure(logger, args.timing_interval)
+        self.memory_monitor = MemoryMonitor(logger, Policy, args)
+        self.worker_monitor = WorkerMonitor(logger, train_environment, args)
+        self.profiler = make_profiler(
+            args, os.path.join(os.path.dirname(experiment_saved_models), "profile")
+        )
+        self.pbt = None
 
         self.best_score = -1000
 
     def save_video(self, step, N=2):
-        from torchvision.io import read_video
-        import time
-
-        episode_len = self.episode_len
-        env = VecVideoRecorder(
-            self.test_env,
-            self.experiment_videos,
-            record_video_trigger=lambda x: x == 0,
-            video_length=episode_len - 1,
-            name_prefix=f"{self.experiment_name}-{step}",
+        # only the trajectories are kept here, render_episodes.py turns them into videos
+        recorder = EpisodeRecorder()
+        run_episodes(
+            self.Policy,
+            self.video_env,
+            self.args.n_agents,
+            self.episode_len,
+            N,
+            recorder=recorder,
+        )
+        recorder.save(
+            os.path.join(
+                self.experiment_videos, "episodes", f"{self.experiment_name}-{int(step)}.npz"
+            ),
+            episodes=N,
         )
-
-        for _ in range(N):
-            obs = env.reset()
-            for i in range(episode_len - 1):
-                # time.sleep(0.5)
-                act = self.Policy.action_evaluate(obs, new_episode=i == 0)
-                obs, _, _, _ = env.step(act)
-
-        env.close()
 
     def score(self, step, env, prefix="dev"):
-        N = 50
-        end_rewards = []
-        mean_episode_reward = []
-        agent_end_reward = [[] for i in range(self.args.n_agents)]
-
-        n_agents = self.args.n_agents
-
-        comm = []
-        for _ in range(N):
-            obs = env.reset()
-            rewards = []
-            communication = []
-            for i in range(self.episode_len):
-                act = self.Policy.action_evaluate(obs, new_episode=i == 0)
-                # for i, a in enumerate(act):
-                communication.append(act // 5)
-                obs, reward, _, _ = env.step(act)
-                rewards.append(np.mean(reward))
-            comm.append(communication)
-            mean_episode_reward.append(np.sum(rewards))
-            end_rewards.append(reward)
-            for i, r in enumerate(reward):
-                agent_end_reward[i].append(r)
+        capture = self.hidden_capture(prefix, step)
+        rewards, comm, first_obs = run_episodes(
+            self.Policy,
+            env,
+            self.args.n_agents,
+            self.episode_len,
+            self.args.eval_episodes,
+            bank=self.eval_bank(prefix, env),
+        )
+        if capture is not None:
+            self.Policy.set_capture(None)
+            capture.flush()
+        metrics = episode_metrics(rewards)
+        end_reward = metrics["End_reward"]
 
         self.analyze_comms(comm, step, prefix)
-
-        self.logger.add_scalar(f"{prefix}/End_reward", np.mean(end_rewards), step)
+        if self.args.language_metrics:
+            lang = language_metrics(
+                comm,
+                first_obs,
+                self.args.action_space // 5,
+                self.args.env,
+                self.args.language_pairs,
+            )
+            log_language_metrics(self.logger, prefix, lang, step)
+
+        self.logger.add_scalar(f"{prefix}/End_reward", end_reward, step)
         self.logger.add_scalar(
-            f"{prefix}/Episode_return", np.mean(mean_episode_reward), step
+            f"{prefix}/Episode_return", metrics["Episode_return"], step
         )
 
-        for i, ereward in enumerate(agent_end_reward):
-            self.logger.add_scalar(f"{prefix}/agent_{i}", np.mean(ereward), step)
+        for i, ereward in enumerate(metrics["agent_end_rewards"]):
+            self.logger.add_scalar(f"{prefix}/agent_{i}", ereward, step)
 
-        if self.best_score < np.mean(end_rewards):
+        if self.best_score < end_reward:
             self.Policy.save_agents(self.experiment_saved_models)
-            self.best_score = np.mean(end_rewards)
+            self.best_score = end_reward
 
         env.close()
+        return end_reward
+
+    def eval_bank(self, tag, env):
+        if not self.args.eval_bank:
+            return None
+        if tag not in self.banks:
+            self.banks[tag] = EvaluationBank.for_env(
+                env,
+                os.path.dirname(self.experiment_saved_models),
+                tag,
+                self.args.eval_episodes,
+                self.args.seed,
+            )
+        return self.banks[tag]
+
+    def hidden_capture(self, tag, step):
+        # one capture per evaluation suite, appended to across the whole run
+        if self.args.capture_rate <= 0:
+            return None
+        if tag not in self.captures:
+            self.captures[tag] = HiddenCapture(
+                os.path.join(self.experiment_hidden, safe_name(tag)),
+                self.args.n_agents,
+                rate=self.args.capture_rate,
+                chunk_size=self.args.capture_chunk,
+                max_rows=self.args.capture_max_rows,
+                seed=self.args.seed,
+            )
+        capture = self.captures[tag]
+        capture.begin(step)
+        self.Policy.set_capture(capture)
+        return capture
 
     def analyze_comms(self, comms, step, prefix="dev"):
         comms = np.array(comms, dtype=int)  # 50, 25, 3
@@ -141,25 +199,29 @@ class ExperimentBuilder(nn.Module):
             asue = np.sum(comms_a != 0) / np.size(comms_a) * self.episode_len
             self.logger.add_scalar(f"{prefix}/symbols_per_ep_agent_{i}", asue, step)
 
-        episodes = 10
-        vocab = self.args.action_space // 5
-        array = comms[:episodes, :, :] + 1
-        dummy = np.zeros((episodes, self.episode_len, n_agents + 1), dtype=np.int)
-        dummy[:, :, :n_agents] = array
-        dummy = np.hstack([dummy[i] for i in range(episodes)])
-
-        pallete = [(0.7, 0.7, 0.7)] + sns.color_palette("crest", vocab)
-        labels = "**ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-        arrayShow = np.array([[pallete[i] for i in j] for j in dummy])
-        patches = [
-            mpatches.Patch(color=pallete[i], label=labels[i])
-            for i in range(1, vocab + 1)
-        ]
-
-        fig = plt.figure(figsize=(10, 10))
-        a = plt.imshow(arrayShow)
-        plt.legend(handles=patches, loc=5, borderaxespad=-5.0)
-        self.logger.add_figure("{prefix}/utterances", fig, step)
+        self.logger.add_image(
+            f"{prefix}/utterances", self.renderer.render(comms), step, dataformats="HWC"
+        )
+        if self.args.save_comms:
+            save_comms(self.experiment_comms, prefix, step, comms)
+
+    def evaluate(self, step, score, vid):
+        if self.evaluator is not None:
+            if (step) % (score) == 0 or (self.args.video and (step) % vid == 0):
+                self.evaluator.submit(step, score, vid, self.Policy)
+            return
+
+        if (step) % (score) == 0:
+            with timers.phase("score"):
+                end_reward = self.score(step, self.test_env)
+                if self.test_all_env is not None:
+                    self.score(step, self.test_all_env, prefix="dev_all")
+            if self.pbt is not None and step > 0:
+                self.pbt.ready(step, end_reward, self.Policy)
+
+        if self.args.video and (step) % vid == 0:
+            with timers.phase("save_video"):
+                self.save_video(step)
 
     def run_experiment(self):
 
@@ -173,21 +235,36 @@ class ExperimentBuilder(nn.Module):
             math.ceil((self.steps / 50) / self.args.episode_len) * self.args.episode_len
         )
 
-        for step in tqdm(range(0, self.steps + 1), position=1):
-            if (step) % (score) == 0:
-                self.score(step, self.test_env)
-                if self.test_all_env is not None:
-                    self.score(step, self.test_all_env, prefix="dev_all")
-
-            if self.args.video and (step) % vid == 0:
-                self.save_video(step)
-
-            new_episode = (step % self.args.episode_len) == 0
-            actions = self.Policy.action(observation, new_episode=new_episode)
-
-            observation, rewards, dones, infos = self.train_env.step(actions)
-
-            self.Policy.store(step, observation, rewards, dones)
+        with self.profiler:
+            if self.actor_learner is not None:
+                self.actor_learner.run(self, score, vid)
+            else:
+                for step in tqdm(range(0, self.steps + 1), position=1):
+                    self.evaluate(step, score, vid)
+
+                    new_episode = (step % self.args.episode_len) == 0
+                    with timers.phase("action"):
+                        actions = self.Policy.action(
+                            observation, new_episode=new_episode
+                        )
+
+                    with timers.phase("env_step"):
+                        observation, rewards, dones, infos = self.train_env.step(
+                            actions
+                        )
+
+                    with timers.phase("store"):
+                        self.Policy.store(step, observation, rewards, dones)
+                    timers.tick(step)
+                    self.memory_monitor.tick(step)
+                    self.worker_monitor.tick(step)
+                    self.profiler.step()
+
+        if self.args.perf_store:
+            record_training(self.args.perf_store, self.args)
+
+        if self.evaluator is not None:
+            self.evaluator.close(self.Policy)
 
         if self.args.video:
             self.save_video(1e6, N=10)
@@ -6,14 +6,12 @@ from tqdm import tqdm
 from stable_baselines3.common.vec_env import VecVideoRecorder, DummyVecEnv
 from torch.utils.tensorboard import SummaryWriter
 from framework.utils.base import base_policy
+from framework.utils.utterance_render import UtteranceRenderer, save_comms
 import shutil
 import numpy as np
 import sys
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 import numpy as np
 import io
-import seaborn as sns
 import math
 
 
@@ -52,6 +50,10 @@ class ExperimentBuilderIteratedCont(nn.Module):
         self.pair_name = f"|{agent_names[0]}-{agent_names[1]}|"
 
         self.logger = logger
+        self.renderer = UtteranceRenderer(args.action_space - 5, episode_len)
+        self.experiment_comms = os.path.join(
+            os.path.dirname(experiment_saved_models), "comms"
+        )
 
         self.best_score = -1000
 
@@ -157,26 +159,14 @@ class ExperimentBuilderIteratedCont(nn.Module):
                 f"{prefix}_{self.pair_name}/symbols_per_ep_agent_{i}", asue, step
             )
 
-        episodes = 10
-        vocab = self.args.action_space - 5
-        array = comms[:episodes, :, :] + 1
-        dummy = np.zeros((episodes, self.episode_len, n_agents + 1), dtype=np.int)
-        dummy[:, :, :n_agents] = array
-        dummy = np.hstack([dummy[i] for i in range(episodes)])
-
-        print(vocab, dummy.shape)
-        pallete = [(0.7, 0.7, 0.7)] + sns.color_palette("crest", vocab)
-        labels = "**ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-        arrayShow = np.array([[pallete[i] for i in j] for j in dummy])
-        patches = [
-            mpatches.Patch(color=pallete[i], label=labels[i])
-            for i in range(1, vocab + 1)
-        ]
-
-        fig = plt.figure(figsize=(10, 10))
-        a = plt.imshow(arrayShow)
-        plt.legend(handles=patches, loc=5, borderaxespad=-5.0)
-        self.logger.add_figure(f"{prefix}_{self.pair_name}/utterances", fig, step)
+        self.logger.add_image(
+            f"{prefix}_{self.pair_name}/utterances",
+            self.renderer.render(comms),
+            step,
+            dataformats="HWC",
+        )
+        if self.args.save_comms:
+            save_comms(self.experiment_comms, f"{prefix}_{self.pair_name}", step, comms)
 
     def run_experiment(self):
 
@@ -0,0 +1,246 @@
+import copy
+import json
+import os
+import random
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from torch.utils.tensorboard import SummaryWriter
+from framework.utils.metrics import make_logger
+from framework.utils.arg_extractor import set_num_envs
+from framework.utils.base import missing_methods
+
+# initial grid, taken from the experiments.sh sweeps
+search_space = {
+    "learning_rate": [2.5e-4, 7e-4, 1e-3],
+    "max_grad_norm": [0.5, 10],
+    "hidden_size": [64, 128, 256],
+    "update_epochs": [4, 10],
+}
+
+
+def sample_hparams():
+    return {k: random.choice(v) for k, v in search_space.items()}
+
+
+def perturb(hparams):
+    # hidden_size is inherited from the donor, its weights only fit that shape.
+    hparams = dict(hparams)
+    hparams["learning_rate"] *= random.choice([0.8, 1.2])
+    hparams["max_grad_norm"] *= random.choice([0.8, 1.2])
+    hparams["update_epochs"] = int(
+        np.clip(hparams["update_epochs"] + random.choice([-1, 1]), 1, 20)
+    )
+    return hparams
+
+
+def to_cpu(states):
+    return [
+        {k: v.cpu() if isinstance(v, torch.Tensor) else v for k, v in state.items()}
+        for state in states
+    ]
+
+
+class PBTMember:
+    """
+    Member side of the scheduler, called by ExperimentBuilder at every score interval.
+    Blocks until the controller answers with either nothing or a donor to copy.
+    """
+
+    def __init__(self, conn, args):
+        self.conn = conn
+        self.args = args
+
+    def hparams(self):
+        return {k: getattr(self.args, k) for k in search_space}
+
+    def ready(self, step, score, Policy):
+        self.conn.send(
+            dict(
+                step=step,
+                score=float(score),
+                hparams=self.hparams(),
+                states=to_cpu(Policy.state_dicts()),
+                optimizer_states=[
+                    copy.deepcopy(state) for state in Policy.optimizer_state_dicts()
+                ],
+            )
+        )
+        reply = self.conn.recv()
+        if reply is None:
+            return
+
+        for k, v in reply["hparams"].items():
+            setattr(self.args, k, v)
+        Policy.exploit(reply["states"], reply["optimizer_states"])
+
+
+def member_main(k, args, hparams, conn, member_folder):
+    from framework.environments import make_eval_env, make_train_env
+    from framework.experiment_builder import ExperimentBuilder
+    from framework.policy import policies_dic
+
+    torch.set_num_threads(1)
+    random.seed(args.seed + k)
+    np.random.seed(args.seed + k)
+    torch.manual_seed(args.seed + k)
+    for key, v in hparams.items():
+        setattr(args, key, v)
+
+    logger = make_logger(args, os.path.join(member_folder, "result_outputs"))
+
+    # batched like run.py, the score of every interval plays eval_envs episodes at once
+    eval_env = make_eval_env(args.env, args.eval_envs)
+    train_env = make_train_env(args.env, args.num_envs, args.member_cpus)
+    train_env.seed(args.seed + k)
+    train_env.reset()
+
+    Policy = policies_dic[args.model](args, logger)
+    exp = ExperimentBuilder(
+        args=args,
+        train_environment=train_env,
+        test_environment=eval_env,
+        Policy=Policy,
+        experiment_name=f"member_{k}",
+        logfolder=os.path.join(member_folder, "videos"),
+        experiment_saved_models=os.path.join(member_folder, "saved_models"),
+        videofolder=os.path.join(member_folder, "videos"),
+        episode_len=args.episode_len,
+        steps=args.total_timesteps,
+        logger=logger,
+    )
+    exp.pbt = PBTMember(conn, args)
+    exp.run_experiment()
+
+    conn.send(None)
+    train_env.close()
+    eval_env.close()
+    logger.close()
+
+
+class PBTScheduler:
+    """
+    Runs args.population members concurrently, each with its share of args.pbt_cores for its
+    env workers. At every score interval the bottom pbt_quantile members copy the weights and
+    optimizer state of a random top member, in memory, and perturb its hyperparameters.
+    """
+
+    def __init__(self, args, experiment_folder, logger: SummaryWriter):
+        from framework.policy import policies_dic
+
+        # fail here rather than in a member process at its first exploit
+        missing = missing_methods(
+            policies_dic[args.model],
+            "state_dicts",
+            "load_state_dicts",
+            "optimizer_state_dicts",
+            "load_optimizer_state_dicts",
+            "exploit",
+        )
+        if missing:
+            raise ValueError(f"pbt needs {', '.join(missing)}, which {args.model} lacks")
+        if args.async_eval:
+            # the asynchronous evaluator's scores never reach PBTMember.ready
+            raise ValueError("pbt scores every member in its own loop, drop --async-eval")
+        if args.dp_workers > 1:
+            # an exploit that rebuilds the agent drops its reducer, the peer ranks would hang
+            raise ValueError("pbt members train in a single process, drop --dp-workers")
+        if args.actors or args.rollout_workers or args.rollout_port is not None:
+            # the actors' weight versions would not follow an exploit
+            raise ValueError("pbt members collect their own rollouts, drop --actors and --rollout-*")
+        self.args = args
+        self.experiment_folder = experiment_folder
+        self.logger = logger
+        self.population = args.population
+        self.lineage_file = os.path.join(experiment_folder, "lineage.jsonl")
+
+    def member_args(self):
+        cores = self.args.pbt_cores or max(1, os.cpu_count() - 1)
+        member_cores = max(1, cores // self.population)
+        args = copy.copy(self.args)
+        args.video = False
+        args.member_cpus = member_cores
+        # same sizing rule as get_args, applied to this member's share of the cores
+        return set_num_envs(args, member_cores + 2)
+
+    def log_lineage(self, record):
+        with open(self.lineage_file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def run(self):
+        ctx = mp.get_context("spawn")
+        args = self.member_args()
+        conns, members = [], []
+        hparams = [sample_hparams() for _ in range(self.population)]
+
+        for k in range(self.population):
+            member_folder = os.path.join(self.experiment_folder, f"member_{k}")
+            for sub in ["result_outputs", "saved_models", "videos"]:
+                os.makedirs(os.path.join(member_folder, sub), exist_ok=True)
+            parent, child = ctx.Pipe()
+            p = ctx.Process(
+                target=member_main,
+                args=(k, copy.copy(args), hparams[k], child, member_folder),
+            )
+            p.start()
+            conns.append(parent)
+            members.append(p)
+            self.log_lineage(dict(step=0, member=k, donor=None, hparams=hparams[k]))
+
+        alive = set(range(self.population))
+        best = dict(hparams=hparams[0])
+        while alive:
+            reports = {}
+            for k in sorted(alive):
+                msg = conns[k].recv()
+                if msg is None:
+                    alive.discard(k)
+                else:
+                    reports[k] = msg
+            if not reports:
+                break
+
+            step = max(r["step"] for r in reports.values())
+            ranked = sorted(reports, key=lambda k: reports[k]["score"])
+            n = max(1, int(len(ranked) * self.args.pbt_quantile))
+            bottom, top = ranked[:n], ranked[-n:]
+
+            for k, r in reports.items():
+                self.logger.add_scalar(f"pbt/member_{k}/End_reward", r["score"], step)
+                for name, v in r["hparams"].items():
+                    self.logger.add_scalar(f"pbt/member_{k}/{name}", v, step)
+            self.logger.add_scalar(
+                "pbt/best_End_reward", reports[ranked[-1]]["score"], step
+            )
+            best = reports[ranked[-1]]
+
+            for k in reports:
+                if k in bottom and len(ranked) > 1:
+                    donor = random.choice(top)
+                    new_hparams = perturb(reports[donor]["hparams"])
+                    conns[k].send(
+                        dict(
+                            hparams=new_hparams,
+                            states=reports[donor]["states"],
+                            optimizer_states=reports[donor]["optimizer_states"],
+                        )
+                    )
+                    self.log_lineage(
+                        dict(
+                            step=step,
+                            member=k,
+                            donor=donor,
+                            score=reports[k]["score"],
+                            donor_score=reports[donor]["score"],
+                            hparams=new_hparams,
+                        )
+                    )
+                else:
+                    conns[k].send(None)
+
+        for p in members:
+            p.join()
+
+        self.logger.add_text("pbt/best_hparams", json.dumps(best["hparams"]))
+        print(f"Best hyperparameters: {best['hparams']}, lineage in {self.lineage_file}")
+        return best["hparams"]
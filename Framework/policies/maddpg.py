@@ -8,6 +8,7 @@ import torch.nn.functional as F
 import torch.optim as optim
 import numpy as np
 from framework.utils.base import base_policy
+from framework.utils.memory import replay_plan
 
 
 class maddpg_policy(base_policy):
@@ -42,7 +43,25 @@ class maddpg_policy(base_policy):
         )
 
         self.memory = MultiAgentReplayBuffer(
-            1000000, critic_dims, actor_dims, action_space[0], n_agents, batch_size=1024
+            args.replay_size,
+            critic_dims,
+            actor_dims,
+            action_space[0],
+            n_agents,
+            batch_size=1024,
+        )
+
+    @staticmethod
+    def memory_plan(args):
+        size = args.obs_space[0]
+        return dict(
+            replay_buffer=replay_plan(
+                args.replay_size,
+                size * args.n_agents,
+                [size] * args.n_agents,
+                args.action_space,
+                args.n_agents,
+            )
         )
 
     def action(self, observation, evaluate=False):
@@ -260,9 +260,7 @@ class Agent:
                     # calculate approx_kl http://joschu.net/blog/kl-approx.html
                     # old_approx_kl = (-logratio).mean()
                     approx_kl = ((ratio - 1) - logratio).mean()
-                    clipfracs += [
-                        ((ratio - 1.0).abs() > args.clip_coef).float().mean().item()
-                    ]
+                    clipfracs += [((ratio - 1.0).abs() > args.clip_coef).float().mean()]
 
                 mb_advantages = b_advantages[mb_inds]
                 if args.norm_adv:
@@ -297,23 +295,25 @@ class Agent:
                 nn.utils.clip_grad_norm_(self.ppo.parameters(), args.max_grad_norm)
                 self.optimizer.step()
 
-        y_pred, y_true = b_values.cpu().numpy(), b_returns.cpu().numpy()
-        var_y = np.var(y_true)
-        explained_var = np.nan if var_y == 0 else 1 - np.var(y_true - y_pred) / var_y
-
-        y_pred, y_true = b_values.cpu().numpy(), b_returns.cpu().numpy()
-        var_y = np.var(y_true)
-        explained_var = np.nan if var_y == 0 else 1 - np.var(y_true - y_pred) / var_y
+        # kept on the device, the metrics sink copies them to the host off the training thread
+        y_pred, y_true = b_values.reshape(-1), b_returns.reshape(-1)
+        var_y = torch.var(y_true, unbiased=False)
+        explained_var = torch.where(
+            var_y == 0,
+            torch.full_like(var_y, np.nan),
+            1 - torch.var(y_true - y_pred, unbiased=False) / var_y,
+        )
 
         # TRY NOT TO MODIFY: record rewards for plotting purposes
         self.writer.add_scalar(
             "charts/learning_rate", self.optimizer.param_groups[0]["lr"], global_step
         )
-        self.writer.add_scalar("losses/value_loss", v_loss.item(), global_step)
-        self.writer.add_scalar("losses/policy_loss", pg_loss.item(), global_step)
-        self.writer.add_scalar("losses/entropy", entropy_loss.item(), global_step)
-        self.writer.add_scalar("losses/approx_kl", approx_kl.item(), global_step)
-        self.writer.add_scalar("losses/clipfrac", np.mean(clipfracs), global_step)
+        self.writer.add_scalar("losses/value_loss", v_loss.detach(), global_step)
+        self.writer.add_scalar("losses/policy_loss", pg_loss.detach(), global_step)
+        self.writer.add_scalar("losses/entropy", entropy_loss.detach(), global_step)
+        self.writer.add_scalar("losses/approx_kl", approx_kl, global_step)
+        clipfrac = torch.stack(clipfracs).mean()
+        self.writer.add_scalar("losses/clipfrac", clipfrac, global_step)
         self.writer.add_scalar("losses/explained_variance", explained_var, global_step)
         # print("SPS:", int(global_step / (time.time() - start_time)))
         # self.writer.add_scalar(
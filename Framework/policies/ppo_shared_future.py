@@ -16,6 +16,7 @@ from framework.utils.base import base_policy, Args
 from pettingzoo import ParallelEnv
 from framework.model_arc import ACNetwork
 from framework.utils.base import base_policy
+from framework.utils.memory import ppo_rollout_plan, ppo_rows, network_plan
 from torch.utils.tensorboard import SummaryWriter
 
 
@@ -31,6 +32,14 @@ class ppo_shared_future(base_policy):
     def save_agents(self, PATH):
         self.agent.save(PATH)
 
+    @staticmethod
+    def memory_plan(args):
+        network = NNN(args.obs_space, args.n_agents, args.action_space, args.hidden_size)
+        return dict(
+            rollout_buffer=ppo_rollout_plan(args, ppo_rows(args)),
+            network=network_plan(network),
+        )
+
     def load_agents(self, PATH):
         self.agent.load(PATH)
 
@@ -595,9 +604,7 @@ class Agent:
                 # if approx_kl > 0.02:
                 #     print("too large kl", epoch)
                 #     break
-                clipfracs += [
-                    ((ratio - 1.0).abs() > args.clip_coef).float().mean().item()
-                ]
+                clipfracs += [((ratio - 1.0).abs() > args.clip_coef).float().mean()]
 
             if args.norm_adv:
                 b_advantages = (b_advantages - b_advantages.mean()) / (
@@ -635,24 +642,26 @@ class Agent:
             nn.utils.clip_grad_norm_(self.ppo.parameters(), args.max_grad_norm)
             self.optimizer.step()
 
-        y_pred, y_true = (
-            b_values.reshape(-1).cpu().numpy(),
-            b_returns.reshape(-1).cpu().numpy(),
+        # kept on the device, the metrics sink copies them to the host off the training thread
+        y_pred, y_true = b_values.reshape(-1), b_returns.reshape(-1)
+        var_y = torch.var(y_true, unbiased=False)
+        explained_var = torch.where(
+            var_y == 0,
+            torch.full_like(var_y, np.nan),
+            1 - torch.var(y_true - y_pred, unbiased=False) / var_y,
         )
-        var_y = np.var(y_true)
-        explained_var = np.nan if var_y == 0 else 1 - np.var(y_true - y_pred) / var_y
 
         div_term = args.update_epochs
 
         self.writer.add_scalar(
-            f"losses/value_loss", total_v_loss.item() / div_term, global_step
+            f"losses/value_loss", total_v_loss.detach() / div_term, global_step
         )
         self.writer.add_scalar(
-            f"losses/policy_loss", total_pg_loss.item() / div_term, global_step
+            f"losses/policy_loss", total_pg_loss.detach() / div_term, global_step
         )
-        self.writer.add_scalar(f"losses/entropy", entropy_loss.item(), global_step)
-        self.writer.add_scalar(f"losses/approx_kl", approx_kl.item(), global_step)
-        self.writer.add_scalar(f"losses/clipfrac", np.mean(clipfracs), global_step)
+        self.writer.add_scalar(f"losses/entropy", entropy_loss.detach(), global_step)
+        self.writer.add_scalar(f"losses/approx_kl", approx_kl, global_step)
+        self.writer.add_scalar(f"losses/clipfrac", torch.stack(clipfracs).mean(), global_step)
         self.writer.add_scalar(f"losses/explained_variance", explained_var, global_step)
         # self.writer.add_scalar(f"losses/Floss", floss, global_step)
 
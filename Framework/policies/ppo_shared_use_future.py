@@ -16,6 +16,12 @@ from framework.utils.base import base_policy, Args
 from pettingzoo import ParallelEnv
 from framework.model_arc import ACNetwork
 from framework.utils.base import base_policy
+from framework.utils.vtrace import vtrace_returns
+from framework.utils.data_parallel import SingleProcessReducer, start_data_parallel
+from framework.utils.rollout_stats import RolloutStats
+from framework.utils.timing import timers
+from framework.utils.memory import ppo_rollout_plan, ppo_rows, network_plan
+from functools import partial
 from torch.utils.tensorboard import SummaryWriter
 
 
@@ -28,12 +34,47 @@ class ppo_shared_use_future(base_policy):
         self.n_agents = args.n_agents
         self.idx_starts = np.array([i * args.n_agents for i in range(0, args.num_envs)])
 
+        self.stats = RolloutStats(args, writer) if args.stats_interval else None
+
+        if args.dp_workers > 1:
+            self.agent.reducer = start_data_parallel(
+                self.agent, partial(Agent, args, None), args.dp_workers
+            )
+
     def save_agents(self, PATH):
         self.agent.save(PATH)
 
+    def close(self):
+        self.agent.reducer.close()
+
     def load_agents(self, PATH):
         self.agent.load(PATH)
 
+    def state_dicts(self):
+        return [self.agent.ppo.state_dict()]
+
+    def load_state_dicts(self, states):
+        self.agent.ppo.load_state_dict(states[0])
+
+    def optimizer_state_dicts(self):
+        return [self.agent.optimizer.state_dict()]
+
+    def load_optimizer_state_dicts(self, states):
+        self.agent.optimizer.load_state_dict(states[0])
+
+    def exploit(self, states, optimizer_states):
+        # args already holds the new hyperparameters, rebuild when the donor's shapes differ.
+        if self.agent.ppo.hidden_size != self.args.hidden_size:
+            self.agent = Agent(self.args, self.agent.writer)
+        self.load_state_dicts(states)
+        self.load_optimizer_state_dicts(optimizer_states)
+        for group in self.agent.optimizer.param_groups:
+            group["lr"] = self.args.learning_rate
+        # the partial rollout was collected by the old weights, PPO ratios need the new ones
+        self.agent.memory.clear_memory()
+        if self.stats is not None:
+            self.stats.reset()
+
     def get_critic_obs(self, observations):
         val_obs_ = T.tensor(observations).reshape(self.args.num_envs, self.n_agents, -1)
         val_obs = T.zeros(
@@ -48,7 +89,7 @@ class ppo_shared_use_future(base_policy):
                 full_obs.append(val_obs_[av][(k + an) % self.n_agents])
             val_obs[i] = T.hstack(full_obs)
 
-        val_obs = val_obs.to("cuda")
+        val_obs = val_obs.to(self.args.device)
         return val_obs
 
     def action(self, observations, new_episode=False, **kwargs):
@@ -58,10 +99,13 @@ class ppo_shared_use_future(base_policy):
                 self.agent.ppo.init_hidden(observations.shape[0])
             # print(self.agent.ppo.actor_hidden[0][0])
             self.to_remember = []
-            val_obs = self.get_critic_obs(observations)
-            obs = T.tensor(observations, dtype=T.float, device="cuda")
+            with timers.phase("action/critic_obs"):
+                val_obs = self.get_critic_obs(observations)
+            with timers.phase("action/to_tensor"):
+                obs = T.tensor(observations, dtype=T.float, device=self.args.device)
 
-            (action_p, actions, value) = self.agent.choose_action(obs, val_obs)
+            with timers.phase("action/forward"):
+                (action_p, actions, value) = self.agent.choose_action(obs, val_obs)
             actions = actions.squeeze()
             action_p = action_p.squeeze()
             value = value.squeeze()
@@ -73,20 +117,38 @@ class ppo_shared_use_future(base_policy):
             return actions.numpy()
 
     def action_evaluate(self, observations, new_episode):
-        obs_batch = T.tensor(observations, dtype=T.float, device="cuda")
+        obs_batch = T.tensor(observations, dtype=T.float, device=self.args.device)
+        capture = self.agent.ppo.capture
         if new_episode:
             self.agent.ppo.eval()
             self.agent.ppo.init_hidden(observations.shape[0])
+            if capture is not None:
+                capture.new_episode()
         actions = self.agent.choose_action_evaluate(obs_batch)
         # actions = actions.squeeze()
         # print(actions)
+        if capture is not None:
+            capture.advance()
 
         return actions[0].numpy()
 
+    def set_capture(self, capture):
+        self.agent.ppo.capture = capture
+
+    @staticmethod
+    def memory_plan(args):
+        network = NNN(args.obs_space, args.n_agents, args.action_space, args.hidden_size)
+        return dict(
+            rollout_buffer=ppo_rollout_plan(args, ppo_rows(args)),
+            network=network_plan(network),
+        )
+
     def store(self, total_steps, obs, rewards, dones):
 
         done = T.Tensor(dones)
         reward = T.tensor(rewards)
+        if self.stats is not None:
+            self.stats.update(total_steps, self.to_remember[3], reward)
         self.agent.remember(
             self.to_remember[0],  # obs
             self.to_remember[1],  # valobs
@@ -118,13 +180,13 @@ class PPOTrainer:
         self.clear_memory()
 
     def create_training_data(self):
-        b_obs = self.obs.to("cuda")
-        b_val_obs = self.valobs.to("cuda")
-        b_logprobs = self.logprobs.to("cuda")
-        b_actions = self.actions.to("cuda")
-        b_advantages = self.advantages.to("cuda")
-        b_returns = self.returns.to("cuda")
-        b_values = self.values.to("cuda")
+        b_obs = self.obs.to(self.args.device)
+        b_val_obs = self.valobs.to(self.args.device)
+        b_logprobs = self.train_logprobs.to(self.args.device)
+        b_actions = self.actions.to(self.args.device)
+        b_advantages = self.advantages.to(self.args.device)
+        b_returns = self.returns.to(self.args.device)
+        b_values = self.train_values.to(self.args.device)
         
         return b_obs, b_val_obs, b_logprobs, b_actions, b_advantages, b_returns, b_values
 
@@ -173,17 +235,40 @@ class PPOTrainer:
 
         self.returns = returns
         self.advantages = advantages
+        self.train_logprobs, self.train_values = self.logprobs, self.values
+
+    def calculate_vtrace_returns(self, target_logprobs, target_values):
+        # off-policy correction for rollouts collected by lagging actors,
+        # the ppo ratio is then taken against the learner's own policy.
+        self.returns, self.advantages = vtrace_returns(
+            self.logprobs, target_logprobs, self.rewards, target_values, self.dones, self.gamma
+        )
+        # kept out of the shared arena, every data parallel rank reads the behaviour
+        # logprobs from it and must not see another rank's targets
+        self.train_logprobs, self.train_values = target_logprobs, target_values
+
+    def arena(self):
+        return dict(obs=self.obs, valobs=self.valobs, logprobs=self.logprobs, actions=self.actions, values=self.values, rewards=self.rewards, dones=self.dones)
+
+    def attach(self, arena):
+        # share the rollout arena with other processes, tensors are then only zeroed in place.
+        for k, v in arena.items():
+            setattr(self, k, v.share_memory_())
 
     def clear_memory(self):
-        space = (self.num_steps, self.num_envs * self.args.n_agents * self.args.learn_n)
-
-        self.obs = T.zeros(space + self.obs_space)
-        self.valobs = T.zeros(space + (self.obs_space[0]*self.args.n_agents,))
-        self.logprobs = T.zeros(space)
-        self.actions = T.zeros(space)
-        self.values = T.zeros(space)
-        self.rewards = T.zeros(space)
-        self.dones = T.zeros(space)
+        if not hasattr(self, "obs"):
+            space = (self.num_steps, self.num_envs * self.args.n_agents * self.args.learn_n)
+
+            self.obs = T.zeros(space + self.obs_space)
+            self.valobs = T.zeros(space + (self.obs_space[0]*self.args.n_agents,))
+            self.logprobs = T.zeros(space)
+            self.actions = T.zeros(space)
+            self.values = T.zeros(space)
+            self.rewards = T.zeros(space)
+            self.dones = T.zeros(space)
+        else:
+            for buffer in self.arena().values():
+                buffer.zero_()
         self.counter = 0
         self.cn = 0
 # fmt:on
@@ -552,12 +637,16 @@ class NNN(nn.Module):
             layer_init(nn.Linear(layer_filters, inp_hid_size), std=0.01),
         )
 
+        # set by the policy during evaluation, see framework.utils.hidden_capture
+        self.capture = None
+        self.capture_agent = None
+
     def init_hidden(self, batch_size=1):
         self.actor_hidden = T.zeros(self.gru_layers, batch_size, self.hidden_size).to(
-            "cuda"
+            self.critic[0].weight.device
         )
         self.critic_hidden = T.zeros(self.gru_layers, batch_size, self.hidden_size).to(
-            "cuda"
+            self.critic[0].weight.device
         )
 
     def get_hidden(self, x):
@@ -582,17 +671,21 @@ class NNN(nn.Module):
     #     return value
 
     def get_action(self, x, value=False):
-        out, self.actor_hidden = self.gru(x, self.actor_hidden)
-        out = self.common(out)
+        hidden, self.actor_hidden = self.gru(x, self.actor_hidden)
+        out = self.common(hidden)
         future = self.future(out)
 
         if value:
             val = self.critic(out)
+        common = out
         out = torch.concat([out, future], dim=2)
         logits = self.action(out)
         probs = Categorical(logits=logits)
         action = probs.sample()
 
+        if self.capture is not None:
+            self.capture.record(hidden, common, action, self.capture_agent)
+
         if value:
             return action, probs, future, val
 
@@ -633,6 +726,7 @@ class Agent:
         self.optimizer = optim.Adam(
             self.ppo.parameters(), lr=args.learning_rate, eps=1e-5
         )
+        self.reducer = SingleProcessReducer()
 
     # fmt:off
     def remember(self, observations, val_obs, action_p, action, vals, reward, done):
@@ -679,11 +773,31 @@ class Agent:
                 value.cpu(),
             )
 
+    def evaluate_memory(self):
+        with torch.no_grad():
+            b_obs = self.memory.obs.to(self.args.device)
+            b_val_obs = self.memory.valobs.to(self.args.device)
+            b_actions = self.memory.actions.to(self.args.device)
+            self.ppo.init_hidden(b_obs.shape[1])
+            (_, logprob, _, value, _) = self.ppo.get_action_and_value(
+                b_obs, b_val_obs, b_actions.long()
+            )
+            return logprob.cpu(), value.squeeze().cpu()
+
     def learn(self, global_step):
+        self.reducer.begin(global_step)
+        with timers.phase("store/learn"):
+            self.update(global_step)
+
+    def update(self, global_step):
         self.ppo.train()
 
         args = self.args
-        self.memory.calculate_returns()
+        with timers.phase("store/learn/returns"):
+            if args.actors:
+                self.memory.calculate_vtrace_returns(*self.evaluate_memory())
+            else:
+                self.memory.calculate_returns()
         clipfracs = []
 
         (
@@ -694,13 +808,13 @@ class Agent:
             b_advantages,
             b_returns,
             b_values,
-        ) = self.memory.create_training_data()
+        ) = self.reducer.shard(self.memory.create_training_data())
 
         total_pg_loss = 0
         total_v_loss = 0
-        mseloss = torch.nn.MSELoss()
 
         for epoch in range(args.update_epochs):
+            forward = timers.start("store/learn/forward")
             self.ppo.init_hidden(b_obs.shape[1])
             self.optimizer.zero_grad()
 
@@ -716,31 +830,29 @@ class Agent:
             # n = 3
             # futures = self.ppo.get_futures(b_obs, n)
             floss = 0
-            floss = mseloss(b_obs[1:], future[:-1])
+            floss = self.reducer.mean((b_obs[1:] - future[:-1]) ** 2)
             # for i in range(n):
             #     floss += mseloss(b_obs[i + 1 :], futures[i][: -i - 1])
 
             with torch.no_grad():
                 # calculate approx_kl http://joschu.net/blog/kl-approx.html
                 # old_approx_kl = (-logratio).mean()
-                approx_kl = ((ratio - 1) - logratio).mean()
+                approx_kl = self.reducer.mean((ratio - 1) - logratio)
                 # if approx_kl > 0.02:
                 #     print("too large kl", epoch)
                 #     break
                 clipfracs += [
-                    ((ratio - 1.0).abs() > args.clip_coef).float().mean().item()
+                    self.reducer.mean(((ratio - 1.0).abs() > args.clip_coef).float())
                 ]
 
             if args.norm_adv:
-                b_advantages = (b_advantages - b_advantages.mean()) / (
-                    b_advantages.std() + 1e-8
-                )
+                b_advantages = self.reducer.normalize(b_advantages)
 
             pg_loss1 = -b_advantages * ratio
             pg_loss2 = -b_advantages * torch.clamp(
                 ratio, 1 - args.clip_coef, 1 + args.clip_coef
             )
-            pg_loss = torch.max(pg_loss1, pg_loss2).mean()
+            pg_loss = self.reducer.mean(torch.max(pg_loss1, pg_loss2))
             total_pg_loss += pg_loss
             if args.clip_vloss:
                 v_loss_unclipped = (newvalue - b_returns) ** 2
@@ -751,38 +863,59 @@ class Agent:
                 )
                 v_loss_clipped = (v_clipped - b_returns) ** 2
                 v_loss_max = torch.max(v_loss_unclipped, v_loss_clipped)
-                v_loss = 0.5 * v_loss_max.mean()
+                v_loss = 0.5 * self.reducer.mean(v_loss_max)
             else:
-                v_loss = 0.5 * ((newvalue - b_returns) ** 2).mean()
+                v_loss = 0.5 * self.reducer.mean((newvalue - b_returns) ** 2)
             total_v_loss += v_loss
 
-            entropy_loss = entropy.mean()
+            entropy_loss = self.reducer.mean(entropy)
             loss = (
                 pg_loss - args.ent_coef * entropy_loss + v_loss * args.vf_coef + floss
             )
-
-            loss.backward()
-            nn.utils.clip_grad_norm_(self.ppo.parameters(), args.max_grad_norm)
-            self.optimizer.step()
-
-        y_pred, y_true = (
-            b_values.reshape(-1).cpu().numpy(),
-            b_returns.reshape(-1).cpu().numpy(),
+            timers.stop(forward)
+
+            with timers.phase("store/learn/backward"):
+                loss.backward()
+                self.reducer.all_reduce_grads(self.ppo.parameters())
+            with timers.phase("store/learn/optimizer"):
+                nn.utils.clip_grad_norm_(self.ppo.parameters(), args.max_grad_norm)
+                self.optimizer.step()
+
+        # every rank holds its share of the means, all of them take part in the sum
+        clipfrac = torch.stack(clipfracs).mean()
+        losses = [total_v_loss, total_pg_loss, entropy_loss, approx_kl, clipfrac, floss]
+        (
+            total_v_loss,
+            total_pg_loss,
+            entropy_loss,
+            approx_kl,
+            clipfrac,
+            floss,
+        ) = self.reducer.all_reduce_scalars(losses)
+        if self.reducer.rank != 0:
+            return
+
+        # kept on the device, the metrics sink copies them to the host off the training thread
+        y_pred = self.memory.train_values.reshape(-1)
+        y_true = self.memory.returns.reshape(-1)
+        var_y = torch.var(y_true, unbiased=False)
+        explained_var = torch.where(
+            var_y == 0,
+            torch.full_like(var_y, np.nan),
+            1 - torch.var(y_true - y_pred, unbiased=False) / var_y,
         )
-        var_y = np.var(y_true)
-        explained_var = np.nan if var_y == 0 else 1 - np.var(y_true - y_pred) / var_y
 
         div_term = args.update_epochs
 
         self.writer.add_scalar(
-            f"losses/value_loss", total_v_loss.item() / div_term, global_step
+            f"losses/value_loss", total_v_loss.detach() / div_term, global_step
         )
         self.writer.add_scalar(
-            f"losses/policy_loss", total_pg_loss.item() / div_term, global_step
+            f"losses/policy_loss", total_pg_loss.detach() / div_term, global_step
         )
-        self.writer.add_scalar(f"losses/entropy", entropy_loss.item(), global_step)
-        self.writer.add_scalar(f"losses/approx_kl", approx_kl.item(), global_step)
-        self.writer.add_scalar(f"losses/clipfrac", np.mean(clipfracs), global_step)
+        self.writer.add_scalar(f"losses/entropy", entropy_loss.detach(), global_step)
+        self.writer.add_scalar(f"losses/approx_kl", approx_kl, global_step)
+        self.writer.add_scalar(f"losses/clipfrac", clipfrac, global_step)
         self.writer.add_scalar(f"losses/explained_variance", explained_var, global_step)
         self.writer.add_scalar(f"losses/Floss", floss, global_step)
 
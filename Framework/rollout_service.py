@@ -0,0 +1,277 @@
+import copy
+import hashlib
+import hmac
+import ipaddress
+import os
+import pickle
+import secrets
+import socket
+import struct
+import threading
+import time
+import uuid
+import zlib
+import numpy as np
+import torch
+
+
+class AuthenticationError(Exception):
+    pass
+
+
+def rollout_key(args):
+    """
+    Shared secret of the rollout service: --rollout-key, else $ROLLOUT_KEY, else a fresh
+    random key, which only the localhost workers started by the trainer can know.
+    """
+    key = args.rollout_key or os.environ.get("ROLLOUT_KEY")
+    return key.encode() if key else secrets.token_hex(32).encode()
+
+
+def is_loopback(host):
+    return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+
+
+def signature(key, payload):
+    return hmac.new(key, payload, hashlib.sha256).digest()
+
+
+def encode(obj):
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(min(n - len(buf), 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        buf += chunk
+    return bytes(buf)
+
+
+class Channel:
+    """
+    Signed messages over one connection: length, HMAC-SHA256, payload. Both ends open with
+    a random nonce, and every message is signed over the two nonces, its direction and
+    its sequence number, so a message recorded on another connection, or earlier on this
+    one, fails authentication. Payloads are signed, not encrypted.
+    """
+
+    def __init__(self, sock, key, server):
+        self.sock = sock
+        self.key = key
+        nonce = secrets.token_bytes(16)
+        sock.sendall(nonce)
+        peer = recv_exact(sock, 16)
+        session = peer + nonce if server else nonce + peer  # worker's nonce first
+        self.send_tag = session + (b"S" if server else b"W")
+        self.recv_tag = session + (b"W" if server else b"S")
+        self.sent = 0
+        self.received = 0
+
+    def send(self, obj):
+        self.send_payload(encode(obj))
+
+    def send_payload(self, payload):
+        header = self.send_tag + struct.pack("!Q", self.sent)
+        self.sent += 1
+        mac = signature(self.key, header + payload)
+        self.sock.sendall(struct.pack("!Q", len(payload)) + mac + payload)
+
+    def recv(self):
+        (n,) = struct.unpack("!Q", recv_exact(self.sock, 8))
+        mac = recv_exact(self.sock, 32)
+        payload = recv_exact(self.sock, n)
+        header = self.recv_tag + struct.pack("!Q", self.received)
+        self.received += 1
+        # never unpickle what a peer without the key sent, or a replayed message
+        if not hmac.compare_digest(mac, signature(self.key, header + payload)):
+            raise AuthenticationError("message failed authentication, check the rollout key")
+        return pickle.loads(zlib.decompress(payload))
+
+
+class RolloutServer:
+    """
+    Accepts rollout workers over plain TCP and feeds their trajectories into the same
+    queue as the local actors. Each worker has at most one trajectory in flight: the reply
+    is only sent once the trajectory is queued, so a full queue stalls the workers.
+    Replies carry the newest weights whenever the worker's version is behind.
+    Messages are pickled and signed with the shared key per connection (see Channel),
+    anything failing the HMAC check is dropped before unpickling. The key itself is never
+    sent, workers get the args with rollout_key blanked. It binds loopback unless --rollout-public is set, which
+    also needs an explicit --rollout-key. Every server has its own config id, so workers
+    rebuild their env and policy when they reconnect to the next generation's server.
+    """
+
+    def __init__(self, args, env_fn, policy_fn, trajectories, logger=None, key=None):
+        self.args = args
+        self.env_fn = env_fn
+        self.policy_fn = policy_fn
+        self.trajectories = trajectories
+        self.logger = logger
+        self.key = key if key is not None else rollout_key(args)
+        self.config_id = uuid.uuid4().hex
+
+        self.version = -1
+        self.weights_payload = None
+        self.weights_lock = threading.Lock()
+        self.stop = threading.Event()
+        self.connected = 0
+        self.connected_lock = threading.Lock()
+
+    def publish(self, states, version):
+        states = [{k: v.detach().cpu() for k, v in state.items()} for state in states]
+        payload = encode(dict(version=version, weights=states))
+        with self.weights_lock:
+            self.version = version
+            self.weights_payload = payload
+
+    def start(self):
+        if not is_loopback(self.args.rollout_host):
+            if not self.args.rollout_public:
+                raise ValueError(
+                    f"--rollout-host {self.args.rollout_host} is not a loopback address, "
+                    "pass --rollout-public to accept workers from other machines"
+                )
+            if not (self.args.rollout_key or os.environ.get("ROLLOUT_KEY")):
+                raise ValueError("--rollout-public needs --rollout-key or $ROLLOUT_KEY")
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.args.rollout_host, self.args.rollout_port))
+        self.sock.listen()
+        self.sock.settimeout(1.0)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+
+    def accept_loop(self):
+        while not self.stop.is_set():
+            try:
+                conn, addr = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self.handle, args=(conn, addr), daemon=True).start()
+
+    def handle(self, conn, addr):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.connected_lock:
+            self.connected += 1
+        try:
+            channel = Channel(conn, self.key, server=True)
+            args = copy.copy(self.args)
+            args.rollout_key = ""
+            config = dict(
+                config_id=self.config_id,
+                args=args,
+                env_fn=self.env_fn,
+                policy_fn=self.policy_fn,
+            )
+            channel.send(config)
+            with self.weights_lock:
+                payload = self.weights_payload
+            channel.send_payload(payload)
+
+            while not self.stop.is_set():
+                msg = channel.recv()
+                trajectory = msg["trajectory"]
+                trajectory["rank"] = f"{addr[0]}:{addr[1]}"
+                self.trajectories.put(trajectory)
+
+                with self.weights_lock:
+                    if trajectory["version"] < self.version:
+                        reply = self.weights_payload
+                    else:
+                        reply = encode(dict(version=self.version))
+                channel.send_payload(reply)
+        except (ConnectionError, EOFError, OSError, AuthenticationError) as e:
+            print(f"Rollout worker {addr} disconnected: {e}")
+        finally:
+            with self.connected_lock:
+                self.connected -= 1
+            conn.close()
+
+    def close(self):
+        self.stop.set()
+        self.sock.close()
+
+
+def connect(host, port, retries=60):
+    delay = 0.5
+    for _ in range(retries):
+        try:
+            sock = socket.create_connection((host, port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock
+        except OSError:
+            time.sleep(delay)
+            delay = min(delay * 2, 10.0)
+    raise ConnectionError(f"could not reach trainer at {host}:{port}")
+
+
+def rollout_worker(host, port, rank=0, num_cpus=None, key=None):
+    """
+    Remote side of the rollout service. Receives the environment and policy factories on
+    connect, then streams trajectories until the trainer goes away for good. A trainer
+    with a new config id (the next iterated generation) gets a freshly built env and
+    policy, and the trajectory still unsent from the previous one is dropped.
+    """
+    from framework.actor_learner import collect_trajectory
+
+    key = (key or os.environ.get("ROLLOUT_KEY", "")).encode()
+    if not key:
+        raise ValueError("the rollout worker needs the trainer's key, --key or $ROLLOUT_KEY")
+    torch.set_num_threads(1)
+    pending = None
+    env = None
+    config_id = None
+    while True:
+        try:
+            sock = connect(host, port)
+        except ConnectionError as e:
+            print(e)
+            break
+
+        try:
+            channel = Channel(sock, key, server=False)
+            config = channel.recv()
+            args = config["args"]
+            if config["config_id"] != config_id:
+                if env is not None:
+                    env.close()
+                    Policy.close()
+                config_id = config["config_id"]
+                pending = None
+                torch.manual_seed(args.seed + 1000 + rank)
+                np.random.seed(args.seed + 1000 + rank)
+                env = config["env_fn"](
+                    args.num_envs, num_cpus if num_cpus is not None else args.actor_cpus
+                )
+                env.seed(args.seed + 1000 + rank)
+                Policy = config["policy_fn"](args, None)
+                observation = env.reset()
+
+            weights = channel.recv()
+            version = weights["version"]
+            Policy.load_state_dicts(weights["weights"])
+
+            while True:
+                if pending is None:
+                    observation, pending = collect_trajectory(
+                        env, Policy, args, observation, rank, version
+                    )
+                channel.send(dict(trajectory=pending))
+                reply = channel.recv()
+                pending = None
+                if "weights" in reply:
+                    version = reply["version"]
+                    Policy.load_state_dicts(reply["weights"])
+        except (ConnectionError, EOFError, OSError) as e:
+            # keep the unsent trajectory and reconnect, v-trace absorbs the extra lag.
+            print(f"Lost trainer connection: {e}, reconnecting")
+        finally:
+            sock.close()
+
+    if env is not None:
+        env.close()
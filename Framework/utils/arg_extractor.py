@@ -3,6 +3,7 @@ from distutils.util import strtobool
 import os
 import psutil
 import re
+import time
 
 
 def str2bool(v):
@@ -34,6 +35,35 @@ def get_args():
     parser.add_argument("--batch_size", type=int, default=512, help="total timesteps of the experiments",)
     parser.add_argument("--update-epochs", type=int, default=4, help="the K epochs to update the policy")
     parser.add_argument("--episode_len", type=int, default=25)
+    parser.add_argument("--eval-episodes", type=int, default=50, help="episodes played by every score() call")
+    parser.add_argument("--eval-envs", type=int, default=50, help="evaluation episodes run side by side in one vector env")
+    parser.add_argument("--eval-bank", type=lambda x: bool(strtobool(x)), default=False, help="evaluate on a fixed bank of eval-episodes initial states, shared by all evaluations and generations")
+    parser.add_argument("--stats-interval", type=int, default=0, help="steps between flushes of the training rollout statistics, 0 disables them")
+    parser.add_argument("--metrics-backends", nargs="+", default=["tensorboard"], choices=["tensorboard", "jsonl", "null"], help="metrics back ends, null is a local no-op stand-in for wandb")
+    parser.add_argument("--metrics-interval", type=float, default=5.0, help="seconds between background writes of the buffered metrics, 0 writes every call inline")
+    parser.add_argument("--memory-budget", type=float, default=0, help="GiB the planned buffers and networks may take, 0 uses 80%% of the memory available at start")
+    parser.add_argument("--memory-policy", type=str, default="refuse", choices=["refuse", "shrink"], help="over budget: refuse to start, or halve replay-size and then learn_n until the plan fits")
+    parser.add_argument("--memory-interval", type=int, default=0, help="steps between RSS / per-buffer memory reports, 0 disables them")
+    parser.add_argument("--replay-size", type=int, default=1000000, help="transitions kept by the maddpg replay buffer")
+    parser.add_argument("--timing-interval", type=int, default=0, help="steps between flushes of the per-phase wall time split and steps/s, 0 turns the timers off")
+    parser.add_argument("--worker-interval", type=int, default=0, help="steps between per-worker latency / idle / queueing reports of the multiprocess training env, 0 disables them")
+    parser.add_argument("--straggler-factor", type=float, default=1.5, help="an env worker whose median step latency exceeds this multiple of the median over workers is flagged as a straggler")
+    parser.add_argument("--perf-store", type=str, default="", help="JSON lines results store the run's steps/s, per-phase timings and peak RSS are appended to at the end, empty disables it")
+    parser.add_argument("--profile", type=lambda x: bool(strtobool(x)), default=False, help="torch.profiler (CPU) over a window of training steps, traces and operator tables in <experiment>/profile (per pair for iterated learning)")
+    parser.add_argument("--profile-start", type=int, default=0, help="training steps (rounds of trajectories with --actors) skipped before the profiler schedule starts")
+    parser.add_argument("--profile-wait", type=int, default=1)
+    parser.add_argument("--profile-warmup", type=int, default=1)
+    parser.add_argument("--profile-active", type=int, default=None, help="profiled steps, defaults to episode_len * learn_n + 1 so one learn call is included. With --actors the profiler steps once per round of trajectories and the default is learn_n + 1")
+    parser.add_argument("--async-eval", type=lambda x: bool(strtobool(x)), default=False, help="run score() and videos in a background process on weight snapshots")
+    parser.add_argument("--save-comms", type=lambda x: bool(strtobool(x)), default=False, help="also write the raw evaluation comm arrays to <experiment>/comms as .npy")
+    parser.add_argument("--language-metrics", type=lambda x: bool(strtobool(x)), default=False, help="log topographic similarity, disentanglement, goal/message MI and symbol entropy at every score")
+    parser.add_argument("--language-episodes", type=int, default=0, help="episodes rolled out for the language report at the end of each iterated generation, 0 skips the report")
+    parser.add_argument("--language-pairs", type=int, default=100000, help="message pairs sampled for topographic similarity")
+    parser.add_argument("--generalization", type=lambda x: bool(strtobool(x)), default=False, help="after each iterated generation, score every landmark subset and goal combination in one batched pass")
+    parser.add_argument("--generalization-repeats", type=int, default=1, help="random placements per landmark subset and goal assignment")
+    parser.add_argument("--capture-rate", type=float, default=0.0, help="fraction of evaluation steps whose GRU/common activations are written to <experiment>/hidden, 0 disables capture")
+    parser.add_argument("--capture-max-rows", type=int, default=None, help="stop capturing after this many rows per evaluation suite")
+    parser.add_argument("--capture-chunk", type=int, default=65536, help="rows per memory-mapped capture chunk")
 
     parser.add_argument("--model",nargs="?",type=str,help="Policy to be used")
     parser.add_argument("--env",type=str,default="simple",help="environment for agent",)
@@ -57,13 +87,30 @@ def get_args():
     parser.add_argument("--experiment_name",nargs="?",type=str,default="exp_1",help="Experiment name - to be used for building the experiment folder")
     parser.add_argument("--load_weights_name",nargs="?",type=str,default=None,help="load these weights as a teacher model.")
 
+    parser.add_argument("--actors", type=int, default=0, help="number of actor processes for the decoupled actor/learner mode, 0 disables it")
+    parser.add_argument("--dp-workers", type=int, default=1, help="number of data parallel learner processes (gloo), 1 disables it")
+    parser.add_argument("--rollout-host", type=str, default="127.0.0.1", help="interface the rollout server binds to, anything but loopback needs --rollout-public")
+    parser.add_argument("--rollout-public", type=lambda x: bool(strtobool(x)), default=False, help="allow binding the rollout server to a non-loopback interface, requires --rollout-key")
+    parser.add_argument("--rollout-key", type=str, default=None, help="shared secret every rollout message is signed with (HMAC-SHA256), defaults to $ROLLOUT_KEY, else a random per-run key for the localhost workers")
+    parser.add_argument("--rollout-port", type=int, default=None, help="tcp port for remote rollout workers, requires --actors")
+    parser.add_argument("--rollout-workers", type=int, default=0, help="rollout workers to start on localhost over tcp")
+
+    parser.add_argument("--population", type=int, default=8, help="population size for pbt_run.py")
+    parser.add_argument("--pbt-cores", type=int, default=None, help="cores shared by the whole pbt population, defaults to all but one")
+    parser.add_argument("--pbt-quantile", type=float, default=0.25, help="fraction of the population replaced at every pbt round")
+
     args = parser.parse_args()
     # fmt: on
-    num_cpus = psutil.cpu_count()
-    optimum_process_count_per_thread = 64
     n = re.findall(r"\d+", args.env)
     args.n_agents = int(n[0]) if n else 1
-    args.num_envs = ((num_cpus - 2) * optimum_process_count_per_thread) // args.n_agents
+    # wall clock origin of every logger of the run, evaluation processes included
+    args.run_start = time.time()
+    return set_num_envs(args, psutil.cpu_count())
+
+
+def set_num_envs(args, num_cpus):
+    optimum_process_count_per_thread = 64
+    args.num_envs = max(1, ((num_cpus - 2) * optimum_process_count_per_thread) // args.n_agents)
     learn_n = args.batch_size // args.num_envs
     args.learn_n = learn_n if learn_n >= 1 else 1
 
@@ -15,6 +15,44 @@ class base_policy:
     def store(self, total_steps, obs, rewards, dones):
         pass
 
+    def close(self):
+        pass
+
+    def set_best_states(self, states):
+        pass
+
+    def set_capture(self, capture):
+        pass
+
+    @staticmethod
+    def memory_plan(args):
+        # planned bytes per buffer and network, from args alone, see framework.utils.memory
+        return {}
+
+    # only implemented by the policies that support actor/learner and asynchronous evaluation,
+    # check with missing_methods before starting either
+    def state_dicts(self):
+        raise NotImplementedError(f"{type(self).__name__} has no state_dicts")
+
+    def load_state_dicts(self, states):
+        raise NotImplementedError(f"{type(self).__name__} has no load_state_dicts")
+
+    # pbt only, PBTScheduler checks for them up front
+    def optimizer_state_dicts(self):
+        raise NotImplementedError(f"{type(self).__name__} has no optimizer_state_dicts")
+
+    def load_optimizer_state_dicts(self, states):
+        raise NotImplementedError(f"{type(self).__name__} has no load_optimizer_state_dicts")
+
+    def exploit(self, states, optimizer_states):
+        raise NotImplementedError(f"{type(self).__name__} has no exploit")
+
+
+def missing_methods(Policy, *names):
+    """The named base_policy methods a policy class, or a partial of one, leaves unimplemented."""
+    cls = getattr(Policy, "func", Policy)
+    return [name for name in names if getattr(cls, name) is getattr(base_policy, name)]
+
 
 class Args:
     def __init__(
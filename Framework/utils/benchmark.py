@@ -0,0 +1,114 @@
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+
+clock = time.perf_counter_ns
+
+
+class NullLogger:
+    """SummaryWriter stand-in for benchmark runs, every add_* call is dropped."""
+
+    def __getattr__(self, name):
+        return self.drop
+
+    def drop(self, *args, **kwargs):
+        pass
+
+
+def summarize(ns):
+    """Latency distribution of a list of per-call durations in nanoseconds, in ms."""
+    ms = np.asarray(ns, dtype=np.float64) / 1e6
+    if len(ms) == 0:
+        return dict(calls=0)
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return dict(
+        calls=len(ms),
+        total_s=float(ms.sum() / 1e3),
+        mean_ms=float(ms.mean()),
+        std_ms=float(ms.std()),
+        min_ms=float(ms.min()),
+        p50_ms=float(p50),
+        p90_ms=float(p90),
+        p99_ms=float(p99),
+        max_ms=float(ms.max()),
+    )
+
+
+def peak_rss_mb():
+    # high-water mark of this process, kilobytes on linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def machine():
+    import psutil
+    import torch
+
+    return dict(
+        host=platform.node(),
+        platform=platform.platform(),
+        processor=platform.processor(),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        torch=torch.__version__,
+        torch_threads=torch.get_num_threads(),
+        cuda=torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+        cpus=psutil.cpu_count(),
+        physical_cpus=psutil.cpu_count(logical=False),
+        memory_gb=psutil.virtual_memory().total / 2 ** 30,
+    )
+
+
+def run_isolated(fn, *args):
+    """
+    Runs fn(*args) in a fresh spawned process, so every configuration starts from a clean
+    allocator and its peak RSS is its own. A raising or crashing configuration comes back
+    as an error record instead of ending the sweep.
+    """
+    try:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            return pool.submit(fn, *args).result()
+    except Exception as e:
+        return dict(status="error", error=f"{type(e).__name__}: {e}")
+
+
+def guarded(fn, *args):
+    # inside the worker, so the traceback survives the trip back
+    try:
+        return dict(status="ok", **fn(*args))
+    except Exception as e:
+        return dict(
+            status="error",
+            error=f"{type(e).__name__}: {e}",
+            traceback=traceback.format_exc(),
+        )
+
+
+def write_results(path, suite, config, results, **extra):
+    """
+    Writes one benchmark run as JSON: suite name, run config, machine, result records and
+    any extra summaries derived from them.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    report = dict(
+        suite=suite,
+        created=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        argv=sys.argv,
+        config=config,
+        machine=machine(),
+        results=results,
+        **extra,
+    )
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+    return report
@@ -0,0 +1,40 @@
+import os
+import torch
+from concurrent.futures import ThreadPoolExecutor
+
+
+def snapshot_state_dict(module):
+    # detached cpu copy, safe to hand to another thread or process while training continues.
+    return {k: v.detach().to("cpu", copy=True) for k, v in module.state_dict().items()}
+
+
+class AsyncCheckpointWriter:
+    """
+    Writes state dict snapshots to disk on a single background thread.
+    Only the latest pending snapshot per path is kept, older ones are dropped.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = {}
+
+    def save(self, state_dict, fname):
+        future = self.pending.get(fname)
+        if future is not None:
+            future.cancel()
+        self.pending[fname] = self.executor.submit(self._write, state_dict, fname)
+
+    def _write(self, state_dict, fname):
+        tmp = fname + ".tmp"
+        torch.save(state_dict, tmp)
+        os.replace(tmp, fname)
+
+    def flush(self):
+        for future in list(self.pending.values()):
+            if not future.cancelled():
+                future.result()
+        self.pending = {}
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,192 @@
+import socket
+import numpy as np
+import psutil
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+
+class SingleProcessReducer:
+    """
+    Default reducer for Agent.update, the whole rollout memory lives in this process.
+    """
+
+    rank = 0
+
+    def begin(self, global_step):
+        pass
+
+    def shard(self, tensors):
+        return tensors
+
+    def mean(self, x):
+        return x.mean()
+
+    def normalize(self, x):
+        return (x - x.mean()) / (x.std() + 1e-8)
+
+    def all_reduce_scalars(self, scalars):
+        return [x.detach() for x in scalars]
+
+    def all_reduce_grads(self, parameters):
+        pass
+
+    def close(self):
+        pass
+
+
+class DistributedReducer(SingleProcessReducer):
+    """
+    Data parallel PPO update over a gloo process group. Every rank holds a replica of the
+    network and trains on its own columns of the shared rollout memory. Losses are scaled by
+    the global element count so that summing the gradients over ranks gives the gradient of
+    the full batch, every replica then takes the same optimizer step.
+    """
+
+    def __init__(self, rank, world_size, shards, total_cols):
+        self.rank = rank
+        self.world_size = world_size
+        self.start, self.end = shards[rank]
+        self.total_cols = total_cols
+        self.local_cols = self.end - self.start
+
+    # rank 0 wakes the workers and broadcasts its weights, the workers block in wait().
+    def begin(self, global_step):
+        dist.broadcast(torch.tensor([global_step], dtype=torch.long), src=0)
+        self.sync_parameters()
+
+    def wait(self):
+        global_step = torch.zeros(1, dtype=torch.long)
+        dist.broadcast(global_step, src=0)
+        global_step = global_step.item()
+        if global_step >= 0:
+            self.sync_parameters()
+        return global_step
+
+    def attach(self, module):
+        self.module = module
+
+    def sync_parameters(self):
+        vector = parameters_to_vector(self.module.parameters()).detach().cpu()
+        dist.broadcast(vector, src=0)
+        vector_to_parameters(
+            vector.to(next(self.module.parameters()).device), self.module.parameters()
+        )
+
+    def shard(self, tensors):
+        return tuple(x[:, self.start : self.end] for x in tensors)
+
+    def mean(self, x):
+        # columns are dim 1 of every rollout tensor, the other dims match across ranks.
+        return x.sum() / (x.numel() // self.local_cols * self.total_cols)
+
+    def normalize(self, x):
+        stats = torch.stack(
+            [x.sum(), (x**2).sum(), torch.tensor(float(x.numel()), device=x.device)]
+        ).cpu()
+        dist.all_reduce(stats, op=dist.ReduceOp.SUM)
+        total, total_sq, n = stats.tolist()
+        mean = total / n
+        std = np.sqrt(max(total_sq - n * mean**2, 0.0) / (n - 1))
+        return (x - mean) / (std + 1e-8)
+
+    def all_reduce_scalars(self, scalars):
+        # sums of mean() results, each rank's share is already scaled by the global count
+        stacked = torch.stack([x.detach().float().reshape(()) for x in scalars]).cpu()
+        dist.all_reduce(stacked, op=dist.ReduceOp.SUM)
+        return list(stacked)
+
+    def all_reduce_grads(self, parameters):
+        parameters = [p for p in parameters]
+        grads = [
+            p.grad if p.grad is not None else torch.zeros_like(p) for p in parameters
+        ]
+        flat = torch.cat([g.reshape(-1) for g in grads]).cpu()
+        dist.all_reduce(flat, op=dist.ReduceOp.SUM)
+        flat = flat.to(parameters[0].device)
+        offset = 0
+        for p in parameters:
+            n = p.numel()
+            p.grad = flat[offset : offset + n].view_as(p).clone()
+            offset += n
+
+    def close(self):
+        if self.rank == 0:
+            dist.broadcast(torch.tensor([-1], dtype=torch.long), src=0)
+            for worker in self.workers:
+                worker.join()
+        dist.destroy_process_group()
+
+
+def env_shards(total_cols, n_agents, world_size):
+    # contiguous env-aligned columns, so whole rollout blocks land on one rank when
+    # learn_n is a multiple of world_size.
+    envs = np.array_split(np.arange(total_cols // n_agents), world_size)
+    assert all(len(e) for e in envs), "more data parallel workers than environments"
+    return [(int(e[0]) * n_agents, (int(e[-1]) + 1) * n_agents) for e in envs]
+
+
+def learner_worker(rank, world_size, port, agent_fn, arena, shards, total_cols):
+    torch.set_num_threads(max(1, psutil.cpu_count() // world_size))
+    dist.init_process_group(
+        "gloo",
+        init_method=f"tcp://127.0.0.1:{port}",
+        rank=rank,
+        world_size=world_size,
+    )
+    agent = agent_fn()
+    agent.memory.attach(arena)
+    agent.reducer = DistributedReducer(rank, world_size, shards, total_cols)
+    agent.reducer.attach(agent.ppo)
+    while True:
+        global_step = agent.reducer.wait()
+        if global_step < 0:
+            break
+        agent.update(global_step)
+    dist.destroy_process_group()
+
+
+def start_data_parallel(agent, agent_fn, world_size):
+    """
+    Spawns world_size - 1 learner workers and returns the rank 0 reducer for agent.
+    agent_fn must build an identically shaped Agent inside the worker.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    agent.memory.attach(agent.memory.arena())
+    total_cols = agent.memory.obs.shape[1]
+    shards = env_shards(total_cols, agent.args.n_agents, world_size)
+
+    ctx = mp.get_context("spawn")
+    workers = [
+        ctx.Process(
+            target=learner_worker,
+            args=(
+                rank,
+                world_size,
+                port,
+                agent_fn,
+                agent.memory.arena(),
+                shards,
+                total_cols,
+            ),
+            daemon=True,
+        )
+        for rank in range(1, world_size)
+    ]
+    for worker in workers:
+        worker.start()
+
+    dist.init_process_group(
+        "gloo",
+        init_method=f"tcp://127.0.0.1:{port}",
+        rank=0,
+        world_size=world_size,
+    )
+    reducer = DistributedReducer(0, world_size, shards, total_cols)
+    reducer.attach(agent.ppo)
+    reducer.workers = workers
+    return reducer
@@ -0,0 +1,199 @@
+import numpy as np
+from framework.utils.benchmark import clock, guarded, summarize
+from framework.utils.worker_stats import cpu_demand, worker_times
+
+# landmark subset used for the iterated scenarios, the learn split iterated_run.py draws
+landmark_ind = [0, 1, 2, 3]
+
+
+def scenario_env(scenario, N):
+    """Parallel env of one scenario; only full_ref takes the agent count."""
+    from scenarios import complex_ref, full_ref, iterated, iterated_continuous
+
+    if scenario == "full_ref":
+        return full_ref.parallel_env(N=N)
+    if scenario == "complex_ref":
+        return complex_ref.parallel_env()
+    if scenario == "iterated":
+        return iterated.parallel_env(landmark_ind=landmark_ind, continuous_actions=False)
+    if scenario == "iterated_continuous":
+        return iterated_continuous.parallel_env(
+            landmark_ind=landmark_ind, continuous_actions=True
+        )
+    raise ValueError(f"unknown scenario {scenario}")
+
+
+# agent counts each scenario can be built with
+scenario_agents = {
+    "full_ref": [2, 3, 4],
+    "complex_ref": [2],
+    "iterated": [2],
+    "iterated_continuous": [2],
+}
+
+
+def action_sampler(space, rows, rng):
+    # pre-drawn blocks of actions, so sampling stays out of the timed step
+    if hasattr(space, "n"):
+        return lambda steps: rng.integers(0, space.n, (steps, rows))
+    low = np.broadcast_to(space.low, space.shape)
+    high = np.broadcast_to(space.high, space.shape)
+    return lambda steps: rng.uniform(low, high, (steps, rows) + space.shape).astype(
+        space.dtype
+    )
+
+
+def bench_single(scenario, N, steps, seed):
+    """reset() and step() of one parallel SimpleEnv, resetting whenever its episode ends."""
+    env = scenario_env(scenario, N)
+    env.seed(seed)
+    rng = np.random.default_rng(seed)
+    agents = list(env.possible_agents)
+    actions = action_sampler(env.action_spaces[agents[0]], len(agents), rng)(steps)
+
+    reset_times, step_times = [], []
+    start = clock()
+    env.reset()
+    reset_times.append(clock() - start)
+    for t in range(steps):
+        action = dict(zip(agents, actions[t]))
+        start = clock()
+        env.step(action)
+        step_times.append(clock() - start)
+        if not env.agents:
+            start = clock()
+            env.reset()
+            reset_times.append(clock() - start)
+    env.close()
+
+    step = summarize(step_times)
+    return dict(
+        env_steps_per_second=step["calls"] / step["total_s"],
+        step=step,
+        reset=summarize(reset_times),
+    )
+
+
+def bench_vec(scenario, N, num_envs, workers, steps, seed, resets=3):
+    """
+    The training pipeline of make_train_env (pad_observations, pettingzoo_env_to_vec_env,
+    concat_vec_envs_v1 over workers processes, 0 keeps it in process) on one scenario.
+    Episodes reset inside step() as in training, so step latency includes them. With
+    worker processes their per-worker latency, queueing and straggler figures are added.
+    """
+    import supersuit as ss
+
+    env = scenario_env(scenario, N)
+    env = ss.pad_observations_v0(env)
+    env = ss.pettingzoo_env_to_vec_env_v1(env)
+    env = ss.concat_vec_envs_v1(env, num_envs, workers)
+    env.seed(seed)
+    rng = np.random.default_rng(seed)
+    actions = action_sampler(env.action_space, env.num_envs, rng)(steps)
+
+    times = worker_times(env)
+
+    reset_times, step_times = [], []
+    for _ in range(resets):
+        start = clock()
+        env.reset()
+        reset_times.append(clock() - start)
+    if times is not None:
+        times.clear()
+    for t in range(steps):
+        start = clock()
+        env.step(actions[t])
+        step_times.append(clock() - start)
+    summary = times.summary() if times is not None else None
+    env.close()
+
+    step = summarize(step_times)
+    result = dict(
+        env_steps_per_second=num_envs * step["calls"] / step["total_s"],
+        agent_steps_per_second=env.num_envs * step["calls"] / step["total_s"],
+        step=step,
+        reset=summarize(reset_times),
+    )
+    if summary is not None:
+        per_worker = summary["workers"]
+        result.update(
+            per_worker=per_worker,
+            stragglers=len(summary["stragglers"]),
+            worker_queue_ms=float(np.mean([w["queue_ms"] for w in per_worker])),
+            worker_run_pct=float(np.nanmean([w["run_pct"] for w in per_worker])),
+            cpu_demand=cpu_demand(len(per_worker)),
+        )
+    return result
+
+
+def scaling_curves(results):
+    """
+    env steps/s per scenario and N as a workers x num_envs grid (None where a point is
+    missing or failed), next to the single SimpleEnv figure.
+    """
+    curves = {}
+    for r in results:
+        curve = curves.setdefault(
+            f"{r['scenario']}-N{r['N']}",
+            dict(single=None, workers=set(), num_envs=set(), points={}),
+        )
+        rate = r.get("env_steps_per_second")
+        if r["engine"] == "single":
+            curve["single"] = rate
+        else:
+            curve["workers"].add(r["workers"])
+            curve["num_envs"].add(r["num_envs"])
+            curve["points"][r["workers"], r["num_envs"]] = rate
+    for curve in curves.values():
+        points = curve.pop("points")
+        curve["workers"] = sorted(curve["workers"])
+        curve["num_envs"] = sorted(curve["num_envs"])
+        curve["env_steps_per_second"] = [
+            [points.get((w, n)) for n in curve["num_envs"]] for w in curve["workers"]
+        ]
+    return curves
+
+
+def describe(record):
+    label = (
+        f"{record['scenario']} N={record['N']} {record['engine']} "
+        f"num_envs={record.get('num_envs', 1)} workers={record.get('workers', 0)}"
+    )
+    if record["status"] != "ok":
+        return f"{label}: {record['error']}"
+    line = (
+        f"{label}: {record['env_steps_per_second']:.0f} env steps/s, "
+        f"p99 step {record['step']['p99_ms']:.2f} ms"
+    )
+    if "per_worker" in record:
+        line += (
+            f", queue {record['worker_queue_ms']:.2f} ms, "
+            f"{record['stragglers']} stragglers, run {record['worker_run_pct']:.0f}%"
+        )
+    return line
+
+
+def sweep(scenarios, agents, num_envs, workers, steps, seed=0):
+    """Every scenario x supported N: the single env, then every num_envs x workers pipeline."""
+    results = []
+    for scenario in scenarios:
+        for N in scenario_agents[scenario]:
+            if N not in agents:
+                continue
+            runs = [
+                (dict(engine="single"), bench_single, (scenario, N, steps, seed))
+            ]
+            for n in num_envs:
+                for w in workers:
+                    runs.append(
+                        (
+                            dict(engine="concat_vec_envs", num_envs=n, workers=w),
+                            bench_vec,
+                            (scenario, N, n, w, steps, seed),
+                        )
+                    )
+            for record, fn, args in runs:
+                record.update(scenario=scenario, N=N, **guarded(fn, *args))
+                print(describe(record))
+                results.append(record)
+    return results
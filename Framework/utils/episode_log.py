@@ -0,0 +1,69 @@
+import os
+import numpy as np
+from framework.utils.eval_bank import leaf_envs
+
+
+class EpisodeRecorder:
+    """
+    Compact log of evaluation episodes for offline rendering: per step the position of every
+    entity (agents first, then landmarks) and the symbol each agent emits, per episode the
+    entity colors, sizes and kinds. Fed by run_episodes, one episode per sub-env and round.
+    """
+
+    def __init__(self):
+        self.episodes = []
+        self.leaves = []
+        self.current = []
+
+    def begin(self, env):
+        self.leaves = leaf_envs(env)
+        self.current = []
+        for leaf in self.leaves:
+            world = leaf.world
+            entities = world.agents + world.landmarks
+            self.current.append(
+                dict(
+                    color=np.array(
+                        [
+                            (0.25, 0.25, 0.25) if e.color is None else e.color[:3]
+                            for e in entities
+                        ],
+                        dtype=np.float32,
+                    ),
+                    size=np.array([e.size for e in entities], dtype=np.float32),
+                    agent=np.arange(len(entities)) < len(world.agents),
+                    pos=[],
+                    symbols=[],
+                )
+            )
+
+    def step(self, symbols):
+        # positions before the step, next to the symbols chosen from them
+        symbols = np.reshape(symbols, (len(self.leaves), -1))
+        for leaf, episode, s in zip(self.leaves, self.current, symbols):
+            world = leaf.world
+            episode["pos"].append(
+                np.array([e.state.p_pos for e in world.agents + world.landmarks])
+            )
+            episode["symbols"].append(s.copy())
+
+    def end(self):
+        for episode in self.current:
+            episode["pos"] = np.stack(episode["pos"]).astype(np.float32)
+            episode["symbols"] = np.stack(episode["symbols"]).astype(np.int8)
+            self.episodes.append(episode)
+        self.current = []
+
+    def save(self, path, episodes=None):
+        # fixed entity count within a scenario, so episodes stack into one array per field
+        episodes = self.episodes[:episodes]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(
+            path, **{k: np.stack([e[k] for e in episodes]) for k in episodes[0]}
+        )
+
+
+def load_episodes(path):
+    """Dict of arrays: pos (N, T, E, 2), symbols (N, T, n_agents), color, size, agent (N, E)."""
+    with np.load(path) as f:
+        return {k: f[k] for k in f.files}
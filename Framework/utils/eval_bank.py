@@ -0,0 +1,105 @@
+import os
+import random
+import numpy as np
+
+
+def leaf_envs(env):
+    """
+    The MPE SimpleEnv behind every sub-env of an in-process vector env, in batch order.
+    Envs running in worker processes can't be reached and give an empty list.
+    """
+    if hasattr(env, "scenario") and hasattr(env, "world"):
+        return [env]
+    if hasattr(env, "vec_envs"):
+        return [leaf for sub in env.vec_envs for leaf in leaf_envs(sub)]
+    for name in ("par_env", "aec_env", "env", "venv"):
+        if hasattr(env, name):
+            return leaf_envs(getattr(env, name))
+    return []
+
+
+class BankSlot:
+    # what one sub-env's scenario sees: the state for its position in the current round
+    def __init__(self, bank, index):
+        self.bank = bank
+        self.index = index
+
+    def state(self):
+        return self.bank.state(self.bank.round * self.bank.batch + self.index)
+
+
+class EvaluationBank:
+    """
+    Fixed initial world states (landmark subset, positions, goals), generated once and
+    stored as arrays, so every evaluation plays the same episodes. Sub-env b of a batch
+    restores row round * batch + b on reset, the same episode order run_episodes reports.
+    Resets in between, like the vector env's own reset at episode end, restore the same row.
+    The bank is only attached to the env for the duration of run_episodes.
+    """
+
+    def __init__(self, states):
+        self.states = states
+        self.size = len(next(iter(states.values())))
+        self.round = 0
+        self.batch = 1
+        self.leaves = []
+
+    def state(self, i):
+        return {k: v[i % self.size] for k, v in self.states.items()}
+
+    def select(self, round):
+        self.round = round
+
+    @classmethod
+    def generate(cls, leaf, episodes, seed):
+        # python's random drives the landmark derangement, keep the caller's stream untouched
+        py_state = random.getstate()
+        random.seed(seed)
+        np_random = np.random.RandomState(seed)
+        bank, leaf.scenario.bank = leaf.scenario.bank, None
+        rows = []
+        for _ in range(episodes):
+            leaf.scenario.reset_world(leaf.world, np_random)
+            rows.append(leaf.scenario.snapshot(leaf.world))
+        leaf.scenario.bank = bank
+        random.setstate(py_state)
+        return cls({k: np.stack([r[k] for r in rows]) for k in rows[0]})
+
+    def save(self, path):
+        # other evaluator processes may load it concurrently
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **self.states)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls({k: f[k] for k in f.files})
+
+    def attach(self, env):
+        self.leaves = leaf_envs(env)
+        self.batch = len(self.leaves)
+        for b, leaf in enumerate(self.leaves):
+            leaf.scenario.bank = BankSlot(self, b)
+
+    def detach(self):
+        for leaf in self.leaves:
+            leaf.scenario.bank = None
+        self.leaves = []
+
+    @classmethod
+    def for_env(cls, env, folder, tag, episodes, seed):
+        """
+        Bank for this env's scenario configuration, loaded from folder when an earlier
+        evaluation, generation or process already made it. None when the env can't be banked.
+        """
+        leaves = leaf_envs(env)
+        if not leaves or not hasattr(leaves[0].scenario, "snapshot"):
+            return None
+        path = os.path.join(folder, f"eval_bank_{tag}_{leaves[0].scenario.bank_key()}.npz")
+        if os.path.exists(path):
+            bank = cls.load(path)
+        else:
+            bank = cls.generate(leaves[0], episodes, seed)
+            bank.save(path)
+        return bank
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def run_episodes(
+    Policy, env, n_agents, episode_len, episodes, bank=None, recorder=None
+):
+    """
+    Plays `episodes` evaluation episodes on a vector env holding several episodes side by side,
+    with one batched action_evaluate call per step.
+    Returns per-episode arrays rewards and comms, both (episodes, episode_len, n_agents),
+    and the first observation of every agent, (episodes, n_agents, obs_dim).
+    With an EvaluationBank, episode e starts from bank state e, with an EpisodeRecorder
+    the episodes are also logged for offline rendering.
+    """
+    batch = env.num_envs // n_agents
+    if bank is not None:
+        bank.attach(env)
+    rewards, comms, first_obs = [], [], []
+    for r in range(int(np.ceil(episodes / batch))):
+        if bank is not None:
+            bank.select(r)
+        obs = env.reset()
+        if recorder is not None:
+            recorder.begin(env)
+        first_obs.append(np.reshape(obs, (batch, n_agents, -1)))
+        ep_rewards = np.zeros((episode_len, batch, n_agents))
+        ep_comms = np.zeros((episode_len, batch, n_agents), dtype=int)
+        for i in range(episode_len):
+            act = Policy.action_evaluate(obs, new_episode=i == 0)
+            ep_comms[i] = np.reshape(act // 5, (batch, n_agents))
+            if recorder is not None:
+                recorder.step(ep_comms[i])
+            obs, reward, _, _ = env.step(act)
+            ep_rewards[i] = np.reshape(reward, (batch, n_agents))
+        if recorder is not None:
+            recorder.end()
+        rewards.append(ep_rewards.transpose(1, 0, 2))
+        comms.append(ep_comms.transpose(1, 0, 2))
+
+    if bank is not None:
+        bank.detach()
+
+    rewards = np.concatenate(rewards)[:episodes]
+    comms = np.concatenate(comms)[:episodes]
+    first_obs = np.concatenate(first_obs)[:episodes]
+    return rewards, comms, first_obs
+
+
+def episode_metrics(rewards):
+    # same reductions the serial score loop used: mean over agents per step,
+    # summed over the episode, and the final step's reward as the end reward.
+    end_rewards = rewards[:, -1, :]
+    return dict(
+        End_reward=np.mean(end_rewards),
+        Episode_return=np.mean(np.sum(np.mean(rewards, axis=2), axis=1)),
+        agent_end_rewards=np.mean(end_rewards, axis=0),
+    )
@@ -0,0 +1,67 @@
+import numpy as np
+from framework.utils.eval_bank import EvaluationBank, leaf_envs
+from framework.utils.episode_log import EpisodeRecorder
+from framework.utils.evaluation import run_episodes
+
+
+def combination_bank(env, repeats, seed):
+    """Bank of every landmark subset x goal assignment of the env's iterated scenario."""
+    leaf = leaf_envs(env)[0]
+    rows = leaf.scenario.enumerate_states(
+        leaf.world, np.random.RandomState(seed), repeats
+    )
+    return EvaluationBank({k: np.stack([r[k] for r in rows]) for k in rows[0]})
+
+
+def generalization_matrix(Policy, env, n_agents, episode_len, vocab, repeats=1, seed=0):
+    """
+    Plays every combination in one batched pass and scores each speaker's goal landmark,
+    indexed by its (color, size) cell of the scenario's len(colors) x len(lradi) grid.
+    An episode succeeds for speaker i when, at its last step, the partner is closer to the
+    goal landmark than its size minus speaker i's own size, the condition under which the
+    scenario's reward for i stops charging distance.
+    """
+    world = leaf_envs(env)[0].world
+    n_colors, n_sizes = len(world.colors), len(world.lradi)
+    bank = combination_bank(env, repeats, seed)
+    recorder = EpisodeRecorder()
+    _, comms, _ = run_episodes(
+        Policy, env, n_agents, episode_len, bank.size, bank=bank, recorder=recorder
+    )
+
+    states = bank.states
+    N = bank.size
+    pos = np.stack([e["pos"][-1] for e in recorder.episodes[:N]])  # (N, E, 2)
+    size = np.stack([e["size"] for e in recorder.episodes[:N]])
+    rows = np.arange(N)[:, None]
+    partner = states["goal_a"]  # (N, n_agents)
+    target = n_agents + states["goal_b"]
+    dist = np.linalg.norm(pos[rows, partner] - pos[rows, target], axis=2)
+    success = dist < size[rows, target] - size[rows, np.arange(n_agents)]  # as in reward()
+
+    # landmark k of the scenario is color k // n_sizes, size k % n_sizes
+    goal = np.take_along_axis(states["landmarks"], states["goal_b"], axis=1)
+    cell = goal.reshape(-1)
+    symbols = comms.transpose(0, 2, 1).reshape(N * n_agents, -1)  # per speaker
+
+    cells = n_colors * n_sizes
+    count = np.bincount(cell, minlength=cells)
+    hits = np.bincount(cell, weights=success.reshape(-1), minlength=cells)
+    uttered = np.bincount(cell, weights=(symbols != 0).sum(1), minlength=cells)
+    usage = np.bincount(
+        (cell[:, None] * vocab + symbols).reshape(-1), minlength=cells * vocab
+    ).reshape(cells, vocab)
+
+    joint = goal[:, 0] * cells + goal[:, -1]
+    joint_count = np.bincount(joint, minlength=cells * cells)
+    joint_hits = np.bincount(
+        joint, weights=success.all(1), minlength=cells * cells
+    )
+
+    return dict(
+        success=(hits / np.maximum(count, 1)).reshape(n_colors, n_sizes),
+        symbols_per_ep=(uttered / np.maximum(count, 1)).reshape(n_colors, n_sizes),
+        symbol_usage=usage.reshape(n_colors, n_sizes, vocab),
+        episodes=count.reshape(n_colors, n_sizes),
+        joint_success=(joint_hits / np.maximum(joint_count, 1)).reshape(cells, cells),
+    )
@@ -0,0 +1,183 @@
+import json
+import os
+import numpy as np
+import torch
+
+fields = ("hidden", "common", "symbol", "agent", "t", "step")
+
+
+class HiddenCapture:
+    """
+    Streams a sample of per-step GRU outputs, common-layer activations and emitted symbols
+    into fixed size memory-mapped .npy chunks. Each row is kept with probability `rate`,
+    and capture stops after `max_rows`, so evaluation cost and disk use stay bounded.
+    index.json lists the rows written to every chunk, the last one is only partly filled.
+    """
+
+    def __init__(
+        self, folder, n_agents, rate=0.1, chunk_size=65536, max_rows=None, seed=0
+    ):
+        self.folder = folder
+        self.n_agents = n_agents
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.rng = np.random.default_rng(seed)
+        self.chunks = []
+        self.arrays = None
+        self.fill = 0
+        self.rows = 0
+        self.step = 0
+        self.t = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def begin(self, step):
+        self.step = step
+
+    def new_episode(self):
+        self.t = 0
+
+    def advance(self):
+        self.t += 1
+
+    def full(self):
+        return self.max_rows is not None and self.rows >= self.max_rows
+
+    def open_chunk(self, hidden_size, common_size):
+        name = f"chunk_{len(self.chunks):05d}"
+        shapes = dict(
+            hidden=((self.chunk_size, hidden_size), np.float32),
+            common=((self.chunk_size, common_size), np.float32),
+            symbol=((self.chunk_size,), np.int16),
+            agent=((self.chunk_size,), np.int16),
+            t=((self.chunk_size,), np.int16),
+            step=((self.chunk_size,), np.int64),
+        )
+        self.arrays = {
+            k: np.lib.format.open_memmap(
+                os.path.join(self.folder, f"{name}_{k}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=shape,
+            )
+            for k, (shape, dtype) in shapes.items()
+        }
+        self.chunks.append(dict(name=name, rows=0))
+        self.fill = 0
+
+    def record(self, hidden, common, action, agent=None):
+        """
+        hidden, common (1, batch, features) and action (1, batch) from NNN.get_action.
+        Without an agent index the batch is the shared policy's env-major layout.
+        """
+        if self.full():
+            return
+        batch = hidden.shape[1]
+        keep = np.flatnonzero(self.rng.random(batch) < self.rate)
+        if self.max_rows is not None:
+            keep = keep[: self.max_rows - self.rows]
+        if len(keep) == 0:
+            return
+
+        keep_t = torch.as_tensor(keep, device=hidden.device)
+        rows = dict(
+            hidden=hidden[0, keep_t].float().cpu().numpy(),
+            common=common[0, keep_t].float().cpu().numpy(),
+            symbol=(action[0, keep_t] // 5).cpu().numpy(),
+            agent=keep % self.n_agents if agent is None else np.full(len(keep), agent),
+        )
+        start = 0
+        while start < len(keep):
+            if self.arrays is None or self.fill == self.chunk_size:
+                self.open_chunk(rows["hidden"].shape[1], rows["common"].shape[1])
+            n = min(len(keep) - start, self.chunk_size - self.fill)
+            end = self.fill + n
+            for k, v in rows.items():
+                self.arrays[k][self.fill : end] = v[start : start + n]
+            self.arrays["t"][self.fill : end] = self.t
+            self.arrays["step"][self.fill : end] = self.step
+            self.fill = end
+            self.chunks[-1]["rows"] = end
+            start += n
+        self.rows += len(keep)
+
+    def flush(self):
+        if self.arrays is not None:
+            for array in self.arrays.values():
+                array.flush()
+        with open(os.path.join(self.folder, "index.json"), "w") as f:
+            json.dump(dict(chunks=self.chunks, rows=self.rows), f)
+
+    def close(self):
+        self.flush()
+        self.arrays = None
+
+
+def iter_chunks(folder, keys=fields):
+    """Yields dicts of read-only memory maps, trimmed to the rows actually written."""
+    with open(os.path.join(folder, "index.json")) as f:
+        index = json.load(f)
+    for chunk in index["chunks"]:
+        yield {
+            k: np.load(
+                os.path.join(folder, f"{chunk['name']}_{k}.npy"), mmap_mode="r"
+            )[: chunk["rows"]]
+            for k in keys
+        }
+
+
+def fit_pca(folder, key="hidden", batch=65536):
+    """
+    Exact PCA of a captured field without loading it: one streaming pass accumulates the
+    mean and covariance in float64, then an eigendecomposition of the (features, features)
+    covariance. Returns mean, components (features, features) and explained variance,
+    largest first.
+    """
+    n, total, outer = 0, None, None
+    for chunk in iter_chunks(folder, (key,)):
+        data = chunk[key]
+        for i in range(0, len(data), batch):
+            x = np.asarray(data[i : i + batch], dtype=np.float64)
+            if total is None:
+                total = np.zeros(x.shape[1])
+                outer = np.zeros((x.shape[1], x.shape[1]))
+            n += len(x)
+            total += x.sum(0)
+            outer += x.T @ x
+
+    mean = total / n
+    cov = (outer - n * np.outer(mean, mean)) / max(n - 1, 1)
+    variance, components = np.linalg.eigh(cov)
+    order = np.argsort(variance)[::-1]
+    return mean, components[:, order].T, variance[order]
+
+
+def project(folder, mean, components, out_file, k=2, key="hidden", batch=65536):
+    """Second pass, writes the first k principal coordinates of every row to a .npy memmap."""
+    with open(os.path.join(folder, "index.json")) as f:
+        rows = json.load(f)["rows"]
+    out = np.lib.format.open_memmap(out_file, mode="w+", dtype=np.float32, shape=(rows, k))
+    basis = components[:k].T
+    offset = 0
+    for chunk in iter_chunks(folder, (key,)):
+        data = chunk[key]
+        for i in range(0, len(data), batch):
+            x = np.asarray(data[i : i + batch], dtype=np.float64)
+            out[offset : offset + len(x)] = (x - mean) @ basis
+            offset += len(x)
+    out.flush()
+    return out
+
+
+def symbol_centroids(folder, vocab, key="hidden"):
+    """Mean representation per emitted symbol, (vocab, features), and the symbol counts."""
+    total, counts = None, np.zeros(vocab, dtype=np.int64)
+    for chunk in iter_chunks(folder, (key, "symbol")):
+        x = np.asarray(chunk[key], dtype=np.float64)
+        symbols = np.asarray(chunk["symbol"], dtype=np.int64)
+        if total is None:
+            total = np.zeros((vocab, x.shape[1]))
+        total += np.eye(vocab)[symbols].T @ x
+        counts += np.bincount(symbols, minlength=vocab)
+    centroids = total / np.maximum(counts, 1)[:, None]
+    return centroids, counts
@@ -0,0 +1,159 @@
+import numpy as np
+
+# where each scenario puts the speaker's goal in its observation, and what it encodes
+goal_features = {
+    "iterated": (slice(2, 4), ("goal_b_size", "goal_b_color")),
+    "full_communication_2": (slice(2, 4), ("goal_a_color", "goal_b_color")),
+    "full_communication_3": (slice(2, 4), ("goal_a_color", "goal_b_color")),
+    "full_communication_4": (slice(2, 4), ("goal_a_color", "goal_b_color")),
+}
+
+
+def goal_attributes(obs0, env_name):
+    """
+    Integer coded goal attributes of every speaker, (episodes * n_agents, n_attributes),
+    read from the first observation of each episode. None for scenarios without a known goal.
+    """
+    if env_name not in goal_features:
+        return None, ()
+    cols, names = goal_features[env_name]
+    values = obs0[:, :, cols].reshape(-1, len(names))
+    meanings = np.stack(
+        [np.unique(values[:, k], return_inverse=True)[1] for k in range(len(names))],
+        axis=1,
+    )
+    return meanings, names
+
+
+def entropy(counts, axis=-1):
+    # bits, rows of zero counts have zero entropy
+    counts = np.asarray(counts, dtype=float)
+    total = counts.sum(axis=axis, keepdims=True)
+    p = np.divide(counts, total, out=np.zeros_like(counts), where=total > 0)
+    logp = np.log2(p, out=np.zeros_like(p), where=p > 0)
+    return -np.sum(p * logp, axis=axis)
+
+
+def mutual_information(x, y):
+    """
+    MI in bits between every column of x (N, P) and y (N,), both integer coded.
+    One bincount over (column, x, y) gives all the joint tables at once.
+    """
+    x = np.asarray(x).reshape(len(y), -1)
+    P = x.shape[1]
+    nx, ny = x.max() + 1, y.max() + 1
+    index = (np.arange(P) * nx)[None, :] + x
+    joint = np.bincount(
+        (index * ny + y[:, None]).ravel(), minlength=P * nx * ny
+    ).reshape(P, nx, ny)
+    h_x = entropy(joint.sum(2))
+    h_y = entropy(np.bincount(y, minlength=ny))
+    h_xy = entropy(joint.reshape(P, -1))
+    return h_x + h_y - h_xy, h_x
+
+
+def sequence_ids(messages):
+    return np.unique(messages, axis=0, return_inverse=True)[1].reshape(-1)
+
+
+def rank(x):
+    # average ranks for ties, distances are small integers so ties are the common case
+    values, inverse, counts = np.unique(x, return_inverse=True, return_counts=True)
+    ranks = np.cumsum(counts) - (counts - 1) / 2
+    return ranks[inverse.reshape(-1)]
+
+
+def spearman(a, b):
+    ra, rb = rank(a), rank(b)
+    ra -= ra.mean()
+    rb -= rb.mean()
+    denom = np.sqrt(np.sum(ra**2) * np.sum(rb**2))
+    return float(np.sum(ra * rb) / denom) if denom > 0 else 0.0
+
+
+def sample_pairs(n, max_pairs, rng):
+    if n * (n - 1) // 2 <= max_pairs:
+        return np.triu_indices(n, k=1)
+    i = rng.integers(0, n, max_pairs)
+    j = rng.integers(0, n - 1, max_pairs)
+    j += j >= i
+    return i, j
+
+
+def topographic_similarity(messages, meanings, max_pairs=100000, seed=0):
+    """
+    Spearman correlation between Hamming distances of meanings and of messages, over all
+    pairs, or max_pairs random pairs once that is fewer.
+    """
+    i, j = sample_pairs(len(messages), max_pairs, np.random.default_rng(seed))
+    if len(i) == 0:
+        return 0.0
+    message_dist = np.count_nonzero(messages[i] != messages[j], axis=1)
+    meaning_dist = np.count_nonzero(meanings[i] != meanings[j], axis=1)
+    return spearman(meaning_dist, message_dist)
+
+
+def disentanglement(symbols, meanings):
+    """
+    For each column of symbols, the gap between the two attributes it is most informative
+    about, normalised by the column entropy, averaged over the columns with any entropy.
+    """
+    if meanings.shape[1] < 2:
+        return 0.0
+    mis = []
+    for k in range(meanings.shape[1]):
+        mi, h = mutual_information(symbols, meanings[:, k])
+        mis.append(mi)
+    mis = np.sort(np.stack(mis, axis=1), axis=1)
+    used = h > 0
+    if not used.any():
+        return 0.0
+    return float(np.mean((mis[used, -1] - mis[used, -2]) / h[used]))
+
+
+def positional_disentanglement(messages, meanings):
+    return disentanglement(messages, meanings)
+
+
+def bos_disentanglement(messages, meanings, vocab):
+    # bag of symbols: how often each symbol occurs in the message, order ignored
+    N = len(messages)
+    counts = np.bincount(
+        (np.arange(N)[:, None] * vocab + messages).ravel(), minlength=N * vocab
+    ).reshape(N, vocab)
+    return disentanglement(counts, meanings)
+
+
+def language_metrics(comms, obs0, vocab, env_name, max_pairs=100000):
+    """
+    comms (episodes, episode_len, n_agents) symbol ids, obs0 (episodes, n_agents, obs_dim).
+    Every (episode, speaker) is one message, the speaker's symbols over the episode.
+    """
+    comms = np.asarray(comms, dtype=np.int64)
+    n_agents = comms.shape[2]
+    metrics = {}
+
+    counts = np.stack(
+        [np.bincount(comms[:, :, a].ravel(), minlength=vocab) for a in range(n_agents)]
+    )
+    for a, h in enumerate(entropy(counts)):
+        metrics[f"symbol_entropy_agent_{a}"] = float(h)
+
+    meanings, names = goal_attributes(obs0, env_name)
+    if meanings is None:
+        return metrics
+
+    messages = comms.transpose(0, 2, 1).reshape(-1, comms.shape[1])
+    metrics["topsim"] = topographic_similarity(messages, meanings, max_pairs)
+    metrics["posdis"] = positional_disentanglement(messages, meanings)
+    metrics["bosdis"] = bos_disentanglement(messages, meanings, vocab)
+
+    ids = sequence_ids(messages)
+    for k, name in enumerate(names):
+        metrics[f"mi_{name}"] = float(mutual_information(ids, meanings[:, k])[0][0])
+    return metrics
+
+
+def log_language_metrics(logger, prefix, metrics, step):
+    for name, value in metrics.items():
+        logger.add_scalar(f"{prefix}/language/{name}", value, step)
@@ -0,0 +1,122 @@
+import json
+import os
+import numpy as np
+
+# metrics the sample-efficiency report covers, by the last part of their tag
+targets = ("End_reward", "symbols_per_ep")
+axes = ("wall_s", "transitions")
+
+
+def find_logs(folder):
+    """The metrics.jsonl of a run, else the folder holding its TensorBoard event files."""
+    events = None
+    for root, _, files in sorted(os.walk(folder)):
+        if "metrics.jsonl" in files:
+            return os.path.join(root, "metrics.jsonl")
+        if events is None and any(f.startswith("events.out.tfevents") for f in files):
+            events = root
+    if events is None:
+        raise FileNotFoundError(f"no metrics.jsonl or TensorBoard events under {folder}")
+    return events
+
+
+def load_jsonl(path):
+    curves = {}
+    with open(path) as f:
+        for line in f:
+            r = json.loads(line)
+            if "value" in r and "wall_s" in r:
+                point = (r["step"], r["wall_s"], r["transitions"], r["value"])
+                curves.setdefault(r["tag"], []).append(point)
+    return curves
+
+
+def load_tensorboard(folder):
+    """
+    Scalars of the event files, put on the run's axes through progress/transitions and
+    progress/wall_s: each point keeps its own wall time, relative to the run start.
+    """
+    from tensorboard.backend.event_processing.event_accumulator import EventAccumulator
+
+    events = EventAccumulator(folder, size_guidance={"scalars": 0})
+    events.Reload()
+    tags = events.Tags()["scalars"]
+    if "progress/wall_s" not in tags:
+        raise ValueError(f"{folder} was logged without progress/ scalars")
+    wall = events.Scalars("progress/wall_s")[0]
+    start = wall.wall_time - wall.value
+    per_step = max(
+        (e.value / e.step for e in events.Scalars("progress/transitions") if e.step > 0),
+        default=0,
+    )
+    curves = {}
+    for tag in tags:
+        if not tag.startswith("progress/"):
+            curves[tag] = [
+                (e.step, e.wall_time - start, e.step * per_step, e.value)
+                for e in events.Scalars(tag)
+            ]
+    return curves
+
+
+def load_curves(folder):
+    """{tag: [(step, wall_s, transitions, value)]} of one run, in step order."""
+    logs = find_logs(folder)
+    curves = load_jsonl(logs) if logs.endswith(".jsonl") else load_tensorboard(logs)
+    return {tag: sorted(points) for tag, points in curves.items()}
+
+
+def crossing(curve, threshold, above=True, window=1):
+    """
+    First point where the mean of the last window values reaches threshold (at or above
+    it, or at or below with above=False), None when it never does.
+    """
+    values = np.array([p[3] for p in curve], dtype=np.float64)
+    if len(values) < window:
+        return None
+    smooth = np.convolve(values, np.ones(window) / window, mode="valid")
+    hit = smooth >= threshold if above else smooth <= threshold
+    if not hit.any():
+        return None
+    step, wall, transitions, _ = curve[int(np.argmax(hit)) + window - 1]
+    return dict(step=step, wall_s=wall, transitions=transitions)
+
+
+def aligned(curve, axis, grid):
+    """The curve's values interpolated on a grid of wall_s or transitions, nan outside it."""
+    x = np.array([p[axes.index(axis) + 1] for p in curve], dtype=np.float64)
+    y = np.array([p[3] for p in curve], dtype=np.float64)
+    return np.interp(grid, x, y, left=np.nan, right=np.nan)
+
+
+def efficiency_report(curves, thresholds, window=1):
+    """
+    For every End_reward and symbols_per_ep tag: final and best value, the run's length
+    in seconds and transitions, and with a threshold the step, wall time and transitions
+    at which it was first reached. thresholds maps a target to (threshold, above).
+    """
+    rows = []
+    for tag, curve in sorted(curves.items()):
+        name = tag.rsplit("/", 1)[-1]
+        if name not in targets or not curve:
+            continue
+        threshold, above = thresholds.get(name, (None, True))
+        values = [p[3] for p in curve]
+        _, wall, transitions, _ = curve[-1]
+        row = dict(
+            tag=tag,
+            points=len(curve),
+            final=values[-1],
+            best=max(values) if above else min(values),
+            wall_s=wall,
+            transitions=transitions,
+            transitions_per_second=transitions / wall if wall > 0 else float("nan"),
+        )
+        if threshold is not None:
+            row.update(
+                threshold=threshold,
+                above=above,
+                reached=crossing(curve, threshold, above, window),
+            )
+        rows.append(row)
+    return rows
@@ -0,0 +1,208 @@
+import resource
+import sys
+import numpy as np
+import psutil
+import torch
+from torch import nn
+
+mib = 2 ** 20
+# attributes that point back at shared infrastructure rather than owned memory
+skipped = {"args", "writer", "logger", "reducer", "capture", "checkpointer"}
+
+
+def ppo_rollout_plan(args, rows, critic_obs=True, action_size=1):
+    """
+    Bytes of one PPOTrainer: float32 obs, critic obs, logprobs, actions, values, rewards and
+    dones per row, plus the returns and advantages calculate_returns adds.
+    """
+    obs = int(np.prod(args.obs_space))
+    per_row = obs + 2 * action_size + 5
+    if critic_obs:
+        per_row += obs * args.n_agents
+    return args.episode_len * rows * per_row * 4
+
+
+def ppo_rows(args, per_agent=False):
+    # rollout rows per learn, one per env and agent unless every agent keeps its own buffer
+    rows = args.num_envs * args.learn_n
+    return rows if per_agent else rows * args.n_agents
+
+
+def network_plan(module, optimizer_states=2):
+    """float32 parameters, their gradients and Adam's two moments."""
+    params = sum(p.numel() for p in module.parameters())
+    return params * 4 * (2 + optimizer_states)
+
+
+def replay_plan(size, critic_dims, actor_dims, n_actions, n_agents):
+    """MultiAgentReplayBuffer: float64 states, rewards and actor memories, bool terminals."""
+    critic = size * (2 * critic_dims + n_agents) * 8 + size * n_agents
+    actors = sum(size * (2 * d + n_actions) * 8 for d in actor_dims)
+    return critic + actors
+
+
+def plan_memory(Policy, args):
+    """Planned bytes per buffer and network of a policy class, before building it."""
+    plan = dict(Policy.memory_plan(args))
+    workers = getattr(args, "dp_workers", 1)
+    if workers > 1:
+        # every data parallel learner holds a full replica
+        plan = {k: v * workers for k, v in plan.items()}
+    return plan
+
+
+def budget_bytes(args):
+    if args.memory_budget > 0:
+        return args.memory_budget * 2 ** 30
+    return 0.8 * psutil.virtual_memory().available
+
+
+def format_plan(plan):
+    lines = [
+        f"--- {name}: {(24 - len(name)) * ' '} {size / mib:10.1f} MiB"
+        for name, size in plan.items()
+    ]
+    lines.append(f"--- total: {19 * ' '} {sum(plan.values()) / mib:10.1f} MiB")
+    return "\n".join(lines)
+
+
+def shrink(args, plan):
+    # replay capacity first, then episodes per update; the envs already fix num_envs
+    if any("replay" in name for name in plan) and args.replay_size > 1024:
+        args.replay_size //= 2
+        return f"replay_size -> {args.replay_size}"
+    if args.learn_n > 1:
+        args.learn_n //= 2
+        return f"learn_n -> {args.learn_n}"
+    return None
+
+
+def fit_memory_budget(Policy, args):
+    """
+    Plans the policy's memory from args and holds it against --memory-budget. Over budget
+    it either refuses with a MemoryError or, with --memory-policy shrink, halves the
+    replay size and then learn_n until the plan fits.
+    """
+    budget = budget_bytes(args)
+    while True:
+        plan = plan_memory(Policy, args)
+        total = sum(plan.values())
+        if total <= budget:
+            break
+        change = shrink(args, plan) if args.memory_policy == "shrink" else None
+        if change is None:
+            raise MemoryError(
+                f"planned memory {total / mib:.0f} MiB exceeds the budget of "
+                f"{budget / mib:.0f} MiB:\n{format_plan(plan)}\n"
+                "lower num_envs, batch_size or replay_size, or pass --memory-policy shrink"
+            )
+        print(f"Memory plan over budget, shrinking {change}")
+
+    print("\n*****Memory plan*****")
+    print(format_plan(plan))
+    print(f"--- budget: {18 * ' '} {budget / mib:10.1f} MiB")
+    print("*********************")
+    return plan
+
+
+def array_bytes(value):
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.nelement()
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)) and value:
+        if isinstance(value[0], (torch.Tensor, np.ndarray)):
+            return sum(array_bytes(v) for v in value)
+    return 0
+
+
+def module_bytes(module):
+    total = 0
+    for p in module.parameters():
+        total += array_bytes(p)
+        if p.grad is not None:
+            total += array_bytes(p.grad)
+    return total + sum(array_bytes(b) for b in module.buffers())
+
+
+def optimizer_bytes(optimizer):
+    return sum(
+        array_bytes(v)
+        for state in optimizer.state.values()
+        for v in state.values()
+        if isinstance(v, torch.Tensor)
+    )
+
+
+def live_usage(policy, depth=3):
+    """
+    Bytes actually held, walking the policy's attributes: networks (parameters, gradients,
+    buffers), optimizer state, and for any other object the arrays and tensors it holds.
+    """
+    usage = {}
+    seen = set()
+
+    def visit(name, obj, level):
+        if id(obj) in seen:
+            return
+        seen.add(id(obj))
+        if isinstance(obj, nn.Module):
+            usage[name] = module_bytes(obj)
+        elif isinstance(obj, torch.optim.Optimizer):
+            usage[name] = optimizer_bytes(obj)
+        elif level < depth and isinstance(obj, (list, tuple)):
+            for i, item in enumerate(obj):
+                visit(f"{name}.{i}", item, level + 1)
+        elif level < depth and hasattr(obj, "__dict__"):
+            held = 0
+            for key, value in vars(obj).items():
+                if key in skipped:
+                    continue
+                size = array_bytes(value)
+                if size:
+                    held += size
+                else:
+                    visit(f"{name}.{key}" if name else key, value, level + 1)
+            if held:
+                usage[name or "policy"] = held
+
+    visit("", policy, 0)
+    return usage
+
+
+def peak_rss():
+    # high-water mark of this process, kilobytes on linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak * (1 if sys.platform == "darwin" else 1024)
+
+
+class MemoryMonitor:
+    """Logs RSS, peak RSS, the planned bytes and the bytes each buffer and network holds."""
+
+    def __init__(self, logger, Policy, args):
+        self.logger = logger if args.memory_interval > 0 else None
+        self.Policy = Policy
+        self.interval = args.memory_interval
+        self.last_step = -args.memory_interval
+        self.process = psutil.Process()
+        self.planned = 0
+        if self.logger is not None:
+            self.planned = sum(plan_memory(type(Policy), args).values())
+
+    def tick(self, step):
+        if self.logger is None or step - self.last_step < self.interval:
+            return
+        self.last_step = step
+        log = self.logger.add_scalar
+        log("memory/rss_mb", self.process.memory_info().rss / mib, step)
+        log("memory/peak_rss_mb", peak_rss() / mib, step)
+        log("memory/available_mb", psutil.virtual_memory().available / mib, step)
+        if self.planned:
+            log("memory/planned_mb", self.planned / mib, step)
+        usage = live_usage(self.Policy)
+        for name, size in usage.items():
+            log(f"memory/{name}_mb", size / mib, step)
+        log("memory/tracked_mb", sum(usage.values()) / mib, step)
+        if torch.cuda.is_available():
+            log("memory/cuda_allocated_mb", torch.cuda.memory_allocated() / mib, step)
+            log("memory/cuda_peak_mb", torch.cuda.max_memory_allocated() / mib, step)
@@ -0,0 +1,249 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import torch
+
+
+def to_host(value):
+    # deferred .item() / .cpu().numpy(), run on the writer thread
+    if isinstance(value, torch.Tensor):
+        return value.item() if value.numel() == 1 else value.cpu().numpy()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def global_step(method, args, kwargs):
+    # positional global_step of every SummaryWriter add_* call the sink takes
+    position = 8 if method == "add_histogram_raw" else 2
+    if "global_step" in kwargs:
+        return kwargs["global_step"]
+    return args[position] if len(args) > position else None
+
+
+def figure_to_image(figure):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    canvas = FigureCanvasAgg(figure)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba())[..., :3].copy()
+
+
+class TensorBoardBackend:
+    """
+    Replays every call on a SummaryWriter, at the wall time it was made. The first record
+    of every step also writes progress/transitions and progress/wall_s at that step, so
+    any curve can be put on the env transition or elapsed time axis.
+    """
+
+    def __init__(self, folder):
+        from torch.utils.tensorboard import SummaryWriter
+
+        self.writer = SummaryWriter(folder)
+        self.steps = set()
+
+    def write(self, method, args, kwargs, walltime, progress):
+        step = global_step(method, args, kwargs)
+        if progress is not None and step not in self.steps:
+            self.steps.add(step)
+            transitions, wall = progress
+            self.writer.add_scalar("progress/transitions", transitions, step, walltime)
+            self.writer.add_scalar("progress/wall_s", wall, step, walltime)
+        if method == "add_figure":
+            # rendered here rather than by the writer, the figure is already host side
+            tag, figure, *rest = args
+            kwargs.pop("close", None)
+            image = figure_to_image(figure)
+            kwargs.update(dataformats="HWC", walltime=walltime)
+            return self.writer.add_image(tag, image, *rest, **kwargs)
+        getattr(self.writer, method)(*args, walltime=walltime, **kwargs)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class JsonLinesBackend:
+    """
+    One JSON object per scalar or text record, appended to <folder>/metrics.jsonl, with
+    its wall time, and with the env transitions and seconds since the run started when
+    it has a step. Images and histograms are skipped.
+    """
+
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.file = open(os.path.join(folder, "metrics.jsonl"), "a")
+
+    def write(self, method, args, kwargs, walltime, progress):
+        if method == "add_scalar":
+            tag, value, step = (list(args) + [kwargs.get("global_step")])[:3]
+            record = dict(tag=tag, value=float(value), step=step, time=walltime)
+        elif method == "add_scalars":
+            tag, values, step = (list(args) + [kwargs.get("global_step")])[:3]
+            record = dict(
+                tag=tag,
+                values={k: float(to_host(v)) for k, v in values.items()},
+                step=step,
+                time=walltime,
+            )
+        elif method == "add_text":
+            tag, text, step = (list(args) + [kwargs.get("global_step")])[:3]
+            record = dict(tag=tag, text=text, step=step, time=walltime)
+        else:
+            return
+        if progress is not None:
+            record.update(transitions=progress[0], wall_s=progress[1])
+        self.file.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class NullBackend:
+    """
+    Local stand-in for wandb: groups scalars per step the way wandb.log would and drops them.
+    Keeps the sink's cost measurable with no writer or network behind it.
+    """
+
+    def __init__(self, folder=None):
+        self.records = 0
+        self.steps = set()
+
+    def write(self, method, args, kwargs, walltime, progress):
+        self.records += 1
+        if method == "add_scalar" and len(args) > 2:
+            self.steps.add(args[2])
+
+    def flush(self):
+        self.steps = set()
+
+    def close(self):
+        pass
+
+
+backends = {
+    "tensorboard": TensorBoardBackend,
+    "jsonl": JsonLinesBackend,
+    "null": NullBackend,
+}
+
+
+class MetricsSink:
+    """
+    SummaryWriter-compatible logger that buffers every add_* call in memory and hands the
+    batch to its back ends on a background thread every interval seconds. Tensors are only
+    copied on their device when logged, the host copy happens on the writer thread, so
+    logging never synchronizes the training loop. Each record keeps the wall time of the
+    call and, when it has a step, its progress: env transitions (step x
+    transitions_per_step) and seconds since start, the sink's creation by default. Logged
+    NumPy arrays must not be modified afterwards. With interval 0 calls are written
+    inline, like a plain SummaryWriter.
+    """
+
+    def __init__(self, folder, backends, interval=5.0, transitions_per_step=1, start=None):
+        self.folder = folder
+        self.backends = backends
+        self.interval = interval
+        self.transitions_per_step = transitions_per_step
+        self.start = time.time() if start is None else start
+        self.pending = []
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.thread = None
+        if interval > 0:
+            self.thread = threading.Thread(target=self.loop, daemon=True)
+            self.thread.start()
+
+    def get_logdir(self):
+        return self.folder
+
+    def record(self, method, args, kwargs):
+        # an async device copy, so in-place updates after the call don't leak into the log
+        args = tuple(
+            a.detach().clone() if isinstance(a, torch.Tensor) else a for a in args
+        )
+        walltime = time.time()
+        step = global_step(method, args, kwargs)
+        progress = None
+        if step is not None:
+            progress = (int(step) * self.transitions_per_step, walltime - self.start)
+        entry = (method, args, kwargs, walltime, progress)
+        if self.thread is None:
+            self.write([entry])
+            return
+        with self.lock:
+            self.pending.append(entry)
+
+    def add_scalar(self, *args, **kwargs):
+        self.record("add_scalar", args, kwargs)
+
+    def add_scalars(self, *args, **kwargs):
+        self.record("add_scalars", args, kwargs)
+
+    def add_histogram(self, *args, **kwargs):
+        self.record("add_histogram", args, kwargs)
+
+    def add_histogram_raw(self, *args, **kwargs):
+        self.record("add_histogram_raw", args, kwargs)
+
+    def add_image(self, *args, **kwargs):
+        self.record("add_image", args, kwargs)
+
+    def add_figure(self, *args, **kwargs):
+        self.record("add_figure", args, kwargs)
+
+    def add_text(self, *args, **kwargs):
+        self.record("add_text", args, kwargs)
+
+    def write(self, entries):
+        for method, args, kwargs, walltime, progress in entries:
+            args = tuple(to_host(a) for a in args)
+            for backend in self.backends:
+                backend.write(method, args, dict(kwargs), walltime, progress)
+
+    def drain(self):
+        # write_lock keeps batches in order when flush() races the writer thread
+        with self.write_lock:
+            with self.lock:
+                entries, self.pending = self.pending, []
+            self.write(entries)
+            for backend in self.backends:
+                backend.flush()
+
+    def loop(self):
+        while not self.closed.wait(self.interval):
+            self.drain()
+
+    def flush(self):
+        self.drain()
+
+    def close(self):
+        if self.thread is not None:
+            self.closed.set()
+            self.thread.join()
+            self.drain()
+        for backend in self.backends:
+            backend.close()
+
+
+def make_logger(args, folder):
+    """
+    Experiment logger over args.metrics_backends, written every args.metrics_interval
+    seconds. Every training step steps all args.num_envs environments, wall time counts
+    from args.run_start.
+    """
+    return MetricsSink(
+        folder,
+        [backends[name](folder) for name in args.metrics_backends],
+        args.metrics_interval,
+        args.num_envs,
+        getattr(args, "run_start", None),
+    )
@@ -0,0 +1,512 @@
+import random
+import tracemalloc
+from functools import partial
+from types import SimpleNamespace
+import numpy as np
+import torch
+from framework.utils.benchmark import clock, guarded, summarize
+
+episode_len = 25
+vocab = 10  # full_ref's dim_c
+
+
+class RecordingLogger:
+    """Keeps the last value of every scalar, so logged statistics can be compared."""
+
+    def __init__(self):
+        self.scalars = {}
+
+    def add_scalar(self, tag, value, step):
+        self.scalars[tag] = value
+
+    def add_image(self, *args, **kwargs):
+        pass
+
+
+def measure(run, repeats, warmup=3, alloc_repeats=3):
+    """
+    Per-call wall time of run(), then what one call allocates: bytes traced by tracemalloc
+    (Python objects and NumPy buffers, peak and still held afterwards) and the bytes and
+    allocation count torch's CPU allocator reports to the autograd profiler.
+    """
+    for _ in range(warmup):
+        run()
+    times = []
+    for _ in range(repeats):
+        start = clock()
+        run()
+        times.append(clock() - start)
+
+    peak, held = 0, 0
+    tracemalloc.start()
+    for _ in range(alloc_repeats):
+        # after clear_traces only this call's blocks are traced, frees of older ones are not
+        tracemalloc.clear_traces()
+        run()
+        current, top = tracemalloc.get_traced_memory()
+        peak += top
+        held += current
+    tracemalloc.stop()
+
+    with torch.autograd.profiler.profile(profile_memory=True) as prof:
+        for _ in range(alloc_repeats):
+            run()
+    allocs = [e.self_cpu_memory_usage for e in prof.function_events]
+    allocs = [a for a in allocs if a > 0]
+
+    return dict(
+        time=summarize(times),
+        traced_peak_bytes=peak / alloc_repeats,
+        traced_held_bytes=held / alloc_repeats,
+        torch_bytes=sum(allocs) / alloc_repeats,
+        torch_allocations=len(allocs) / alloc_repeats,
+    )
+
+
+def same(a, b):
+    if isinstance(a, torch.Tensor):
+        return a.shape == b.shape and torch.equal(a, b)
+    if isinstance(a, np.ndarray):
+        return a.shape == b.shape and np.array_equal(a, b)
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+# Reference outputs. Frozen copies of the implementations at the time the suite was
+# written; a rewrite of any hot function has to reproduce them bit for bit.
+
+
+def reference_critic_obs(observations, num_envs, n_agents, obs_size):
+    val_obs_ = torch.tensor(observations).reshape(num_envs, n_agents, -1)
+    val_obs = torch.zeros((num_envs * n_agents, obs_size * n_agents))
+    for i in range(num_envs * n_agents):
+        an = i % n_agents
+        av = i // n_agents
+        full_obs = []
+        for k in range(n_agents):
+            full_obs.append(val_obs_[av][(k + an) % n_agents])
+        val_obs[i] = torch.hstack(full_obs)
+    return val_obs
+
+
+def reference_returns(rewards, values, dones, gamma, gae_lambda):
+    advantages = torch.zeros_like(rewards)
+    lastgaelam = 0
+    for t in reversed(range(len(rewards) - 1)):
+        nextnonterminal = 1.0 - dones[t + 1]
+        delta = rewards[t] + gamma * values[t + 1] * nextnonterminal - values[t]
+        advantages[t] = lastgaelam = (
+            delta + gamma * gae_lambda * nextnonterminal * lastgaelam
+        )
+    return advantages + values, advantages
+
+
+def reference_observation(agent, world):
+    other_agents = []
+    for other in world.agents:
+        if other is agent:
+            continue
+        other_agents.append(other.state.p_pos - agent.state.p_pos)
+        other_agents.append(np.array(other.color[0]))
+        other_agents.append(other.state.c)
+    other_landmarks = [np.zeros(3) for i in range(5)]
+    for i, entity in enumerate(world.landmarks):
+        other_landmarks[i][0:2] = entity.state.p_pos - agent.state.p_pos
+        other_landmarks[i][2] = entity.color[0]
+    goal = np.array([agent.goal_a.color[0], agent.goal_b.color[0]])
+    return np.hstack([agent.state.p_vel] + [goal] + other_landmarks + other_agents)
+
+
+def reference_reward(agent, world):
+    distance = np.linalg.norm(agent.goal_a.state.p_pos - agent.goal_b.state.p_pos)
+    return -distance - (np.argmax(agent.state.c) > 0) * 0.03
+
+
+def reference_derange(xs):
+    for a in range(1, len(xs)):
+        b = random.choice(range(0, a))
+        xs[a], xs[b] = xs[b], xs[a]
+    return xs
+
+
+def reference_comm_stats(comms, n_agents, prefix="dev"):
+    comms = np.array(comms, dtype=int)
+    stats = {f"{prefix}/vocab_size": len(np.unique(comms))}
+    for i in range(n_agents):
+        stats[f"{prefix}/vocab_size_agent_{i}"] = len(np.unique(comms[:, :, i]))
+    stats[f"{prefix}/symbols_per_ep"] = (
+        np.sum(comms != 0) / np.size(comms) * episode_len
+    )
+    for i in range(n_agents):
+        comms_a = comms[:, :, i]
+        stats[f"{prefix}/symbols_per_ep_agent_{i}"] = (
+            np.sum(comms_a != 0) / np.size(comms_a) * episode_len
+        )
+    return stats
+
+
+# Cases. Each builds its fixed inputs and returns (run, check): run is the timed call,
+# check() runs the live implementation on the same inputs and compares it against the
+# reference, returning None or a description of the mismatch.
+
+
+def full_ref_world(N, seed):
+    from scenarios.full_ref import Scenario
+
+    random.seed(seed)
+    scenario = Scenario()
+    world = scenario.make_world(N)
+    scenario.reset_world(world, np.random.RandomState(seed))
+    for agent in world.agents:
+        agent.state.c = np.eye(world.dim_c)[random.randrange(world.dim_c)]
+    return scenario, world
+
+
+def obs_size(N):
+    scenario, world = full_ref_world(N, 0)
+    return len(scenario.observation(world.agents[0], world))
+
+
+def trainer_args(num_envs, N):
+    return SimpleNamespace(
+        num_envs=num_envs,
+        n_agents=N,
+        obs_space=(obs_size(N),),
+        episode_len=episode_len,
+        batch_size=num_envs * episode_len,
+        learn_n=1,
+        device="cpu",
+        gamma=0.99,
+        gae_lambda=0.95,
+    )
+
+
+def make_trainer(args):
+    from framework.policies.ppo_shared_use_future import PPOTrainer
+
+    return PPOTrainer(
+        args, episode_len, args.num_envs, args.obs_space, args.gamma, args.gae_lambda
+    )
+
+
+def step_inputs(args, rng, steps):
+    rows = args.num_envs * args.n_agents
+    size = args.obs_space[0]
+    critic_size = size * args.n_agents
+    return [
+        (
+            torch.tensor(rng.standard_normal((rows, size)), dtype=torch.float),
+            torch.tensor(rng.standard_normal((rows, critic_size)), dtype=torch.float),
+            torch.tensor(rng.standard_normal(rows), dtype=torch.float),
+            torch.tensor(rng.integers(0, vocab, rows), dtype=torch.float),
+            torch.tensor(rng.standard_normal(rows), dtype=torch.float),
+            torch.tensor(rng.standard_normal(rows), dtype=torch.float),
+            torch.tensor(rng.random(rows) < 0.04, dtype=torch.float),
+        )
+        for _ in range(steps)
+    ]
+
+
+def case_critic_obs(num_envs, N, seed):
+    from framework.policies.ppo_shared_use_future import ppo_shared_use_future
+
+    args = trainer_args(num_envs, N)
+    policy = SimpleNamespace(args=args, n_agents=N)
+    rng = np.random.default_rng(seed)
+    obs = rng.standard_normal((num_envs * N,) + args.obs_space).astype(np.float32)
+
+    def run():
+        return ppo_shared_use_future.get_critic_obs(policy, obs)
+
+    def check():
+        expected = reference_critic_obs(obs, num_envs, N, args.obs_space[0])
+        return None if same(run(), expected) else "critic observations differ"
+
+    return run, check
+
+
+def case_store_memory(num_envs, N, seed):
+    args = trainer_args(num_envs, N)
+    trainer = make_trainer(args)
+    inputs = step_inputs(args, np.random.default_rng(seed), episode_len)
+
+    def run():
+        if trainer.counter == episode_len:
+            trainer.counter = 0
+        trainer.store_memory(*inputs[trainer.counter])
+
+    def check():
+        fresh = make_trainer(args)
+        for step in inputs:
+            fresh.store_memory(*step)
+        stored = [
+            fresh.obs,
+            fresh.valobs,
+            fresh.logprobs,
+            fresh.actions,
+            fresh.values,
+            fresh.rewards,
+            fresh.dones,
+        ]
+        for name, field, column in zip(
+            ["obs", "valobs", "logprobs", "actions", "values", "rewards", "dones"],
+            stored,
+            zip(*inputs),
+        ):
+            if not same(field, torch.stack(column)):
+                return f"stored {name} differ"
+        return None if fresh.counter == episode_len else "counter not advanced"
+
+    return run, check
+
+
+def case_calculate_returns(num_envs, N, seed):
+    args = trainer_args(num_envs, N)
+    trainer = make_trainer(args)
+    for step in step_inputs(args, np.random.default_rng(seed), episode_len):
+        trainer.store_memory(*step)
+
+    def run():
+        trainer.calculate_returns()
+
+    def check():
+        run()
+        expected = reference_returns(
+            trainer.rewards, trainer.values, trainer.dones, args.gamma, args.gae_lambda
+        )
+        if not same((trainer.returns, trainer.advantages), expected):
+            return "returns or advantages differ"
+
+    return run, check
+
+
+def case_clear_memory(num_envs, N, seed):
+    args = trainer_args(num_envs, N)
+    trainer = make_trainer(args)
+
+    def run():
+        trainer.clear_memory()
+
+    def check():
+        trainer.obs.fill_(1)
+        run()
+        space = (episode_len, num_envs * N * args.learn_n)
+        expected = [
+            torch.zeros(space + args.obs_space),
+            torch.zeros(space + (args.obs_space[0] * N,)),
+        ] + [torch.zeros(space) for _ in range(5)]
+        live = [
+            trainer.obs,
+            trainer.valobs,
+            trainer.logprobs,
+            trainer.actions,
+            trainer.values,
+            trainer.rewards,
+            trainer.dones,
+        ]
+        if not same(live, expected) or trainer.counter or trainer.cn:
+            return "memory not cleared to zeros"
+
+    return run, check
+
+
+def case_observation(num_envs, N, seed):
+    scenario, world = full_ref_world(N, seed)
+
+    def run():
+        return [scenario.observation(agent, world) for agent in world.agents]
+
+    def check():
+        expected = [reference_observation(agent, world) for agent in world.agents]
+        return None if same(run(), expected) else "observations differ"
+
+    return run, check
+
+
+def case_reward(num_envs, N, seed):
+    scenario, world = full_ref_world(N, seed)
+
+    def run():
+        return [scenario.reward(agent, world) for agent in world.agents]
+
+    def check():
+        expected = [reference_reward(agent, world) for agent in world.agents]
+        return None if same(run(), expected) else "rewards differ"
+
+    return run, check
+
+
+def case_derange(num_envs, N, seed):
+    scenario, _ = full_ref_world(N, seed)
+
+    def run():
+        return scenario.derange(list(range(N)))
+
+    def check():
+        for s in range(100):
+            random.seed(s)
+            live = run()
+            random.seed(s)
+            if live != reference_derange(list(range(N))):
+                return f"derangement differs for seed {s}"
+
+    return run, check
+
+
+def case_analyze_comms(num_envs, N, seed):
+    from framework.experiment_builder import ExperimentBuilder
+    from framework.utils.utterance_render import UtteranceRenderer
+
+    comms = np.random.default_rng(seed).integers(0, vocab, (num_envs, episode_len, N))
+    builder = SimpleNamespace(
+        logger=RecordingLogger(),
+        args=SimpleNamespace(n_agents=N, save_comms=False),
+        episode_len=episode_len,
+        renderer=UtteranceRenderer(vocab, episode_len),
+    )
+
+    def run():
+        ExperimentBuilder.analyze_comms(builder, comms, 0)
+
+    def check():
+        run()
+        expected = reference_comm_stats(comms, N)
+        return None if same(builder.logger.scalars, expected) else "comm statistics differ"
+
+    return run, check
+
+
+def case_replay_buffer(num_envs, N, seed, sample):
+    from framework.policies.maddpg import MultiAgentReplayBuffer
+
+    size = obs_size(N)
+    capacity = num_envs * episode_len
+    batch_size = min(1024, capacity)
+    rng = np.random.default_rng(seed)
+    transitions = [
+        (
+            rng.standard_normal((N, size)),
+            rng.standard_normal(N * size),
+            rng.random((N, vocab)),
+            rng.standard_normal(N),
+            rng.standard_normal((N, size)),
+            rng.standard_normal(N * size),
+            rng.random(N) < 0.04,
+        )
+        for _ in range(256)
+    ]
+
+    def filled():
+        buffer = MultiAgentReplayBuffer(
+            capacity, N * size, [size] * N, vocab, N, batch_size
+        )
+        for i in range(capacity):
+            buffer.store_transition(*transitions[i % len(transitions)])
+        return buffer
+
+    buffer = filled()
+
+    def run():
+        if sample:
+            return buffer.sample_buffer()
+        buffer.store_transition(*transitions[buffer.mem_cntr % len(transitions)])
+
+    def check():
+        live = filled()
+        rows = [transitions[i % len(transitions)] for i in range(capacity)]
+
+        def actor(j):
+            return [np.stack([r[j][a] for r in rows]) for a in range(N)]
+
+        expected = dict(
+            actor_states=actor(0),
+            states=np.stack([r[1] for r in rows]),
+            actions=actor(2),
+            rewards=np.stack([r[3] for r in rows]),
+            actor_new_states=actor(4),
+            states_=np.stack([r[5] for r in rows]),
+            terminal=np.stack([r[6] for r in rows]),
+        )
+        stored = dict(
+            actor_states=live.actor_state_memory,
+            states=live.state_memory,
+            actions=live.actor_action_memory,
+            rewards=live.reward_memory,
+            actor_new_states=live.actor_new_state_memory,
+            states_=live.new_state_memory,
+            terminal=live.terminal_memory,
+        )
+        if not same(stored, expected):
+            return "stored transitions differ"
+        if sample:
+            np.random.seed(seed)
+            sampled = live.sample_buffer()
+            np.random.seed(seed)
+            batch = np.random.choice(capacity, batch_size, replace=False)
+            order = [
+                "actor_states",
+                "states",
+                "actions",
+                "rewards",
+                "actor_new_states",
+                "states_",
+                "terminal",
+            ]
+            for name, value in zip(order, sampled):
+                field = expected[name]
+                want = [f[batch] for f in field] if isinstance(field, list) else field[batch]
+                if not same(value, want):
+                    return f"sampled {name} differ"
+
+    return run, check
+
+
+# name -> (case, whether it scales with num_envs or runs on a single world)
+cases = {
+    "get_critic_obs": (case_critic_obs, True),
+    "store_memory": (case_store_memory, True),
+    "calculate_returns": (case_calculate_returns, True),
+    "clear_memory": (case_clear_memory, True),
+    "observation": (case_observation, False),
+    "reward": (case_reward, False),
+    "derange": (case_derange, False),
+    "analyze_comms": (case_analyze_comms, True),
+    "store_transition": (partial(case_replay_buffer, sample=False), True),
+    "sample_buffer": (partial(case_replay_buffer, sample=True), True),
+}
+
+
+def bench_case(name, num_envs, N, repeats, seed, check_only):
+    run, check = cases[name][0](num_envs, N, seed)
+    mismatch = check()
+    result = dict(check="ok" if mismatch is None else mismatch)
+    if not check_only:
+        result.update(measure(run, repeats))
+    return result
+
+
+def sweep(names, num_envs, agents, repeats, seed=0, check_only=False):
+    results = []
+    for name in names:
+        batched = cases[name][1]
+        for N in agents:
+            for n in num_envs if batched else [None]:
+                record = dict(case=name, num_envs=n, N=N)
+                record.update(guarded(bench_case, name, n, N, repeats, seed, check_only))
+                if record["status"] != "ok":
+                    line = record["error"]
+                elif check_only:
+                    line = f"check {record['check']}"
+                else:
+                    line = (
+                        f"{record['time']['p50_ms']:.3f} ms p50, "
+                        f"{record['traced_peak_bytes'] / 1024:.0f} KiB traced, "
+                        f"{record['torch_allocations']:.0f} torch allocations, "
+                        f"check {record['check']}"
+                    )
+                print(f"{name} num_envs={n} N={N}: {line}")
+                results.append(record)
+    return results
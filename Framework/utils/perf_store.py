@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import subprocess
+import time
+import numpy as np
+
+# fields naming what was measured in each suite's result records
+suite_keys = {
+    "policies": ["model", "env", "num_envs", "hidden_size"],
+    "envs": ["scenario", "N", "engine", "num_envs", "workers"],
+    "micro": ["case", "num_envs", "N"],
+    "training": ["model", "env", "num_envs", "n_agents"],
+}
+# run settings that select what is swept, where it goes or which repeat it is, not how it is measured
+unhashed = {
+    "out",
+    "store",
+    "perf_store",
+    "experiment_name",
+    "seed",
+    "wandb",
+    "video",
+    "metrics_backends",
+    "run_start",
+}
+
+
+def git_revision():
+    """(commit, dirty) of the working tree, (None, False) outside a git checkout."""
+    try:
+        rev = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+        status = subprocess.check_output(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return rev, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def digest(value):
+    text = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def settings(config):
+    return {
+        k: settings(v) if isinstance(v, dict) else v
+        for k, v in config.items()
+        if k not in unhashed and not isinstance(v, list)
+    }
+
+
+def config_hash(config, key):
+    # what was measured plus how, so a changed setting never compares as the same config
+    return digest(dict(key=key, settings=settings(config)))
+
+
+def machine_fingerprint(machine):
+    fields = ("host", "processor", "cpus", "physical_cpus", "cuda", "torch", "numpy")
+    return digest({k: machine.get(k) for k in fields})
+
+
+def metrics_of(record, key_fields):
+    """
+    Distribution metrics from every latency summary in the record, as (mean, std, n)
+    in ms, the ones already in that form as they are, and scalar metrics from its other
+    numeric fields.
+    """
+    metrics = {}
+    for name, value in record.items():
+        if name in key_fields or isinstance(value, bool):
+            continue
+        if isinstance(value, dict) and {"mean", "std", "n"} <= set(value):
+            metrics[name] = value
+        elif isinstance(value, dict) and value.get("calls"):
+            metrics[f"{name}_ms"] = dict(
+                mean=value["mean_ms"], std=value["std_ms"], n=value["calls"]
+            )
+        elif isinstance(value, (int, float)) and np.isfinite(value):
+            metrics[name] = float(value)
+    return metrics
+
+
+def append_report(store, report):
+    """Appends every successful result of a benchmark report to the store, one JSON line each."""
+    rev, dirty = git_revision()
+    suite = report["suite"]
+    key_fields = suite_keys[suite]
+    fingerprint = machine_fingerprint(report["machine"])
+    os.makedirs(os.path.dirname(os.path.abspath(store)), exist_ok=True)
+    count = 0
+    with open(store, "a") as f:
+        for result in report["results"]:
+            if result.get("status", "ok") != "ok" or result.get("check", "ok") != "ok":
+                continue
+            key = {k: result.get(k) for k in key_fields}
+            entry = dict(
+                suite=suite,
+                key=key,
+                metrics=metrics_of(result, key_fields),
+                revision=rev,
+                dirty=dirty,
+                config_hash=config_hash(report["config"], key),
+                fingerprint=fingerprint,
+                machine=report["machine"],
+                created=report["created"],
+                time=time.time(),
+            )
+            f.write(json.dumps(entry) + "\n")
+            count += 1
+    return count
+
+
+def load_store(store, suite=None):
+    entries = []
+    with open(store) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if suite is None or entry["suite"] == suite:
+                    entries.append(entry)
+    return entries
+
+
+def revisions(entries):
+    # in the order they were first recorded
+    seen = []
+    for e in entries:
+        if e["revision"] and e["revision"] not in seen:
+            seen.append(e["revision"])
+    return seen
+
+
+def pooled(samples):
+    """Mean, variance and count of the union of several (mean, std, n) summaries or plain values."""
+    if isinstance(samples[0], dict):
+        n = np.array([s["n"] for s in samples], dtype=np.float64)
+        mean = np.array([s["mean"] for s in samples])
+        var = np.array([s["std"] for s in samples]) ** 2
+        total = n.sum()
+        grand = (n * mean).sum() / total
+        return grand, (n * (var + (mean - grand) ** 2)).sum() / max(total - 1, 1), total
+    values = np.array(samples, dtype=np.float64)
+    var = values.var(ddof=1) if len(values) > 1 else np.nan
+    return values.mean(), var, len(values)
+
+
+def welch(a, b):
+    """Two-sided Welch t-test p-value between two pooled samples, nan when untestable."""
+    from scipy.stats import t
+
+    (m1, v1, n1), (m2, v2, n2) = a, b
+    if n1 < 2 or n2 < 2 or not np.isfinite(v1 + v2):
+        return np.nan
+    se1, se2 = v1 / n1, v2 / n2
+    if se1 + se2 == 0:
+        return 0.0 if m1 != m2 else 1.0
+    stat = (m2 - m1) / np.sqrt(se1 + se2)
+    df = (se1 + se2) ** 2 / (se1 ** 2 / (n1 - 1) + se2 ** 2 / (n2 - 1))
+    return float(2 * t.sf(abs(stat), df))
+
+
+def higher_is_better(metric):
+    return metric.endswith("per_second")
+
+
+def compare(entries, baseline, candidate, alpha=0.01, min_change=0.02, same_machine=True):
+    """
+    Compares every metric of every configuration measured at both revisions (prefixes of
+    the stored commit). A change counts when it is statistically significant at alpha
+    (Welch, over per-call distributions or over repeated runs) and larger than
+    min_change relative to the baseline. Returns one row per metric.
+    """
+
+    def side(rev):
+        groups = {}
+        for e in entries:
+            if e["revision"] and e["revision"].startswith(rev):
+                group = (e["suite"], e["config_hash"]) + (
+                    (e["fingerprint"],) if same_machine else ()
+                )
+                groups.setdefault(group, []).append(e)
+        return groups
+
+    before, after = side(baseline), side(candidate)
+    rows = []
+    for group in sorted(set(before) & set(after)):
+        names = set.intersection(
+            *(set(e["metrics"]) for e in before[group] + after[group])
+        )
+        for name in sorted(names):
+            a = pooled([e["metrics"][name] for e in before[group]])
+            b = pooled([e["metrics"][name] for e in after[group]])
+            change = (b[0] - a[0]) / abs(a[0]) if a[0] else np.nan
+            p = welch(a, b)
+            worse = change < 0 if higher_is_better(name) else change > 0
+            significant = p < alpha and abs(change) >= min_change
+            rows.append(
+                dict(
+                    suite=group[0],
+                    key=before[group][0]["key"],
+                    metric=name,
+                    baseline=a[0],
+                    candidate=b[0],
+                    change=change,
+                    p=p,
+                    verdict=(
+                        ("regression" if worse else "improvement")
+                        if significant
+                        else "unchanged"
+                    ),
+                )
+            )
+    return rows
+
+
+def record_training(store, args):
+    """
+    Appends a training run's flushed timer values (steps/s and per-phase ms, as
+    distributions over the flushes) and its peak RSS, keyed like the training suite.
+    """
+    from framework.utils.benchmark import machine, peak_rss_mb
+    from framework.utils.timing import timers
+
+    metrics = dict(timers.summary(), peak_rss_mb=peak_rss_mb())
+    if not metrics.get("steps_per_second"):
+        return 0
+
+    config = {k: v for k, v in vars(args).items() if isinstance(v, (int, float, str))}
+    report = dict(
+        suite="training",
+        config=config,
+        machine=machine(),
+        created=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        results=[dict({k: config.get(k) for k in suite_keys["training"]}, **metrics)],
+    )
+    return append_report(store, report)
@@ -0,0 +1,184 @@
+import copy
+import numpy as np
+from framework.utils.benchmark import (
+    NullLogger,
+    clock,
+    guarded,
+    peak_rss_mb,
+    run_isolated,
+    summarize,
+)
+
+# every name handled by get_env, the env switch run.py goes through
+bench_envs = [
+    "simple",
+    "communication",
+    "iterated",
+    "complex_communication",
+    "full_communication_2",
+    "full_communication_3",
+    "full_communication_4",
+    "spread",
+]
+
+
+def env_spaces(env_name):
+    """n_agents, padded observation shape and action count, the way run.py reads them."""
+    import supersuit as ss
+    from framework.environments import get_env
+
+    env = get_env(env_name)
+    n_agents = env.max_num_agents
+    env = ss.pettingzoo_env_to_vec_env_v1(ss.pad_observations_v0(env))
+    spaces = (n_agents, env.observation_space.shape, env.action_space.n)
+    env.close()
+    return spaces
+
+
+def bench_args(base, model, env_name, num_envs, hidden_size, device):
+    args = copy.copy(base)
+    args.model = model
+    args.env = env_name
+    args.n_agents, args.obs_space, args.action_space = env_spaces(env_name)
+    args.num_envs = num_envs
+    args.learn_n = max(1, args.batch_size // num_envs)
+    args.hidden_size = hidden_size
+    args.device = device
+    args.cuda = device != "cpu"
+    args.wandb = False
+    args.stats_interval = 0
+    args.dp_workers = 1
+    return args
+
+
+def learners(policy):
+    # whatever owns learn(): a shared Agent, a list of per-agent Agents or a MADDPG object
+    found = []
+    for name in ("agent", "agents"):
+        owner = getattr(policy, name, None)
+        if hasattr(owner, "learn"):
+            found.append(owner)
+        elif isinstance(owner, (list, tuple)):
+            found += [a for a in owner if hasattr(a, "learn")]
+    return found
+
+
+def time_learn(policy, times):
+    """Shadows every learn() with a timed one, so learn can be split out of store()."""
+    for owner in learners(policy):
+
+        def timed(*args, _learn=owner.learn, **kwargs):
+            start = clock()
+            try:
+                return _learn(*args, **kwargs)
+            finally:
+                times.append(clock() - start)
+
+        owner.learn = timed
+
+
+def bench_policy(args, rounds, seed):
+    """
+    Drives one policy through the run_experiment step loop on synthetic observations:
+    a warm-up learn_n block, then rounds more, each ending in one Agent.learn. store()
+    time is reported without the learn calls it triggers, one per agent for per-agent
+    learners, and the learn calls of the warm-up block are reported apart.
+    """
+    import torch
+    from framework.policy import policies_dic
+    from framework.utils.memory import plan_memory
+
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    rows = args.num_envs * args.n_agents
+    obs = rng.standard_normal((rows,) + tuple(args.obs_space)).astype(np.float32)
+    rewards = rng.standard_normal(rows).astype(np.float32)
+    live = np.zeros(rows, dtype=bool)
+    done = np.ones(rows, dtype=bool)
+
+    rss_before = peak_rss_mb()
+    if args.device != "cpu":
+        torch.cuda.reset_peak_memory_stats()
+    policy = policies_dic[args.model](args, NullLogger())
+    learn_times = []
+    time_learn(policy, learn_times)
+
+    block = args.episode_len * args.learn_n
+    action_times, store_times = [], []
+    warm = 0
+    for step in range(block * (rounds + 1)):
+        if step == block:
+            warm = len(learn_times)
+        new_episode = (step % args.episode_len) == 0
+        dones = done if (step + 1) % args.episode_len == 0 else live
+
+        start = clock()
+        policy.action(obs, new_episode=new_episode)
+        action_time = clock() - start
+
+        learned = len(learn_times)
+        start = clock()
+        policy.store(step, obs, rewards, dones)
+        store_time = clock() - start
+        if len(learn_times) > learned:
+            store_time -= sum(learn_times[learned:])
+
+        if step >= block:
+            action_times.append(action_time)
+            store_times.append(store_time)
+
+    action = summarize(action_times)
+    result = dict(
+        steps=len(action_times),
+        env_steps_per_second=args.num_envs * action["calls"] / action["total_s"],
+        agent_steps_per_second=rows * action["calls"] / action["total_s"],
+        action=action,
+        store=summarize(store_times),
+        learn=summarize(learn_times[warm:]),
+        learn_warmup_ms=sum(learn_times[:warm]) / 1e6 if warm else None,
+        peak_rss_mb=peak_rss_mb(),
+        peak_rss_growth_mb=peak_rss_mb() - rss_before,
+        planned_mb=sum(plan_memory(policies_dic[args.model], args).values()) / 2 ** 20,
+    )
+    if args.device != "cpu":
+        result["cuda_peak_mb"] = torch.cuda.max_memory_allocated() / 2 ** 20
+    return result
+
+
+def bench_config(base, model, env_name, num_envs, hidden_size, device, rounds, seed):
+    args = bench_args(base, model, env_name, num_envs, hidden_size, device)
+    return bench_policy(args, rounds, seed)
+
+
+def sweep(base, models, envs, num_envs, hidden_sizes, device="cpu", rounds=2, seed=0):
+    """Every model x env x num_envs x hidden_size, each in its own process."""
+    results = []
+    for model in models:
+        for env_name in envs:
+            for n in num_envs:
+                for hidden_size in hidden_sizes:
+                    record = run_isolated(
+                        guarded,
+                        bench_config,
+                        base,
+                        model,
+                        env_name,
+                        n,
+                        hidden_size,
+                        device,
+                        rounds,
+                        seed,
+                    )
+                    record.update(
+                        model=model, env=env_name, num_envs=n, hidden_size=hidden_size
+                    )
+                    print(
+                        f"{model} {env_name} num_envs={n} hidden={hidden_size}: "
+                        + (
+                            f"{record['env_steps_per_second']:.0f} env steps/s"
+                            if record["status"] == "ok"
+                            else record["error"]
+                        )
+                    )
+                    results.append(record)
+    return results
@@ -0,0 +1,71 @@
+import os
+from framework.utils.timing import timers
+
+
+class NoProfiler:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def step(self):
+        pass
+
+
+class StepProfiler:
+    """
+    torch.profiler over a window of training steps, CPU activity only: skip profile_start
+    steps, then wait / warmup / active. The active window defaults to one learn_n block plus
+    a step, so it always spans an Agent.learn call. In actor/learner mode a profiler step
+    is one round of trajectories from every actor (episode_len training steps), so the
+    schedule counts rounds and the default is learn_n + 1 of them. The timer phases are
+    emitted as record_function labels while it runs. Chrome traces and operator tables
+    are written to folder.
+    """
+
+    def __init__(self, args, folder):
+        self.args = args
+        self.folder = folder
+        block = args.learn_n if args.actors else args.episode_len * args.learn_n
+        self.active = args.profile_active or block + 1
+
+    def export(self, prof):
+        name = f"step_{prof.step_num}"
+        prof.export_chrome_trace(os.path.join(self.folder, f"trace_{name}.json"))
+        averages = prof.key_averages()
+        with open(os.path.join(self.folder, f"operators_{name}.txt"), "w") as f:
+            f.write(averages.table(sort_by="self_cpu_time_total", row_limit=50))
+            f.write("\n")
+            f.write(averages.table(sort_by="cpu_time_total", row_limit=50))
+
+    def __enter__(self):
+        from torch.profiler import profile, schedule, ProfilerActivity
+
+        os.makedirs(self.folder, exist_ok=True)
+        self.profiler = profile(
+            activities=[ProfilerActivity.CPU],
+            schedule=schedule(
+                skip_first=self.args.profile_start,
+                wait=self.args.profile_wait,
+                warmup=self.args.profile_warmup,
+                active=self.active,
+                repeat=1,
+            ),
+            on_trace_ready=self.export,
+            record_shapes=True,
+        )
+        self.profiler.__enter__()
+        timers.label(True)
+        return self
+
+    def __exit__(self, *exc):
+        timers.label(False)
+        self.profiler.__exit__(*exc)
+
+    def step(self):
+        self.profiler.step()
+
+
+def make_profiler(args, folder):
+    return StepProfiler(args, folder) if args.profile else NoProfiler()
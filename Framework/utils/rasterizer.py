@@ -0,0 +1,93 @@
+import numpy as np
+from framework.utils.utterance_render import labels
+
+background = np.array([255, 255, 255], dtype=np.float32)
+
+
+def camera_range(pos):
+    # same framing as the MPE viewer, per episode: everything in view, at least [-1, 1]
+    return np.maximum(1.0, np.abs(pos).reshape(len(pos), -1).max(1) * 1.05)
+
+
+class Rasterizer:
+    """
+    Pure NumPy renderer for the full_ref / iterated scenes. Draws every frame of a batch of
+    recorded episodes at once: anti-aliased circles for agents (translucent) and landmarks
+    in entity order, like the MPE viewer, and the symbol each agent emits on top of it.
+    """
+
+    def __init__(self, size=400, chunk=64):
+        self.size = size
+        self.chunk = chunk
+        # pixel centres in [-1, 1], y pointing up
+        grid = (np.arange(size, dtype=np.float32) + 0.5) / size * 2 - 1
+        self.xs = grid[None, None, :]
+        self.ys = -grid[None, :, None]
+        self.glyphs = self.build_glyphs(max(1, size // 150))
+
+    def build_glyphs(self, scale):
+        from PIL import Image, ImageDraw, ImageFont
+
+        font = ImageFont.load_default()
+        glyphs = {}
+        for s, label in enumerate(labels[2:], start=1):
+            image = Image.new("L", (12, 12))
+            ImageDraw.Draw(image).text((3, 0), label, fill=255, font=font)
+            mask = np.array(image) > 127
+            glyphs[s] = mask.repeat(scale, 0).repeat(scale, 1)
+        return glyphs
+
+    def draw_circles(self, frames, pos, size, color, alpha, r):
+        """
+        frames (F, H, W, 3) float, pos (F, E, 2), size/alpha (F, E), color (F, E, 3),
+        r (F,) camera range. Circles are blended in place in entity order.
+        """
+        px = 2 / self.size
+        for e in range(pos.shape[1]):
+            cx = (pos[:, e, 0] / r)[:, None, None]
+            cy = (pos[:, e, 1] / r)[:, None, None]
+            radius = (size[:, e] / r)[:, None, None]
+            dist = np.sqrt((self.xs - cx) ** 2 + (self.ys - cy) ** 2)
+            # one pixel wide edge for anti-aliasing
+            cover = np.clip((radius - dist) / px + 0.5, 0, 1) * alpha[:, e, None, None]
+            frames += cover[..., None] * (color[:, e, None, None, :] - frames)
+
+    def draw_symbols(self, frames, pos, symbols, r):
+        """Stamps the glyph of every non-silent symbol at its agent's position, all frames at once."""
+        half = self.size / 2
+        for s, glyph in self.glyphs.items():
+            f, a = np.nonzero(symbols == s)
+            if len(f) == 0:
+                continue
+            gy, gx = np.nonzero(glyph)
+            cx = np.round((pos[f, a, 0] / r[f] + 1) * half).astype(int)
+            cy = np.round((1 - pos[f, a, 1] / r[f]) * half).astype(int)
+            y = cy[:, None] + gy[None, :] - glyph.shape[0] // 2
+            x = cx[:, None] + gx[None, :] - glyph.shape[1] // 2
+            inside = (y >= 0) & (y < self.size) & (x >= 0) & (x < self.size)
+            frames[np.broadcast_to(f[:, None], y.shape)[inside], y[inside], x[inside]] = 0
+
+    def render(self, episodes):
+        """
+        episodes as written by EpisodeRecorder: pos (N, T, E, 2), symbols (N, T, A),
+        color, size, agent (N, E). Returns uint8 frames (N, T, size, size, 3).
+        """
+        N, T, E, _ = episodes["pos"].shape
+        r = np.repeat(camera_range(episodes["pos"]), T)
+        pos = episodes["pos"].reshape(N * T, E, 2)
+        symbols = episodes["symbols"].reshape(N * T, -1)
+        size = np.repeat(episodes["size"], T, axis=0)
+        color = np.repeat(episodes["color"], T, axis=0) * 255
+        alpha = np.where(np.repeat(episodes["agent"], T, axis=0), 0.5, 1.0)
+
+        out = np.empty((N * T, self.size, self.size, 3), dtype=np.uint8)
+        # chunks of frames bound the (frames, H, W) temporaries
+        for i in range(0, N * T, self.chunk):
+            j = slice(i, i + self.chunk)
+            frames = np.broadcast_to(
+                background, (len(pos[j]), self.size, self.size, 3)
+            ).copy()
+            self.draw_circles(frames, pos[j], size[j], color[j], alpha[j], r[j])
+            self.draw_symbols(frames, pos[j], symbols[j], r[j])
+            out[j] = frames.astype(np.uint8)
+        return out.reshape(N, T, self.size, self.size, 3)
@@ -0,0 +1,112 @@
+import numpy as np
+import torch
+from torch.utils.tensorboard import SummaryWriter
+
+
+class RolloutStats:
+    """
+    Streaming statistics over the training episodes, fed from Policy.store.
+    Everything is accumulated on args.device and only synchronised when flushed to the
+    logger every args.stats_interval steps, covering the episodes completed since the last flush.
+    """
+
+    def __init__(self, args, logger: SummaryWriter, num_envs=None, prefix="train"):
+        self.args = args
+        self.logger = logger
+        self.prefix = prefix
+        self.n_agents = args.n_agents
+        self.num_envs = num_envs if num_envs is not None else args.num_envs
+        self.episode_len = args.episode_len
+        self.vocab = args.action_space // 5
+        self.device = args.device
+
+        size = self.num_envs * self.n_agents
+        self.ep_return = torch.zeros(size, device=self.device)
+        self.ep_symbols = torch.zeros(size, device=self.device)
+        self.symbol_counts = torch.zeros(
+            self.n_agents * self.vocab, dtype=torch.long, device=self.device
+        )
+        self.agent_index = (
+            torch.arange(size, device=self.device) % self.n_agents
+        ) * self.vocab
+        self.t = 0
+        self.last_flush = 0
+        self.reset_window()
+
+    def reset_window(self):
+        self.returns, self.end_rewards, self.symbols = [], [], []
+        self.symbol_counts.zero_()
+
+    def reset(self):
+        """Drops the episodes in progress and the unflushed window, e.g. after new weights."""
+        self.ep_return.zero_()
+        self.ep_symbols.zero_()
+        self.t = 0
+        self.reset_window()
+
+    def update(self, step, actions, rewards):
+        actions = torch.as_tensor(actions, device=self.device).long().reshape(-1)
+        rewards = torch.as_tensor(rewards, device=self.device, dtype=torch.float)
+
+        symbols = actions // 5
+        self.symbol_counts += torch.bincount(
+            self.agent_index + symbols, minlength=self.n_agents * self.vocab
+        )
+        self.ep_return += rewards
+        self.ep_symbols += symbols != 0
+        self.t += 1
+
+        if self.t == self.episode_len:
+            # per env: mean over agents, the reductions score() uses
+            self.returns.append(self.ep_return.reshape(-1, self.n_agents).mean(1))
+            self.end_rewards.append(rewards.reshape(-1, self.n_agents).mean(1))
+            self.symbols.append(self.ep_symbols.reshape(-1, self.n_agents).clone())
+            self.ep_return.zero_()
+            self.ep_symbols.zero_()
+            self.t = 0
+
+        if step - self.last_flush >= self.args.stats_interval and self.returns:
+            self.flush(step)
+
+    def flush(self, step):
+        self.last_flush = step
+        returns = torch.cat(self.returns).cpu().numpy()
+        end_rewards = torch.cat(self.end_rewards).cpu().numpy()
+        symbols = torch.cat(self.symbols).cpu().numpy()
+        counts = self.symbol_counts.reshape(self.n_agents, self.vocab).cpu().numpy()
+        prefix = self.prefix
+
+        self.logger.add_scalar(f"{prefix}/episodes", len(returns), step)
+        self.logger.add_scalar(f"{prefix}/End_reward", end_rewards.mean(), step)
+        self.logger.add_scalar(f"{prefix}/Episode_return", returns.mean(), step)
+        self.logger.add_histogram(f"{prefix}/End_reward_hist", end_rewards, step)
+        self.logger.add_histogram(f"{prefix}/Episode_return_hist", returns, step)
+
+        self.logger.add_scalar(f"{prefix}/symbols_per_ep", symbols.mean(), step)
+        self.logger.add_scalar(f"{prefix}/vocab_size", np.sum(counts.sum(0) > 0), step)
+        for i in range(self.n_agents):
+            self.logger.add_scalar(
+                f"{prefix}/symbols_per_ep_agent_{i}", symbols[:, i].mean(), step
+            )
+            self.logger.add_scalar(
+                f"{prefix}/vocab_size_agent_{i}", np.sum(counts[i] > 0), step
+            )
+            self.add_counts(f"{prefix}/symbols_agent_{i}", counts[i], step)
+
+        self.reset_window()
+
+    def add_counts(self, tag, counts, step):
+        values = np.arange(len(counts))
+        total = counts.sum()
+        if total == 0:
+            return
+        self.logger.add_histogram_raw(
+            tag,
+            min=float(values[counts > 0].min()),
+            max=float(values[counts > 0].max()),
+            num=int(total),
+            sum=float((values * counts).sum()),
+            sum_squares=float((values**2 * counts).sum()),
+            bucket_limits=(values + 0.5).tolist(),
+            bucket_counts=counts.tolist(),
+        )
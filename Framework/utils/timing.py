@@ -0,0 +1,116 @@
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from torch.autograd.profiler import record_function
+
+clock = time.perf_counter_ns
+off = nullcontext()
+
+
+class Phase:
+    __slots__ = ("totals", "counts", "name", "start")
+
+    def __init__(self, totals, counts, name):
+        self.totals = totals
+        self.counts = counts
+        self.name = name
+
+    def __enter__(self):
+        self.start = clock()
+
+    def __exit__(self, *exc):
+        self.totals[self.name] += clock() - self.start
+        self.counts[self.name] += 1
+
+
+class LabeledPhase(Phase):
+    # also a record_function range while the profiler is on
+    __slots__ = ("record",)
+
+    def __enter__(self):
+        self.record = record_function(self.name)
+        self.record.__enter__()
+        super().__enter__()
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        self.record.__exit__(*exc)
+
+
+class PhaseTimers:
+    """
+    Wall time per hot-path phase, aggregated in nanoseconds between flushes. Phase names nest
+    with "/" (store/learn/backward sits inside store/learn), so a parent's share already
+    includes its children. With no logger attached every phase is a shared no-op context.
+    CUDA work is timed as launched, not as executed. With labels on, phases double as
+    torch.profiler record_function ranges.
+    """
+
+    def __init__(self):
+        self.logger = None
+        self.interval = 0
+        self.labels = False
+        self.phases = {}
+
+    def configure(self, logger, interval):
+        self.logger = logger if interval > 0 else None
+        self.interval = interval
+        # every flushed value, for the run-level summary
+        self.history = defaultdict(list)
+        self.reset(0)
+
+    def reset(self, step):
+        self.totals = defaultdict(int)
+        self.counts = defaultdict(int)
+        self.phases = {}
+        self.last_step = step
+        self.last_time = clock()
+
+    def label(self, on):
+        self.labels = on
+        self.phases = {}
+
+    def phase(self, name):
+        if self.logger is None:
+            return record_function(name) if self.labels else off
+        phase = self.phases.get(name)
+        if phase is None:
+            cls = LabeledPhase if self.labels else Phase
+            phase = self.phases[name] = cls(self.totals, self.counts, name)
+        return phase
+
+    def start(self, name):
+        # for spans that don't fit a with block, closed by stop()
+        phase = self.phase(name)
+        phase.__enter__()
+        return phase
+
+    def stop(self, phase):
+        phase.__exit__(None, None, None)
+
+    def tick(self, step):
+        if self.logger is None or step - self.last_step < self.interval:
+            return
+        elapsed = clock() - self.last_time
+        rate = (step - self.last_step) / (elapsed / 1e9)
+        self.logger.add_scalar("timing/steps_per_second", rate, step)
+        self.history["steps_per_second"].append(rate)
+        for name, total in self.totals.items():
+            mean = total / 1e6 / self.counts[name]
+            self.logger.add_scalar(f"timing/{name}_pct", 100 * total / elapsed, step)
+            self.logger.add_scalar(f"timing/{name}_ms", mean, step)
+            self.history[f"{name}_ms"].append(mean)
+        self.reset(step)
+
+    def summary(self):
+        """Mean, std and count of every flushed steps/s and per-phase ms value of the run."""
+        summary = {}
+        for name, values in getattr(self, "history", {}).items():
+            mean = sum(values) / len(values)
+            var = sum((v - mean) ** 2 for v in values) / max(len(values) - 1, 1)
+            summary[name] = dict(mean=mean, std=var ** 0.5, n=len(values))
+        return summary
+
+
+# process wide, configured by the experiment builder, imported by the policies
+timers = PhaseTimers()
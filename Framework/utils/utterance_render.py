@@ -0,0 +1,70 @@
+import os
+import re
+import numpy as np
+import seaborn as sns
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.patches as mpatches
+
+labels = "**ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+class UtteranceRenderer:
+    """
+    Turns a (episodes, episode_len, n_agents) comm array into an HWC uint8 image, one column
+    per agent and a grey separator column after every episode, with a single palette lookup.
+    The palette and the legend strip only depend on the vocabulary, so they are built once.
+    """
+
+    def __init__(self, vocab, episode_len, cell=8, episodes=10):
+        self.vocab = vocab
+        self.episode_len = episode_len
+        self.cell = cell
+        self.episodes = episodes
+
+        pallete = [(0.7, 0.7, 0.7)] + list(sns.color_palette("crest", vocab))
+        self.pallete = np.round(np.array(pallete) * 255).astype(np.uint8)
+        self.legend = self.render_legend()
+
+    def render_legend(self):
+        # Agg canvas without pyplot, nothing is registered globally so nothing is leaked
+        height = max(self.episode_len * self.cell, 12 * self.vocab + 12)
+        fig = Figure(figsize=(0.6, height / 100), dpi=100)
+        canvas = FigureCanvasAgg(fig)
+        patches = [
+            mpatches.Patch(color=self.pallete[i] / 255, label=labels[i])
+            for i in range(1, self.vocab + 1)
+        ]
+        fig.legend(handles=patches, loc="center", frameon=False, fontsize=7)
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba())[:, :, :3].copy()
+
+    def grid(self, comms):
+        episodes = min(self.episodes, len(comms))
+        n_agents = comms.shape[2]
+        # 0 is the separator, symbol s is palette entry s + 1
+        dummy = np.zeros((self.episode_len, episodes, n_agents + 1), dtype=np.intp)
+        dummy[:, :, :n_agents] = comms[:episodes].transpose(1, 0, 2) + 1
+        return dummy.reshape(self.episode_len, -1)
+
+    def render(self, comms):
+        image = self.pallete[self.grid(np.asarray(comms, dtype=int))]
+        image = image.repeat(self.cell, axis=0).repeat(self.cell, axis=1)
+
+        height = max(len(image), len(self.legend))
+        out = np.full((height, image.shape[1] + self.legend.shape[1], 3), 255, np.uint8)
+        out[: len(image), : image.shape[1]] = image
+        out[: len(self.legend), image.shape[1] :] = self.legend
+        return out
+
+
+def safe_name(tag):
+    # logger tags as file names, e.g. dev_|0-1| -> dev__0-1_, "|" is not allowed on Windows
+    return re.sub(r"[^A-Za-z0-9._-]", "_", tag)
+
+
+def save_comms(folder, tag, step, comms):
+    """Raw (episodes, episode_len, n_agents) comm array for offline plotting."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{safe_name(tag)}_{step}.npy")
+    np.save(path, np.asarray(comms, dtype=np.int8))
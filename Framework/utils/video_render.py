@@ -0,0 +1,53 @@
+import os
+import numpy as np
+import torch.multiprocessing as mp
+from framework.utils.episode_log import load_episodes
+from framework.utils.rasterizer import Rasterizer
+
+
+def write_video(frames, path, fps=10):
+    if path.endswith(".gif"):
+        from PIL import Image
+
+        images = [Image.fromarray(f) for f in frames]
+        images[0].save(
+            path, save_all=True, append_images=images[1:], duration=1000 // fps, loop=0
+        )
+    else:
+        import torch
+        from torchvision.io import write_video as write_mp4
+
+        write_mp4(path, torch.from_numpy(frames), fps=fps)
+
+
+def render_job(job):
+    path, indices, out_dir, fmt, fps, size = job
+    episodes = {k: v[indices] for k, v in load_episodes(path).items()}
+    videos = Rasterizer(size).render(episodes)
+    name = os.path.splitext(os.path.basename(path))[0]
+    outputs = []
+    for i, frames in zip(indices, videos):
+        out = os.path.join(out_dir, f"{name}-episode-{i}.{fmt}")
+        write_video(frames, out, fps)
+        outputs.append(out)
+    return outputs
+
+
+def render_files(paths, out_dir=None, fmt="mp4", fps=10, size=400, workers=None):
+    """
+    Renders every episode of every log in a pool of worker processes. Each job rasterizes
+    a slice of one log's episodes in a single batched call.
+    """
+    workers = workers or max(1, os.cpu_count() - 1)
+    jobs = []
+    for path in paths:
+        n = len(load_episodes(path)["pos"])
+        folder = out_dir or os.path.dirname(os.path.dirname(os.path.abspath(path)))
+        os.makedirs(folder, exist_ok=True)
+        for indices in np.array_split(np.arange(n), min(n, workers)):
+            jobs.append((path, indices, folder, fmt, fps, size))
+    if not jobs:
+        return []
+
+    with mp.get_context("spawn").Pool(min(workers, len(jobs))) as pool:
+        return [out for outputs in pool.map(render_job, jobs) for out in outputs]
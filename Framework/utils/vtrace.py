@@ -0,0 +1,41 @@
+import torch
+
+
+def vtrace_returns(
+    behaviour_logprobs,
+    target_logprobs,
+    rewards,
+    values,
+    dones,
+    gamma,
+    rho_bar=1.0,
+    c_bar=1.0,
+):
+    """
+    V-trace targets (Espeholt et al. 2018) for (num_steps, batch) rollouts.
+    Bootstraps like PPOTrainer.calculate_returns, the last step of a block has no successor.
+    Returns (vs, pg_advantages).
+    """
+    with torch.no_grad():
+        rhos = torch.exp(target_logprobs - behaviour_logprobs)
+        clipped_rhos = torch.clamp(rhos, max=rho_bar)
+        cs = torch.clamp(rhos, max=c_bar)
+
+        nextnonterminal = 1.0 - dones[1:]
+        deltas = clipped_rhos[:-1] * (
+            rewards[:-1] + gamma * values[1:] * nextnonterminal - values[:-1]
+        )
+
+        vs_minus_v = torch.zeros_like(values)
+        for t in reversed(range(values.shape[0] - 1)):
+            vs_minus_v[t] = (
+                deltas[t] + gamma * cs[t] * nextnonterminal[t] * vs_minus_v[t + 1]
+            )
+        vs = values + vs_minus_v
+
+        advantages = torch.zeros_like(values)
+        advantages[:-1] = clipped_rhos[:-1] * (
+            rewards[:-1] + gamma * nextnonterminal * vs[1:] - values[:-1]
+        )
+
+    return vs, advantages
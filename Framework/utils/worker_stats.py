@@ -0,0 +1,229 @@
+import os
+import time
+import warnings
+from multiprocessing.connection import wait
+import numpy as np
+import psutil
+
+clock = time.perf_counter_ns
+# ProcConcatVec internals WorkerTimes reads or shadows, none of them public supersuit API
+internals = ("pipes", "procs", "idx_starts", "num_envs", "step_async", "_receive_info")
+
+
+def cpu_budget():
+    # CPUs this process may run on, which can be fewer than the machine has
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return psutil.cpu_count()
+
+
+def cpu_demand(workers):
+    """Env worker processes plus torch's intra- and inter-op threads, against cpu_budget()."""
+    import torch
+
+    return dict(
+        env_workers=workers,
+        torch_threads=torch.get_num_threads(),
+        torch_interop_threads=torch.get_num_interop_threads(),
+        demand=workers + torch.get_num_threads(),
+        cpus=cpu_budget(),
+    )
+
+
+def has_workers(env):
+    # concat_vec_envs_v1 only builds worker processes (ProcConcatVec) for num_cpus > 1
+    return hasattr(env, "procs") or hasattr(env, "pipes")
+
+
+def missing_internals(env):
+    missing = [name for name in internals if not hasattr(env, name)]
+    if not missing and len(env.idx_starts) != len(env.pipes):
+        missing.append("one idx_starts entry per pipe")
+    return missing
+
+
+def worker_times(env):
+    """
+    WorkerTimes of a multiprocess env. None for an in-process env, and, with a warning,
+    when this supersuit's ProcConcatVec lacks the internals it wraps: the env is then
+    left untouched, so training does not depend on them.
+    """
+    if not has_workers(env):
+        return None
+    missing = missing_internals(env)
+    if missing:
+        warnings.warn(
+            f"env worker timing disabled, {type(env).__name__} lacks "
+            f"{', '.join(missing)}; the supersuit internals it relies on have changed"
+        )
+        return None
+    return WorkerTimes(env)
+
+
+class WorkerTimes:
+    """
+    Per-worker timings of a multiprocess concat_vec_envs_v1 env, taken on the parent side:
+    - latency: actions sent to that worker's results back
+    - queue: its results waiting for the slowest worker before the step returns
+    - idle: its results back to the next actions sent, the worker waiting on the policy
+    Shadows the env's step_async and _receive_info, results are collected in arrival order
+    instead of worker order. reset() and the other instructions are not timed.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.workers = len(env.pipes)
+        self.envs = np.diff(list(env.idx_starts) + [env.num_envs])
+        self.procs = [psutil.Process(proc.pid) for proc in env.procs]
+        self.sent = None
+        self.arrivals = None
+        self.clear()
+        self._step_async = env.step_async
+        self._receive_info = env._receive_info
+        env.step_async = self.step_async
+        env._receive_info = self.receive_info
+
+    def clear(self):
+        self.latency = [[] for _ in range(self.workers)]
+        self.queue = [[] for _ in range(self.workers)]
+        self.idle = [[] for _ in range(self.workers)]
+        self.slowest = np.zeros(self.workers, dtype=np.int64)
+        self.start = clock()
+        self.cpu = self.cpu_times()
+
+    def cpu_times(self):
+        times = []
+        for proc in self.procs:
+            try:
+                t = proc.cpu_times()
+                times.append(t.user + t.system)
+            except psutil.Error:
+                times.append(np.nan)
+        return np.array(times)
+
+    def step_async(self, actions):
+        self.sent = clock()
+        if self.arrivals is not None:
+            for i, arrival in enumerate(self.arrivals):
+                self.idle[i].append(self.sent - arrival)
+        self._step_async(actions)
+
+    def receive_info(self):
+        if self.sent is None:
+            self.arrivals = None
+            return self._receive_info()
+        pending = dict(zip(self.env.pipes, range(self.workers)))
+        data = [None] * self.workers
+        arrivals = [0] * self.workers
+        while pending:
+            ready = wait(list(pending))
+            now = clock()
+            for pipe in ready:
+                i = pending.pop(pipe)
+                arrivals[i] = now
+                data[i] = pipe.recv()
+                if isinstance(data[i], tuple):
+                    e, tb = data[i]
+                    print(tb)
+                    raise e
+        last = max(arrivals)
+        for i, arrival in enumerate(arrivals):
+            self.latency[i].append(arrival - self.sent)
+            self.queue[i].append(last - arrival)
+        self.slowest[int(np.argmax(arrivals))] += 1
+        self.arrivals = arrivals
+        self.sent = None
+        return data
+
+    def summary(self, straggler_factor=1.5):
+        """
+        Per-worker figures since the last clear(), in ms and percent of the wall time.
+        A straggler's median latency is above straggler_factor times the median over
+        workers. run_pct is the worker's CPU time over its step latency, well below 100
+        means it was runnable but descheduled, i.e. the CPUs are oversubscribed.
+        """
+        steps = len(self.latency[0])
+        if steps == 0:
+            return dict(steps=0, workers=[], stragglers=[])
+        elapsed = clock() - self.start
+        cpu = (self.cpu_times() - self.cpu) * 1e9
+        workers = []
+        for i in range(self.workers):
+            latency = np.asarray(self.latency[i], dtype=np.float64) / 1e6
+            p50, p90, p99 = np.percentile(latency, [50, 90, 99])
+            busy = latency.sum() * 1e6
+            workers.append(
+                dict(
+                    envs=int(self.envs[i]),
+                    step_p50_ms=float(p50),
+                    step_p90_ms=float(p90),
+                    step_p99_ms=float(p99),
+                    queue_ms=float(np.mean(self.queue[i]) / 1e6),
+                    idle_pct=float(100 * np.sum(self.idle[i]) / elapsed),
+                    busy_pct=float(100 * busy / elapsed),
+                    run_pct=float(100 * cpu[i] / busy) if busy else float("nan"),
+                    slowest_pct=float(100 * self.slowest[i] / steps),
+                )
+            )
+        median = np.median([w["step_p50_ms"] for w in workers])
+        stragglers = [
+            i for i, w in enumerate(workers) if w["step_p50_ms"] > straggler_factor * median
+        ]
+        return dict(steps=steps, workers=workers, stragglers=stragglers)
+
+
+class WorkerMonitor:
+    """
+    Logs WorkerTimes of the training env every worker_interval steps under workers/, and
+    its CPU demand once. Stragglers and oversubscription are also printed, once each.
+    Does nothing for an in-process env, or one worker_times() can't wrap.
+    """
+
+    def __init__(self, logger, env, args):
+        self.times = worker_times(env) if args.worker_interval > 0 else None
+        self.logger = logger if self.times is not None else None
+        self.interval = args.worker_interval
+        self.factor = args.straggler_factor
+        self.last_step = 0
+        self.flagged = set()
+        if self.logger is None:
+            return
+        self.demand = cpu_demand(self.times.workers)
+        for name, value in self.demand.items():
+            self.logger.add_scalar(f"workers/{name}", value, 0)
+        if self.demand["demand"] > self.demand["cpus"]:
+            print(
+                f"CPU oversubscription: {self.demand['env_workers']} env workers and "
+                f"{self.demand['torch_threads']} torch threads on {self.demand['cpus']} CPUs, "
+                "lower the worker count or torch.set_num_threads"
+            )
+
+    def tick(self, step):
+        if self.logger is None or step - self.last_step < self.interval:
+            return
+        self.last_step = step
+        summary = self.times.summary(self.factor)
+        self.times.clear()
+        if not summary["steps"]:
+            return
+        log = self.logger.add_scalar
+        for i, worker in enumerate(summary["workers"]):
+            for name, value in worker.items():
+                if name != "envs":
+                    log(f"workers/{i}/{name}", value, step)
+        p50 = [w["step_p50_ms"] for w in summary["workers"]]
+        log("workers/stragglers", len(summary["stragglers"]), step)
+        log("workers/imbalance", max(p50) / max(np.median(p50), 1e-9), step)
+        log("workers/queue_ms", np.mean([w["queue_ms"] for w in summary["workers"]]), step)
+        log("workers/idle_pct", np.mean([w["idle_pct"] for w in summary["workers"]]), step)
+        log("workers/run_pct", np.nanmean([w["run_pct"] for w in summary["workers"]]), step)
+        log("workers/load_per_cpu", os.getloadavg()[0] / self.demand["cpus"], step)
+        for i in set(summary["stragglers"]) - self.flagged:
+            worker = summary["workers"][i]
+            print(
+                f"Env worker {i} ({worker['envs']} envs) is a straggler: "
+                f"p50 step {worker['step_p50_ms']:.2f} ms against "
+                f"{np.median(p50):.2f} ms over all workers"
+            )
+        self.flagged |= set(summary["stragglers"])
@@ -0,0 +1,38 @@
+from Framework.utils.benchmark import write_results
+from Framework.utils.env_bench import scaling_curves, scenario_agents, sweep
+from Framework.utils.perf_store import append_report
+import argparse
+import os
+
+# Env reset / step throughput per scenario and agent count, e.g.
+# python benchmark_envs.py --scenarios full_ref --agents 2 3 4 --num-envs 64 512 --workers 0 4 8
+
+
+def main():
+    cpus = os.cpu_count()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", default=list(scenario_agents), choices=list(scenario_agents))
+    parser.add_argument("--agents", nargs="+", type=int, default=[2, 3, 4], help="N, where the scenario supports it")
+    parser.add_argument("--num-envs", nargs="+", type=int, default=[16, 64, 256, 1024])
+    parser.add_argument("--workers", nargs="+", type=int, default=sorted({0, 1, 2, 4, max(1, cpus - 1)}), help="concat_vec_envs_v1 processes, 0 steps in process")
+    parser.add_argument("--steps", type=int, default=500, help="timed steps per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default="benchmarks/envs.json")
+    parser.add_argument("--store", type=str, default="benchmarks/history.jsonl", help="results store every run is appended to, for compare_perf.py; empty disables it")
+    args = parser.parse_args()
+
+    results = sweep(args.scenarios, args.agents, args.num_envs, args.workers, args.steps, args.seed)
+    curves = scaling_curves(results)
+    report = write_results(args.out, "envs", vars(args), results, curves=curves)
+    for name, curve in curves.items():
+        print(f"{name}: single env {curve['single'] or float('nan'):.0f} steps/s")
+        print("workers \\ num_envs " + " ".join(f"{n:>9}" for n in curve["num_envs"]))
+        for w, row in zip(curve["workers"], curve["env_steps_per_second"]):
+            print(f"{w:>18} " + " ".join(f"{r or float('nan'):>9.0f}" for r in row))
+    print(f"Wrote {len(results)} results to {args.out}")
+    if args.store:
+        print(f"Appended {append_report(args.store, report)} results to {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from Framework.utils.benchmark import write_results
+from Framework.utils.perf_store import append_report
+from Framework.utils.micro_bench import cases, sweep
+import argparse
+
+# Time and allocations per call of the per-step / per-update hot functions, each checked
+# against its frozen reference output, e.g.
+# python benchmark_micro.py --cases get_critic_obs calculate_returns --num-envs 256 2048
+# python benchmark_micro.py --check-only   (equivalence only, after rewriting a hot function)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", nargs="+", default=list(cases), choices=list(cases))
+    parser.add_argument("--num-envs", nargs="+", type=int, default=[256, 1024, 2048])
+    parser.add_argument("--agents", nargs="+", type=int, default=[2, 3, 4])
+    parser.add_argument("--repeats", type=int, default=20, help="timed calls per case and size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check-only", action="store_true", help="run the reference checks without timing")
+    parser.add_argument("--out", type=str, default="benchmarks/micro.json")
+    parser.add_argument("--store", type=str, default="benchmarks/history.jsonl", help="results store every run is appended to, for compare_perf.py; empty disables it")
+    args = parser.parse_args()
+
+    results = sweep(args.cases, args.num_envs, args.agents, args.repeats, args.seed, args.check_only)
+    report = write_results(args.out, "micro", vars(args), results)
+    failed = [r for r in results if r["status"] != "ok" or r["check"] != "ok"]
+    print(f"Wrote {len(results)} results to {args.out}, {len(failed)} failed or mismatched")
+    if args.store and not args.check_only:
+        print(f"Appended {append_report(args.store, report)} results to {args.store}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
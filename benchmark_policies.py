@@ -0,0 +1,51 @@
+from Framework.utils.arg_extractor import get_args
+from Framework.utils.benchmark import write_results
+from Framework.utils.perf_store import append_report
+from Framework.utils.policy_bench import bench_envs, sweep
+from Framework.policy import policies_dic
+import argparse
+import sys
+
+# Policy / learner throughput on synthetic observations, e.g.
+# python benchmark_policies.py --models ppo_shared_future --envs full_communication_3 \
+#     --num-envs 64 256 1024 --hidden-sizes 64 128 -- --batch_size 1024
+# Arguments after -- go to the usual training parser and set everything not swept.
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=list(policies_dic), choices=list(policies_dic))
+    parser.add_argument("--envs", nargs="+", default=bench_envs, choices=bench_envs)
+    parser.add_argument("--num-envs", nargs="+", type=int, default=[64, 256, 1024])
+    parser.add_argument("--hidden-sizes", nargs="+", type=int, default=[64, 128])
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--rounds", type=int, default=2, help="timed learn_n blocks after the warm-up one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default="benchmarks/policies.json")
+    parser.add_argument("--store", type=str, default="benchmarks/history.jsonl", help="results store every run is appended to, for compare_perf.py; empty disables it")
+    argv = sys.argv[1:]
+    split = argv.index("--") if "--" in argv else len(argv)
+    args = parser.parse_args(argv[:split])
+
+    sys.argv = sys.argv[:1] + argv[split + 1 :]
+    base = get_args()
+
+    results = sweep(
+        base,
+        args.models,
+        args.envs,
+        args.num_envs,
+        args.hidden_sizes,
+        args.device,
+        args.rounds,
+        args.seed,
+    )
+    # the training arguments set everything not swept, so they are part of the config
+    report = write_results(args.out, "policies", dict(vars(args), base=vars(base)), results)
+    print(f"Wrote {len(results)} results to {args.out}")
+    if args.store:
+        print(f"Appended {append_report(args.store, report)} results to {args.store}")
+
+
+if __name__ == "__main__":
+    main()
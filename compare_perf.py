@@ -0,0 +1,55 @@
+from Framework.utils.perf_store import compare, load_store, revisions, suite_keys
+import argparse
+
+# Throughput / latency / memory changes between two revisions in the results store, e.g.
+# python compare_perf.py --baseline 6a21d0b --candidate 1e8b908 --suite policies
+# Without revisions the last recorded one is compared against the one recorded before it.
+# Exits with 1 when any metric regressed significantly.
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", type=str, default="benchmarks/history.jsonl")
+    parser.add_argument("--suite", type=str, default=None, choices=list(suite_keys))
+    parser.add_argument("--baseline", type=str, default=None, help="commit (prefix) to compare against")
+    parser.add_argument("--candidate", type=str, default=None, help="commit (prefix) compared, the last recorded by default")
+    parser.add_argument("--alpha", type=float, default=0.01, help="significance level of the Welch t-test")
+    parser.add_argument("--min-change", type=float, default=0.02, help="smallest relative change reported, significant or not")
+    parser.add_argument("--any-machine", action="store_true", help="also compare records from different machine fingerprints")
+    parser.add_argument("--all", action="store_true", help="print unchanged metrics too")
+    args = parser.parse_args()
+
+    entries = load_store(args.store, args.suite)
+    recorded = revisions(entries)
+    candidate = args.candidate or (recorded[-1] if recorded else None)
+    if args.baseline:
+        baseline = args.baseline
+    else:
+        before = [r for r in recorded if not r.startswith(candidate or "")]
+        baseline = before[-1] if before else None
+    if baseline is None or candidate is None:
+        raise SystemExit(f"need two recorded revisions in {args.store}, found {len(recorded)}")
+
+    rows = compare(
+        entries, baseline, candidate, args.alpha, args.min_change, not args.any_machine
+    )
+    if not rows:
+        raise SystemExit(f"no configuration measured at both {baseline[:10]} and {candidate[:10]}")
+    print(f"baseline {baseline[:10]}  candidate {candidate[:10]}")
+    for row in rows:
+        if row["verdict"] == "unchanged" and not args.all:
+            continue
+        key = " ".join(f"{k}={v}" for k, v in row["key"].items() if v is not None)
+        print(
+            f"{row['verdict']:>11}  {row['suite']} {key} {row['metric']}: "
+            f"{row['baseline']:.4g} -> {row['candidate']:.4g} "
+            f"({100 * row['change']:+.1f}%, p={row['p']:.3g})"
+        )
+    regressions = sum(row["verdict"] == "regression" for row in rows)
+    print(f"{len(rows)} metrics compared, {regressions} regressions")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from Framework.utils.hidden_capture import fit_pca, project, symbol_centroids
+import argparse
+import os
+import numpy as np
+
+# Out of core PCA over a folder written by --capture-rate, e.g.
+# python hidden_pca.py experiments/<name>/hidden/dev --k 3 --vocab 6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("folder", type=str, help="capture folder holding index.json")
+    parser.add_argument("--key", type=str, default="hidden", help="hidden or common")
+    parser.add_argument("--k", type=int, default=2, help="principal components kept")
+    parser.add_argument("--vocab", type=int, default=None, help="also write per-symbol centroids")
+    parser.add_argument("--out", type=str, default=None, help="defaults to <folder>/pca_<key>")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(args.folder, f"pca_{args.key}")
+    os.makedirs(out, exist_ok=True)
+
+    mean, components, variance = fit_pca(args.folder, args.key)
+    np.save(os.path.join(out, "mean.npy"), mean)
+    np.save(os.path.join(out, "components.npy"), components[: args.k])
+    np.save(os.path.join(out, "explained_variance.npy"), variance)
+    project(
+        args.folder,
+        mean,
+        components,
+        os.path.join(out, "projection.npy"),
+        k=args.k,
+        key=args.key,
+    )
+
+    if args.vocab:
+        centroids, counts = symbol_centroids(args.folder, args.vocab, args.key)
+        projected = (centroids - mean) @ components[: args.k].T
+        np.save(os.path.join(out, "symbol_centroids.npy"), projected)
+        np.save(os.path.join(out, "symbol_counts.npy"), counts)
+
+    ratio = variance[: args.k].sum() / variance.sum()
+    print(f"{args.k} components explain {ratio:.1%} of the variance, written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,9 +16,19 @@ from framework.utils.base import base_policy, Args
 from pettingzoo import ParallelEnv
 from framework.model_arc import ACNetwork
 from framework.utils.base import base_policy
+from framework.utils.vtrace import vtrace_returns
+from framework.utils.checkpoint import AsyncCheckpointWriter, snapshot_state_dict
+from framework.utils.rollout_stats import RolloutStats
+from framework.utils.timing import timers
+from framework.utils.memory import ppo_rollout_plan, ppo_rows, network_plan
 from torch.utils.tensorboard import SummaryWriter
 
 
+def stats_prefix(agent_names):
+    # the builder's {prefix}_{pair_name} tags, one set per generation
+    return f"train_|{agent_names[0]}-{agent_names[1]}|"
+
+
 class language_learner_agents(base_policy):
     def __init__(self, args, writer, agent_names):
         self.args = args
@@ -31,15 +41,49 @@ class language_learner_agents(base_policy):
         self.idx_starts = np.array([i * args.n_agents for i in range(0, args.num_envs)])
 
         self.do_train = []
+        self.checkpointer = AsyncCheckpointWriter()
+        self.stats = None
+        if args.stats_interval:
+            self.stats = RolloutStats(args, writer, prefix=stats_prefix(agent_names))
+        self.capture = None
 
     def save_agents(self, PATH):
         for i, agent in enumerate(self.agents):
-            agent.save(PATH)
+            agent.save(PATH, self.checkpointer)
+
+    def handoff(self, agent_names):
+        # next generation in memory: the learner's best weights become the teacher,
+        # the old teacher's network, optimizer and memory are recycled as the new learner.
+        teacher, learner = self.agents[0], self.agents[-1]
+        learner.restore_best()
+        learner.reset(agent_names[0], reinit=False)
+        teacher.reset(agent_names[-1], reinit=True)
+        self.agents = [learner, teacher]
+        if self.stats is not None:
+            # step restarts at 0 and the episode phase with it, start the stats afresh
+            self.stats = RolloutStats(
+                self.args, self.stats.logger, prefix=stats_prefix(agent_names)
+            )
+
+    def close(self):
+        self.checkpointer.close()
 
     def load_agents(self, PATH):
         for i, agent in enumerate(self.agents):
             agent.load(PATH)
 
+    def state_dicts(self):
+        return [agent.ppo.state_dict() for agent in self.agents]
+
+    def load_state_dicts(self, states):
+        for agent, state in zip(self.agents, states):
+            agent.ppo.load_state_dict(state)
+
+    def set_best_states(self, states):
+        # best weights picked by the asynchronous evaluator, used by handoff
+        for agent, state in zip(self.agents, states):
+            agent.best_state = state
+
     def get_critic_obs(self, observations):
         val_obs_ = T.tensor(observations).reshape(self.args.num_envs, self.n_agents, -1)
         val_obs = T.zeros(
@@ -60,8 +104,11 @@ class language_learner_agents(base_policy):
     def action(self, observations, new_episode=False, **kwargs):
         with T.no_grad():
             self.to_remember = []
-            val_obs = self.get_critic_obs(observations)
-            obs = T.tensor(observations, dtype=T.float, device="cuda")
+            with timers.phase("action/critic_obs"):
+                val_obs = self.get_critic_obs(observations)
+            with timers.phase("action/to_tensor"):
+                obs = T.tensor(observations, dtype=T.float, device="cuda")
+            forward = timers.start("action/forward")
             actions = []
 
             for i, agent in enumerate(self.agents):
@@ -84,21 +131,49 @@ class language_learner_agents(base_policy):
                 actions.append(action.numpy())
 
             actions = np.vstack(actions).T.flatten()
+            timers.stop(forward)
             return actions
 
     def action_evaluate(self, observations, new_episode):
         obs_batch = T.tensor(observations, dtype=T.float, device="cuda")
+        if new_episode and self.capture is not None:
+            self.capture.new_episode()
         actions = []
         for i, agent in enumerate(self.agents):
-            agent_obs = obs_batch[i : i + 1]
+            # env-major layout, agent i of every env in the batch
+            agent_obs = obs_batch[i :: self.n_agents]
 
             if new_episode:
                 agent.ppo.init_hidden(agent_obs.shape[0])
             action = agent.choose_action_evaluate(agent_obs)
-            actions.append(action[0][0].item())
-        return np.array(actions)
+            actions.append(action[0].numpy())
+
+        if self.capture is not None:
+            self.capture.advance()
+        return np.vstack(actions).T.flatten()
+
+    def set_capture(self, capture):
+        self.capture = capture
+        for i, agent in enumerate(self.agents):
+            agent.ppo.capture = capture
+            agent.ppo.capture_agent = i
+
+    @staticmethod
+    def memory_plan(args):
+        # one learner per agent, each with its own network and rollout buffer
+        network = NNN(args.obs_space, args.n_agents, args.action_space, args.hidden_size)
+        rows = ppo_rows(args, per_agent=True)
+        plan = {}
+        for i in range(args.n_agents):
+            plan[f"agent_{i}.rollout_buffer"] = ppo_rollout_plan(args, rows)
+            plan[f"agent_{i}.network"] = network_plan(network)
+        return plan
 
     def store(self, total_steps, obs, rewards, dones):
+        if self.stats is not None:
+            actions = T.stack([r[3] for r in self.to_remember], 1)
+            self.stats.update(total_steps, actions, rewards)
+
         for i, agent in enumerate(self.agents):
 
             if agent.agent_i != 0 and i == 0:
@@ -120,7 +195,8 @@ class language_learner_agents(base_policy):
                 agent.memory.counter = 0
                 agent.memory.cn += 1
             if agent.memory.cn == self.args.learn_n:
-                agent.learn(total_steps)
+                with timers.phase("store/learn"):
+                    agent.learn(total_steps)
 
 
 # fmt:off
@@ -194,16 +270,30 @@ class PPOTrainer:
         self.returns = returns
         self.advantages = advantages
 
+    def calculate_vtrace_returns(self, target_logprobs, target_values):
+        # off-policy correction for rollouts collected by lagging actors,
+        # the ppo ratio is then taken against the learner's own policy.
+        self.returns, self.advantages = vtrace_returns(
+            self.logprobs, target_logprobs, self.rewards, target_values, self.dones, self.gamma
+        )
+        self.logprobs.copy_(target_logprobs)
+        self.values.copy_(target_values)
+
     def clear_memory(self):
-        space = (self.num_steps, self.num_envs * self.args.learn_n)
-
-        self.obs = T.zeros(space + self.obs_space)
-        self.valobs = T.zeros(space + (self.obs_space[0]*self.args.n_agents,))
-        self.logprobs = T.zeros(space)
-        self.actions = T.zeros(space)
-        self.values = T.zeros(space)
-        self.rewards = T.zeros(space)
-        self.dones = T.zeros(space)
+        if not hasattr(self, "obs"):
+            space = (self.num_steps, self.num_envs * self.args.learn_n)
+
+            self.obs = T.zeros(space + self.obs_space)
+            self.valobs = T.zeros(space + (self.obs_space[0]*self.args.n_agents,))
+            self.logprobs = T.zeros(space)
+            self.actions = T.zeros(space)
+            self.values = T.zeros(space)
+            self.rewards = T.zeros(space)
+            self.dones = T.zeros(space)
+        else:
+            # reuse the preallocated rollout arena
+            for buffer in (self.obs, self.valobs, self.logprobs, self.actions, self.values, self.rewards, self.dones):
+                buffer.zero_()
         self.counter = 0
         self.cn = 0
 # fmt:on
@@ -270,6 +360,10 @@ class NNN(nn.Module):
             layer_init(nn.Linear(layer_filters, inp_hid_size), std=0.01),
         )
 
+        # set by the policy during evaluation, see framework.utils.hidden_capture
+        self.capture = None
+        self.capture_agent = 0
+
     def init_hidden(self, batch_size=1):
         self.actor_hidden = T.zeros(self.gru_layers, batch_size, self.hidden_size).to(
             "cuda"
@@ -278,6 +372,16 @@ class NNN(nn.Module):
             "cuda"
         )
 
+    def reset_parameters(self):
+        for module in self.modules():
+            if isinstance(module, nn.Linear):
+                layer_init(module)
+            elif isinstance(module, nn.GRU):
+                module.reset_parameters()
+        layer_init(self.critic[-1], std=1.0)
+        layer_init(self.action[-1], std=0.01)
+        layer_init(self.future[-1], std=0.01)
+
     def get_futures(self, x, n):
         out = x
         futures = []
@@ -295,14 +399,17 @@ class NNN(nn.Module):
         return value
 
     def get_action(self, x):
-        out, self.actor_hidden = self.gru_actor(x, self.actor_hidden)
-        out = self.actor(out)
-        future = self.future(out)
-        out = torch.concat([out, future], dim=2)
+        hidden, self.actor_hidden = self.gru_actor(x, self.actor_hidden)
+        common = self.actor(hidden)
+        future = self.future(common)
+        out = torch.concat([common, future], dim=2)
         logits = self.action(out)
         probs = Categorical(logits=logits)
         action = probs.sample()
 
+        if self.capture is not None:
+            self.capture.record(hidden, common, action, self.capture_agent)
+
         return action, probs, future
 
     def get_action_and_value(self, x, val_x, action_=None):
@@ -342,14 +449,32 @@ class Agent:
         self.optimizer = optim.Adam(
             self.ppo.parameters(), lr=args.learning_rate, eps=1e-5
         )
+        self.best_state = None
 
     # fmt:off
     def remember(self, observations, val_obs, action_p, action, vals, reward, done):
         self.memory.store_memory(observations, val_obs, action_p, action, vals, reward, done)
 
-    def save(self, PATH):
-        torch.save(self.ppo.state_dict(), PATH+f"/agent_{self.agent_i}")
+    def save(self, PATH, checkpointer=None):
+        self.best_state = snapshot_state_dict(self.ppo)
+        fname = PATH+f"/agent_{self.agent_i}"
+        if checkpointer is None:
+            torch.save(self.best_state, fname)
+        else:
+            checkpointer.save(self.best_state, fname)
         print(f"Save model agent_{self.agent_i} at {PATH}")
+
+    def restore_best(self):
+        if self.best_state is not None:
+            self.ppo.load_state_dict(self.best_state)
+
+    def reset(self, i, reinit=False):
+        self.agent_i = i
+        self.best_state = None
+        if reinit:
+            self.ppo.reset_parameters()
+        self.optimizer.state.clear()
+        self.memory.clear_memory()
     
     def load(self, PATH):
         self.ppo.load_state_dict(torch.load(PATH+f"/agent_{self.agent_i}"), strict=False)
@@ -390,11 +515,26 @@ class Agent:
                 value.cpu(),
             )
 
+    def evaluate_memory(self):
+        with torch.no_grad():
+            b_obs = self.memory.obs.to("cuda")
+            b_val_obs = self.memory.valobs.to("cuda")
+            b_actions = self.memory.actions.to("cuda")
+            self.ppo.init_hidden(b_obs.shape[1])
+            (_, logprob, _, value, _) = self.ppo.get_action_and_value(
+                b_obs, b_val_obs, b_actions.long()
+            )
+            return logprob.cpu(), value.squeeze().cpu()
+
     def learn(self, global_step):
         self.ppo.train()
 
         args = self.args
-        self.memory.calculate_returns()
+        with timers.phase("store/learn/returns"):
+            if args.actors:
+                self.memory.calculate_vtrace_returns(*self.evaluate_memory())
+            else:
+                self.memory.calculate_returns()
         clipfracs = []
 
         (
@@ -412,6 +552,7 @@ class Agent:
         mseloss = torch.nn.MSELoss()
 
         for epoch in range(args.update_epochs):
+            forward = timers.start("store/learn/forward")
             self.ppo.init_hidden(b_obs.shape[1])
             self.optimizer.zero_grad()
 
@@ -438,9 +579,7 @@ class Agent:
                 # if approx_kl > 0.02:
                 #     print("too large kl", epoch)
                 #     break
-                clipfracs += [
-                    ((ratio - 1.0).abs() > args.clip_coef).float().mean().item()
-                ]
+                clipfracs += [((ratio - 1.0).abs() > args.clip_coef).float().mean()]
 
             if args.norm_adv:
                 b_advantages = (b_advantages - b_advantages.mean()) / (
@@ -472,43 +611,53 @@ class Agent:
                 pg_loss - args.ent_coef * entropy_loss + v_loss * args.vf_coef + floss
             )
 
-            loss.backward()
-            nn.utils.clip_grad_norm_(self.ppo.parameters(), args.max_grad_norm)
-            self.optimizer.step()
-
-        y_pred, y_true = (
-            b_values.reshape(-1).cpu().numpy(),
-            b_returns.reshape(-1).cpu().numpy(),
+            timers.stop(forward)
+
+            with timers.phase("store/learn/backward"):
+                loss.backward()
+            with timers.phase("store/learn/optimizer"):
+                nn.utils.clip_grad_norm_(self.ppo.parameters(), args.max_grad_norm)
+                self.optimizer.step()
+
+        # kept on the device, the metrics sink copies them to the host off the training thread
+        y_pred, y_true = b_values.reshape(-1), b_returns.reshape(-1)
+        var_y = torch.var(y_true, unbiased=False)
+        explained_var = torch.where(
+            var_y == 0,
+            torch.full_like(var_y, np.nan),
+            1 - torch.var(y_true - y_pred, unbiased=False) / var_y,
         )
-        var_y = np.var(y_true)
-        explained_var = np.nan if var_y == 0 else 1 - np.var(y_true - y_pred) / var_y
 
         div_term = args.update_epochs
 
         self.writer.add_scalar(
             f"losses/value_loss_agent_{self.agent_i}",
-            total_v_loss.item() / div_term,
+            total_v_loss.detach() / div_term,
             global_step,
         )
         self.writer.add_scalar(
             f"losses/policy_loss_agent_{self.agent_i}",
-            total_pg_loss.item() / div_term,
+            total_pg_loss.detach() / div_term,
             global_step,
         )
         self.writer.add_scalar(
-            f"losses/entropy_agent_{self.agent_i}", entropy_loss.item(), global_step
+            f"losses/entropy_agent_{self.agent_i}", entropy_loss.detach(), global_step
         )
         self.writer.add_scalar(
-            f"losses/approx_kl_agent_{self.agent_i}", approx_kl.item(), global_step
+            f"losses/approx_kl_agent_{self.agent_i}", approx_kl, global_step
         )
         self.writer.add_scalar(
-            f"losses/clipfrac_agent_{self.agent_i}", np.mean(clipfracs), global_step
+            f"losses/clipfrac_agent_{self.agent_i}",
+            torch.stack(clipfracs).mean(),
+            global_step,
         )
         self.writer.add_scalar(
             f"losses/explained_variance_agent_{self.agent_i}",
             explained_var,
             global_step,
         )
-        self.writer.add_scalar(f"losses/Floss_agent_{self.agent_i}", floss, global_step)
+        self.writer.add_scalar(
+            f"losses/Floss_agent_{self.agent_i}", floss.detach(), global_step
+        )
 
         self.memory.clear_memory()
@@ -16,6 +16,7 @@ from framework.utils.base import base_policy, Args
 from pettingzoo import ParallelEnv
 from framework.model_arc import ACNetwork
 from framework.utils.base import base_policy
+from framework.utils.memory import ppo_rollout_plan, ppo_rows, network_plan
 from torch.utils.tensorboard import SummaryWriter
 
 
@@ -40,6 +41,19 @@ class language_learner_agents_continuous(base_policy):
         for i, agent in enumerate(self.agents):
             agent.load(PATH)
 
+    @staticmethod
+    def memory_plan(args):
+        # one learner per agent; logprobs and actions hold a value per action dimension
+        network = NNN(args.obs_space, args.n_agents, args.action_space, args.hidden_size)
+        rows = ppo_rows(args, per_agent=True)
+        plan = {}
+        for i in range(args.n_agents):
+            plan[f"agent_{i}.rollout_buffer"] = ppo_rollout_plan(
+                args, rows, action_size=args.action_space
+            )
+            plan[f"agent_{i}.network"] = network_plan(network)
+        return plan
+
     def get_critic_obs(self, observations):
         val_obs_ = T.tensor(observations).reshape(self.args.num_envs, self.n_agents, -1)
         val_obs = T.zeros(
@@ -5,6 +5,9 @@ from Framework.experiment_builder_iterated_continuous import (
     ExperimentBuilderIteratedCont,
 )
 from Framework.utils.arg_extractor import get_args
+from Framework.actor_learner import ActorLearner, split_actor_learner_args
+from Framework.environments import make_learn_env, make_learn_eval_env
+from Framework.async_evaluation import AsyncEvaluator
 from iterated_learning.ppo_shared_use_future import language_learner_agents
 from iterated_learning.ppo_shared_use_future_continuous import (
     language_learner_agents_continuous,
@@ -15,15 +18,16 @@ import torch
 
 from scenarios import complex_ref, full_ref, iterated
 
-# from torch.profiler import profile, record_function, ProfilerActivity
 import wandb
 import shutil
 import supersuit as ss
 
 import psutil
 import os
-from torch.utils.tensorboard import SummaryWriter
+from Framework.utils.metrics import make_logger
+from Framework.utils.memory import fit_memory_budget
 import warnings
+from functools import partial
 
 warnings.filterwarnings("ignore")
 import sys
@@ -41,14 +45,15 @@ def get_environments(args):
     env_learn = ss.pad_observations_v0(env_learn)
     env_learn = ss.pettingzoo_env_to_vec_env_v1(env_learn)
 
-    env_test_learn = ss.concat_vec_envs_v1(env_learn, 1)
+    env_test_learn = ss.concat_vec_envs_v1(env_learn, args.eval_envs)
     env_learn = ss.concat_vec_envs_v1(env_learn, args.num_envs, psutil.cpu_count() - 1)
     env_learn.seed(args.seed)
 
     env_test_all = env.parallel_env(landmark_ind=landmark_all, continuous_actions=False)
     env_test_all = ss.pad_observations_v0(env_test_all)
     env_test_all = ss.pettingzoo_env_to_vec_env_v1(env_test_all)
-    env_test_all = ss.concat_vec_envs_v1(env_test_all, 1)
+    env_video = ss.concat_vec_envs_v1(env_test_all, 1)
+    env_test_all = ss.concat_vec_envs_v1(env_test_all, args.eval_envs)
 
     obs = env_learn.reset()
     # print(env_learn.action_space)
@@ -64,13 +69,14 @@ def get_environments(args):
         f"Observation shape: {env_learn.observation_space.shape}, Action space: {env_learn.action_space}, all_obs shape: {obs.shape}"
     )
 
-    return env_learn, env_test_learn, env_test_all, args
+    return env_learn, env_test_learn, env_test_all, env_video, args
 
 
 def iterated_learning(
     args, logger, experiment_name, experiment_videos, experiment_saved_models
 ):
     args.device = "cuda"
+    Policy = None
 
     for i, j in enumerate(range(1, 10)):
         # if i == 0:
@@ -79,20 +85,66 @@ def iterated_learning(
         agent_names = [i, j]
 
         # setup environment ###########################################
-        env_learn, env_test_learn, env_test_all, args = get_environments(args)
+        env_learn, env_test_learn, env_test_all, env_video, args = get_environments(
+            args
+        )
         logger.add_text(
             "possible_types",
             str(args.landmark_ind),
         )
 
         ############### MODEL ########################################
-        Policy = language_learner_agents
-
-        Policy = Policy(args, logger, agent_names)
-        PATH = experiment_saved_models
-        Policy.load_agents(PATH)
+        if Policy is None:
+            fit_memory_budget(language_learner_agents, args)
+        actor_learner = None
+        policy_args = args
+        if args.actors:
+            actor_args, policy_args = split_actor_learner_args(args)
+            actor_learner = ActorLearner(
+                actor_args,
+                partial(make_learn_env, list(args.landmark_ind)),
+                partial(language_learner_agents, agent_names=agent_names),
+                logger,
+            )
+
+        if Policy is None:
+            Policy = language_learner_agents(policy_args, logger, agent_names)
+            PATH = experiment_saved_models
+            Policy.load_agents(PATH)
+        else:
+            # hand the previous learner to the teacher slot in memory, no reload from disk.
+            Policy.handoff(agent_names)
         ###############################################################
 
+        evaluator = None
+        if args.async_eval:
+            evaluator = AsyncEvaluator(
+                dict(
+                    builder_cls=ExperimentBuilderIterated,
+                    builder_kwargs=dict(
+                        experiment_name=experiment_name,
+                        logfolder=experiment_videos,
+                        experiment_saved_models=experiment_saved_models,
+                        videofolder=experiment_videos,
+                        episode_len=args.episode_len,
+                        steps=args.total_timesteps,
+                        agent_names=agent_names,
+                    ),
+                    env_fns=dict(
+                        test=partial(
+                            make_learn_eval_env, list(args.landmark_ind), args.eval_envs
+                        ),
+                        test_all=partial(
+                            make_learn_eval_env, list(range(6)), args.eval_envs
+                        ),
+                        video=partial(make_learn_eval_env, list(range(6)), 1),
+                    ),
+                    policy_fn=partial(language_learner_agents, agent_names=agent_names),
+                    args=policy_args,
+                ),
+                logger,
+            )
+
         exp = ExperimentBuilderIterated(
             args=args,
             train_environment=env_learn,
@@ -107,6 +159,9 @@ def iterated_learning(
             steps=args.total_timesteps,
             logger=logger,
             agent_names=agent_names,
+            actor_learner=actor_learner,
+            video_environment=env_video,
+            evaluator=evaluator,
         )
         logger.add_text(
             "hyperparameters",
@@ -115,11 +170,17 @@ def iterated_learning(
         )
 
         exp.run_experiment()
+        if args.language_episodes:
+            exp.language_report(i, env_test_all)
+        if args.generalization:
+            exp.generalization_report(i, env_test_all)
 
         env_learn.close()
         env_test_learn.close()
         env_test_all.close()
+        env_video.close()
 
+    Policy.close()
     logger.close()
     os._exit(0)
 
@@ -154,7 +215,7 @@ def main():
             save_code=True,
             dir=os.path.abspath("experiments"),
         )
-    logger = SummaryWriter(experiment_logs)
+    logger = make_logger(args, experiment_logs)
 
     print("\n*****Parameters*****")
     space = " "
@@ -0,0 +1,93 @@
+from Framework.utils.learning_curves import aligned, efficiency_report, load_curves, targets
+import argparse
+import json
+import os
+import numpy as np
+
+# Time-to-threshold and samples-to-threshold of End_reward and symbols_per_ep across runs, e.g.
+# python learning_report.py experiments/ppo_shared_future-full_communication_3-a \
+#     experiments/ppo_shared_future-full_communication_3-b --reward-threshold -0.5 --plot curves.png
+# Runs are experiment (or log) folders, read from metrics.jsonl or the TensorBoard events.
+
+
+def duration(seconds):
+    if seconds is None or not np.isfinite(seconds):
+        return "-"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def plot(runs, path, points=200):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    figure, grid = plt.subplots(len(targets), 2, figsize=(12, 4 * len(targets)), squeeze=False)
+    for row, name in enumerate(targets):
+        for col, axis in enumerate(("wall_s", "transitions")):
+            ax = grid[row][col]
+            for label, curves in runs.items():
+                for tag, curve in curves.items():
+                    if tag.rsplit("/", 1)[-1] != name or not curve:
+                        continue
+                    end = curve[-1][col + 1]
+                    x = np.linspace(0, end, points)
+                    scale = 3600 if axis == "wall_s" else 1
+                    ax.plot(x / scale, aligned(curve, axis, x), label=f"{label} {tag}")
+            ax.set_xlabel("hours" if axis == "wall_s" else "env transitions")
+            ax.set_ylabel(name)
+            ax.legend(fontsize="small")
+    figure.tight_layout()
+    figure.savefig(path)
+    plt.close(figure)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("runs", nargs="+", help="experiment or log folders")
+    parser.add_argument("--reward-threshold", type=float, default=None, help="End_reward counted as reached at or above this")
+    parser.add_argument("--symbols-threshold", type=float, default=None, help="symbols_per_ep target")
+    parser.add_argument("--symbols-direction", type=str, default="above", choices=["above", "below"], help="whether symbols_per_ep is reached at or above, or at or below its threshold")
+    parser.add_argument("--window", type=int, default=1, help="evaluations averaged before testing a threshold")
+    parser.add_argument("--out", type=str, default=None, help="JSON report")
+    parser.add_argument("--plot", type=str, default=None, help="image of the curves against wall clock and env transitions")
+    args = parser.parse_args()
+
+    thresholds = {
+        "End_reward": (args.reward_threshold, True),
+        "symbols_per_ep": (args.symbols_threshold, args.symbols_direction == "above"),
+    }
+    runs, report = {}, {}
+    for folder in args.runs:
+        label = os.path.basename(os.path.normpath(folder))
+        runs[label] = load_curves(folder)
+        report[label] = efficiency_report(runs[label], thresholds, args.window)
+
+    for label, rows in report.items():
+        print(f"\n{label}")
+        for row in rows:
+            line = (
+                f"  {row['tag']}: final {row['final']:.3f}, best {row['best']:.3f} over "
+                f"{duration(row['wall_s'])} / {row['transitions']:.3g} transitions "
+                f"({row['transitions_per_second']:.0f}/s)"
+            )
+            if "threshold" in row:
+                reached = row["reached"]
+                line += f"; {row['threshold']:g} " + (
+                    f"reached after {duration(reached['wall_s'])}, "
+                    f"{reached['transitions']:.3g} transitions, step {reached['step']}"
+                    if reached
+                    else "not reached"
+                )
+            print(line)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(dict(thresholds=thresholds, window=args.window, runs=report), f, indent=2)
+    if args.plot:
+        plot(runs, args.plot)
+
+
+if __name__ == "__main__":
+    main()
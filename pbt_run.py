@@ -0,0 +1,68 @@
+from Framework.pbt import PBTScheduler
+from Framework.utils.arg_extractor import get_args
+from Framework.environments import get_env
+import numpy as np
+import random
+import torch
+import wandb
+import shutil
+import supersuit as ss
+
+import os
+from Framework.utils.metrics import make_logger
+import warnings
+
+warnings.filterwarnings("ignore")
+
+# python pbt_run.py --model "ppo_shared_use_future" --env "full_communication_2" --experiment_name "pbt" --population 8 --total-episodes 1000000 --wandb False
+
+
+def main():
+    args = get_args()  # get arguments from command line
+    # Generate Directories##########################
+    experiment_name = f"{args.model}-{args.env}-{args.experiment_name}-pbt"
+    experiment_folder = os.path.join(os.path.abspath("experiments"), experiment_name)
+    experiment_logs = os.path.abspath(os.path.join(experiment_folder, "result_outputs"))
+
+    if os.path.exists(experiment_folder):
+        shutil.rmtree(experiment_folder)
+
+    os.mkdir(experiment_folder)  # create the experiment directory
+    os.mkdir(experiment_logs)  # create the experiment log directory
+    ################################################
+    if args.wandb:
+        wandb.init(
+            project="language_evolution",
+            entity=None,
+            sync_tensorboard=True,
+            config=vars(args),
+            name=experiment_name,
+            save_code=True,
+            dir=os.path.abspath("experiments"),
+        )
+    logger = make_logger(args, experiment_logs)
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    torch.backends.cudnn.deterministic = args.torch_deterministic
+
+    # shapes for the members ######################################
+    env = get_env(args.env)
+    args.n_agents = env.max_num_agents
+    env = ss.pad_observations_v0(env)
+    env = ss.pettingzoo_env_to_vec_env_v1(env)
+    args.action_space = env.action_space.n
+    args.obs_space = env.observation_space.shape
+    env.close()
+    args.device = "cuda" if args.cuda and torch.cuda.is_available() else "cpu"
+    ###############################################################
+
+    PBTScheduler(args, experiment_folder, logger).run()
+    logger.close()
+
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
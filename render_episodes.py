@@ -0,0 +1,32 @@
+from Framework.utils.video_render import render_files
+import argparse
+import glob
+import os
+
+# Offline rendering of the episode logs written by save_video, e.g.
+# python render_episodes.py experiments/<name>/videos/episodes --format gif --workers 8
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+", help="episode .npz logs or folders of them")
+    parser.add_argument("--out", type=str, default=None, help="defaults to the videos folder next to the logs")
+    parser.add_argument("--format", type=str, default="mp4", choices=["mp4", "gif"])
+    parser.add_argument("--fps", type=int, default=10)
+    parser.add_argument("--size", type=int, default=400, help="frame width and height in pixels")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths += sorted(glob.glob(os.path.join(path, "*.npz")))
+        else:
+            paths.append(path)
+
+    outputs = render_files(paths, args.out, args.format, args.fps, args.size, args.workers)
+    print(f"Rendered {len(outputs)} episodes")
+
+
+if __name__ == "__main__":
+    main()
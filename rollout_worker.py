@@ -0,0 +1,24 @@
+from Framework.rollout_service import rollout_worker
+import argparse
+import warnings
+
+warnings.filterwarnings("ignore")
+
+# Remote rollout worker, run from the repository root on any machine that can reach the trainer:
+# ROLLOUT_KEY=<trainer's --rollout-key> python rollout_worker.py --host <trainer> --port <rollout-port> --rank 1 --num-cpus 16
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="trainer address")
+    parser.add_argument("--port", type=int, required=True, help="trainer --rollout-port")
+    parser.add_argument("--rank", type=int, default=0, help="seeds this worker's envs")
+    parser.add_argument("--num-cpus", type=int, default=None, help="env processes on this machine")
+    parser.add_argument("--key", type=str, default=None, help="the trainer's --rollout-key, defaults to $ROLLOUT_KEY")
+    args = parser.parse_args()
+
+    rollout_worker(args.host, args.port, args.rank, args.num_cpus, args.key)
+
+
+if __name__ == "__main__":
+    main()
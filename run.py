@@ -1,5 +1,8 @@
 from matplotlib.collections import PolyCollection
 from Framework.experiment_builder import ExperimentBuilder
+from Framework.actor_learner import ActorLearner, split_actor_learner_args
+from Framework.environments import get_env, make_train_env, make_eval_env
+from Framework.async_evaluation import AsyncEvaluator
 from Framework.utils.arg_extractor import get_args
 from Framework.policy import policies_dic
 import numpy as np
@@ -12,15 +15,16 @@ from pettingzoo.mpe import (
 )
 from scenarios import complex_ref, full_ref, iterated
 
-# from torch.profiler import profile, record_function, ProfilerActivity
 import wandb
 import shutil
 import supersuit as ss
 
 import psutil
 import os
-from torch.utils.tensorboard import SummaryWriter
+from Framework.utils.metrics import make_logger
+from Framework.utils.memory import fit_memory_budget
 import warnings
+from functools import partial
 
 warnings.filterwarnings("ignore")
 import sys
@@ -56,7 +60,7 @@ def main():
             save_code=True,
             dir=os.path.abspath("experiments"),
         )
-    logger = SummaryWriter(experiment_logs)
+    logger = make_logger(args, experiment_logs)
 
     print("\n*****Parameters*****")
     space = " "
@@ -78,32 +82,12 @@ def main():
     torch.manual_seed(args.seed)
     torch.backends.cudnn.deterministic = args.torch_deterministic
     # setup environment ###########################################
-    N = 2
-    if args.env == "simple":
-        env = simple_v2
-    elif args.env == "communication":
-        env = simple_reference_v2
-    elif args.env == "iterated":
-        env = iterated
-    elif args.env == "complex_communication":
-        env = complex_ref
-    elif args.env == "full_communication_2":
-        env = full_ref
-        N = 2
-    elif args.env == "full_communication_3":
-        env = full_ref
-        N = 3
-    elif args.env == "full_communication_4":
-        N = 4
-        env = full_ref
-    elif args.env == "spread":
-        env = simple_spread_v2
-
-    env = env.parallel_env(N=N)
+    env = get_env(args.env)
     args.n_agents = env.max_num_agents
     env = ss.pad_observations_v0(env)
     env = ss.pettingzoo_env_to_vec_env_v1(env)
     single_env = ss.concat_vec_envs_v1(env, 1)
+    eval_env = ss.concat_vec_envs_v1(env, args.eval_envs)
     parrallel_env = ss.concat_vec_envs_v1(env, args.num_envs, psutil.cpu_count() - 1)
     parrallel_env.seed(args.seed)
     obs = parrallel_env.reset()
@@ -114,21 +98,54 @@ def main():
     env.close()
 
     args.obs_space = env.observation_space.shape
-    args.device = "cuda"
+    args.device = "cuda" if args.cuda and torch.cuda.is_available() else "cpu"
 
     ############### MODEL ########################################
     Policy = policies_dic[args.model]
+    fit_memory_budget(Policy, args)
 
-    Policy = Policy(args, logger)
+    actor_learner = None
+    if args.actors:
+        actor_args, policy_args = split_actor_learner_args(args)
+        actor_learner = ActorLearner(
+            actor_args, partial(make_train_env, args.env), Policy, logger
+        )
+        Policy = Policy(policy_args, logger)
+    else:
+        Policy = Policy(args, logger)
     if args.load_weights_name:
         PATH = os.path.abspath("experiments") + args.load_weights_name + "/saved_models"
         Policy.load_agents(PATH)
     ###############################################################
 
+    evaluator = None
+    if args.async_eval:
+        evaluator = AsyncEvaluator(
+            dict(
+                builder_cls=ExperimentBuilder,
+                builder_kwargs=dict(
+                    experiment_name=experiment_name,
+                    logfolder=experiment_videos,
+                    experiment_saved_models=experiment_saved_models,
+                    videofolder=experiment_videos,
+                    episode_len=args.episode_len,
+                    steps=args.total_timesteps,
+                ),
+                env_fns=dict(
+                    test=partial(make_eval_env, args.env, args.eval_envs),
+                    video=partial(make_eval_env, args.env, 1),
+                ),
+                policy_fn=policies_dic[args.model],
+                args=args,
+            ),
+            logger,
+        )
+
     exp = ExperimentBuilder(
         args=args,
         train_environment=parrallel_env,
-        test_environment=single_env,
+        test_environment=eval_env,
+        video_environment=single_env,
         Policy=Policy,
         experiment_name=experiment_name,
         logfolder=experiment_videos,
@@ -137,6 +154,8 @@ def main():
         episode_len=args.episode_len,
         steps=args.total_timesteps,
         logger=logger,
+        actor_learner=actor_learner,
+        evaluator=evaluator,
     )
     logger.add_text(
         "hyperparameters",
@@ -146,7 +165,9 @@ def main():
 
     exp.run_experiment()
     single_env.close()
+    eval_env.close()
     parrallel_env.close()
+    Policy.close()
     logger.close()
 
     os._exit(0)
@@ -7,6 +7,9 @@ import random
 
 
 class Scenario(BaseScenario):
+    # evaluation bank slot, see framework.utils.eval_bank
+    bank = None
+
     def make_world(self, N):
         world = World()
         # set any world properties first
@@ -47,6 +50,9 @@ class Scenario(BaseScenario):
         return xs
 
     def reset_world(self, world, np_random):
+        if self.bank is not None:
+            self.restore(world, self.bank.state())
+            return
         # Assign properties to landmarks
         for i, landmark in enumerate(world.landmarks):
             landmark.color = world.colors[i]
@@ -68,6 +74,32 @@ class Scenario(BaseScenario):
             agent.state.p_vel = np.zeros(world.dim_p)
             agent.state.c = np.zeros(world.dim_c)
 
+    def bank_key(self):
+        return f"N{self.N}"
+
+    def snapshot(self, world):
+        return dict(
+            landmark_pos=np.array([l.state.p_pos for l in world.landmarks]),
+            agent_pos=np.array([a.state.p_pos for a in world.agents]),
+            goal_a=np.array([world.agents.index(a.goal_a) for a in world.agents]),
+            goal_b=np.array([world.landmarks.index(a.goal_b) for a in world.agents]),
+        )
+
+    def restore(self, world, state):
+        # same assignments as reset_world, in the same order
+        for i, landmark in enumerate(world.landmarks):
+            landmark.color = world.colors[i]
+            landmark.state.p_pos = state["landmark_pos"][i].copy()
+            landmark.state.p_vel = np.zeros(world.dim_p)
+
+        for i, agent in enumerate(world.agents):
+            agent.goal_a = world.agents[state["goal_a"][i]]
+            agent.goal_b = world.landmarks[state["goal_b"][i]]
+            agent.goal_a.color = agent.goal_b.color
+            agent.state.p_pos = state["agent_pos"][i].copy()
+            agent.state.p_vel = np.zeros(world.dim_p)
+            agent.state.c = np.zeros(world.dim_c)
+
     def reward(self, agent, world):
         if agent.goal_a is None or agent.goal_b is None:
             d_reward = 0.0
@@ -1,3 +1,4 @@
+import itertools
 import numpy as np
 from pettingzoo.mpe._mpe_utils.core import Agent, Landmark, World
 from pettingzoo.mpe._mpe_utils.scenario import BaseScenario
@@ -7,6 +8,9 @@ import random
 
 
 class Scenario(BaseScenario):
+    # evaluation bank slot, see framework.utils.eval_bank
+    bank = None
+
     def make_world(self, landmark_ind):
         world = World()
         # set any world properties first
@@ -59,6 +63,9 @@ class Scenario(BaseScenario):
         return xs
 
     def reset_world(self, world, np_random):
+        if self.bank is not None:
+            self.restore(world, self.bank.state())
+            return
         # Assign properties to landmarks.
         # Select landmarks.
         # print(self.landmark_ind)
@@ -86,6 +93,59 @@ class Scenario(BaseScenario):
             agent.state.p_vel = np.zeros(world.dim_p)
             agent.state.c = np.zeros(world.dim_c)
 
+    def bank_key(self):
+        return "-".join(str(i) for i in sorted(self.landmark_ind))
+
+    def snapshot(self, world):
+        return dict(
+            landmarks=np.array([self.landmarks.index(l) for l in world.landmarks]),
+            landmark_pos=np.array([l.state.p_pos for l in world.landmarks]),
+            agent_pos=np.array([a.state.p_pos for a in world.agents]),
+            goal_a=np.array([world.agents.index(a.goal_a) for a in world.agents]),
+            goal_b=np.array([world.landmarks.index(a.goal_b) for a in world.agents]),
+        )
+
+    def enumerate_states(self, world, np_random, repeats=1):
+        """
+        Every landmark subset with every assignment of goals to agents, `repeats` random
+        placements each, as snapshot() rows for an evaluation bank.
+        """
+        rows = []
+        goal_a = np.array([(i + 1) % self.N for i in range(self.N)])
+        subsets = itertools.combinations(range(len(self.landmarks)), self.landmarkN)
+        for subset in subsets:
+            for goals in itertools.product(range(self.landmarkN), repeat=self.N):
+                for _ in range(repeats):
+                    rows.append(
+                        dict(
+                            landmarks=np.array(subset),
+                            landmark_pos=np_random.uniform(
+                                -1, +1, (self.landmarkN, world.dim_p)
+                            ),
+                            agent_pos=np_random.uniform(-1, +1, (self.N, world.dim_p)),
+                            goal_a=goal_a,
+                            goal_b=np.array(goals),
+                        )
+                    )
+        return rows
+
+    def restore(self, world, state):
+        # same assignments as reset_world, in the same order
+        world.landmarks = [self.landmarks[i] for i in state["landmarks"]]
+        for landmark, pos in zip(world.landmarks, state["landmark_pos"]):
+            landmark.state.p_pos = pos.copy()
+            landmark.state.p_vel = np.zeros(world.dim_p)
+
+        for i, agent in enumerate(world.agents):
+            agent.goal_a = world.agents[state["goal_a"][i]]
+            agent.goal_b = world.landmarks[state["goal_b"][i]]
+            agent.goal_a.color = agent.goal_b.color
+            agent.goal_a.size = agent.goal_b.size / 2
+
+            agent.state.p_pos = state["agent_pos"][i].copy()
+            agent.state.p_vel = np.zeros(world.dim_p)
+            agent.state.c = np.zeros(world.dim_c)
+
     def reward(self, agent, world):
         if agent.goal_a is None or agent.goal_b is None:
             d_reward = 0.0
@@ -0,0 +1,71 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Framework.utils.language_metrics import (
+    bos_disentanglement,
+    entropy,
+    language_metrics,
+    mutual_information,
+    positional_disentanglement,
+    spearman,
+    topographic_similarity,
+)
+
+# every (attribute 0, attribute 1) combination of two binary attributes
+meanings = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+# symbol 1 + attribute 0 in the first position, 3 + attribute 1 in the second
+compositional = np.stack([meanings[:, 0] + 1, meanings[:, 1] + 3], axis=1)
+# one symbol per combination, repeated
+holistic = np.array([[1, 1], [2, 2], [3, 3], [4, 4]])
+
+
+def test_entropy():
+    assert entropy([1, 1]) == pytest.approx(1.0)
+    assert entropy([1, 1, 1, 1]) == pytest.approx(2.0)
+    assert entropy([4, 0]) == pytest.approx(0.0)
+    assert entropy([0, 0]) == pytest.approx(0.0)
+
+
+def test_mutual_information():
+    y = np.array([0, 1, 0, 1])
+    mi, h = mutual_information(np.stack([y, 1 - y, [0, 0, 1, 1]], axis=1), y)
+    assert mi.tolist() == pytest.approx([1.0, 1.0, 0.0])
+    assert h.tolist() == pytest.approx([1.0, 1.0, 1.0])
+
+
+def test_spearman():
+    assert spearman([1, 2, 3, 4], [10, 20, 30, 40]) == pytest.approx(1.0)
+    assert spearman([1, 2, 3, 4], [4, 3, 2, 1]) == pytest.approx(-1.0)
+    assert spearman([1, 1, 1], [1, 2, 3]) == 0.0
+
+
+def test_topographic_similarity():
+    assert topographic_similarity(compositional, meanings) == pytest.approx(1.0)
+    assert topographic_similarity(holistic, meanings) == pytest.approx(0.0)
+
+
+def test_disentanglement():
+    assert positional_disentanglement(compositional, meanings) == pytest.approx(1.0)
+    assert positional_disentanglement(holistic, meanings) == pytest.approx(0.0)
+    assert bos_disentanglement(compositional, meanings, 5) == pytest.approx(1.0)
+    assert bos_disentanglement(holistic, meanings, 5) == pytest.approx(0.0)
+
+
+def test_language_metrics():
+    # 4 episodes of 2 steps, one speaker whose goal (size, color) sits at obs[2:4]
+    obs0 = np.zeros((4, 1, 4))
+    obs0[:, 0, 2] = [0.1, 0.1, 0.2, 0.2]
+    obs0[:, 0, 3] = [0.3, 0.6, 0.3, 0.6]
+    comms = compositional[:, :, None]
+
+    metrics = language_metrics(comms, obs0, 5, "iterated")
+    assert metrics["symbol_entropy_agent_0"] == pytest.approx(2.0)
+    assert metrics["topsim"] == pytest.approx(1.0)
+    assert metrics["posdis"] == pytest.approx(1.0)
+    assert metrics["bosdis"] == pytest.approx(1.0)
+    assert metrics["mi_goal_b_size"] == pytest.approx(1.0)
+    assert metrics["mi_goal_b_color"] == pytest.approx(1.0)
+
+    unknown = language_metrics(comms, obs0, 5, "simple_reference")
+    assert set(unknown) == {"symbol_entropy_agent_0"}
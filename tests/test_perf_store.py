@@ -0,0 +1,39 @@
+import math
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Framework.utils.perf_store import pooled, welch
+
+
+def test_pooled_values():
+    mean, var, n = pooled([1.0, 2.0, 3.0])
+    assert (mean, var, n) == pytest.approx((2.0, 1.0, 3))
+    mean, var, n = pooled([4.0])
+    assert mean == 4.0 and n == 1 and math.isnan(var)
+
+
+def test_pooled_summaries_match_the_union():
+    # summaries carry the population std of their calls, like benchmark.summarize
+    a, b = np.array([1.0, 2.0, 3.0]), np.array([4.0, 5.0])
+    summaries = [dict(mean=x.mean(), std=x.std(), n=len(x)) for x in (a, b)]
+    union = np.concatenate([a, b])
+    mean, var, n = pooled(summaries)
+    assert (mean, var, n) == pytest.approx((union.mean(), union.var(ddof=1), 5))
+
+
+def test_welch_matches_scipy():
+    stats = pytest.importorskip("scipy.stats")
+    a, b = [1.0, 2.0, 3.0, 4.0, 5.0], [3.0, 4.0, 5.0, 6.0, 7.0]
+    expected = stats.ttest_ind(a, b, equal_var=False).pvalue
+    # t = 2 on 8 degrees of freedom
+    assert welch(pooled(a), pooled(b)) == pytest.approx(expected)
+    assert expected == pytest.approx(0.0805, abs=1e-3)
+    assert welch(pooled(a), pooled(a)) == pytest.approx(1.0)
+
+
+def test_welch_degenerate_samples():
+    pytest.importorskip("scipy")
+    assert math.isnan(welch(pooled([1.0]), pooled([1.0, 2.0])))
+    assert welch((1.0, 0.0, 10), (2.0, 0.0, 10)) == 0.0
+    assert welch((1.0, 0.0, 10), (1.0, 0.0, 10)) == 1.0
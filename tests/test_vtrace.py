@@ -0,0 +1,50 @@
+import math
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from Framework.utils.vtrace import vtrace_returns
+
+
+def rollout(dones=(0.0, 0.0, 0.0)):
+    # (num_steps, batch) = (3, 1), gamma 0.5
+    rewards = torch.tensor([[1.0], [2.0], [3.0]])
+    values = torch.tensor([[0.5], [1.0], [2.0]])
+    return rewards, values, torch.tensor(dones).reshape(3, 1)
+
+
+def test_on_policy_is_the_discounted_return():
+    rewards, values, dones = rollout()
+    logprobs = torch.zeros(3, 1)
+    vs, advantages = vtrace_returns(logprobs, logprobs, rewards, values, dones, 0.5)
+    # vs_1 = 2 + 0.5 * 2, vs_0 = 1 + 0.5 * vs_1, the last step keeps its value
+    assert vs.flatten().tolist() == pytest.approx([2.5, 3.0, 2.0])
+    assert advantages.flatten().tolist() == pytest.approx([2.0, 2.0, 0.0])
+
+
+def test_ratios_above_one_are_clipped():
+    rewards, values, dones = rollout()
+    behaviour = torch.zeros(3, 1)
+    target = torch.full((3, 1), math.log(4.0))
+    vs, advantages = vtrace_returns(behaviour, target, rewards, values, dones, 0.5)
+    assert vs.flatten().tolist() == pytest.approx([2.5, 3.0, 2.0])
+    assert advantages.flatten().tolist() == pytest.approx([2.0, 2.0, 0.0])
+
+
+def test_off_policy_step_is_weighted():
+    rewards, values, dones = rollout()
+    behaviour = torch.zeros(3, 1)
+    target = torch.tensor([[math.log(0.5)], [0.0], [0.0]])
+    vs, advantages = vtrace_returns(behaviour, target, rewards, values, dones, 0.5)
+    # delta_0 = 0.5 * 1.0, c_0 = 0.5: vs_0 = 0.5 + 0.5 + 0.5 * 0.5 * 2.0
+    assert vs.flatten().tolist() == pytest.approx([1.5, 3.0, 2.0])
+    assert advantages.flatten().tolist() == pytest.approx([1.0, 2.0, 0.0])
+
+
+def test_done_stops_bootstrapping():
+    rewards, values, dones = rollout(dones=(0.0, 1.0, 0.0))
+    logprobs = torch.zeros(3, 1)
+    vs, advantages = vtrace_returns(logprobs, logprobs, rewards, values, dones, 0.5)
+    # step 1 starts a new episode, so step 0 is its own reward only
+    assert vs.flatten().tolist() == pytest.approx([1.0, 3.0, 2.0])
+    assert advantages.flatten().tolist() == pytest.approx([0.5, 2.0, 0.0])
@@ -0,0 +1,51 @@
+import types
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("psutil")
+
+from Framework.utils.worker_stats import WorkerMonitor, missing_internals, worker_times
+
+
+class InProcessEnv:
+    num_envs = 4
+
+    def step_async(self, actions):
+        pass
+
+
+class ChangedProcEnv(InProcessEnv):
+    # a ProcConcatVec whose private receive path was renamed
+    def __init__(self):
+        self.pipes = [object(), object()]
+        self.procs = []
+        self.idx_starts = [0, 2]
+
+
+def args(interval):
+    return types.SimpleNamespace(worker_interval=interval, straggler_factor=1.5)
+
+
+def test_in_process_env_is_not_wrapped(recwarn):
+    env = InProcessEnv()
+    assert worker_times(env) is None
+    assert len(recwarn) == 0
+    assert WorkerMonitor(object(), env, args(10)).logger is None
+
+
+def test_changed_internals_disable_the_monitor():
+    env = ChangedProcEnv()
+    step_async = env.step_async
+    assert missing_internals(env) == ["_receive_info"]
+    with pytest.warns(UserWarning, match="_receive_info"):
+        monitor = WorkerMonitor(object(), env, args(10))
+    assert monitor.logger is None
+    # the env keeps its own step path
+    assert env.step_async == step_async
+    assert not hasattr(env, "_receive_info")
+
+
+def test_disabled_interval_never_inspects_the_env(recwarn):
+    env = ChangedProcEnv()
+    assert WorkerMonitor(object(), env, args(0)).logger is None
+    assert len(recwarn) == 0